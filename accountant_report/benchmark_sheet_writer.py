@@ -0,0 +1,158 @@
+"""
+Benchmark of the streaming report sheet writer against the in-memory workbook.
+
+Writes an income-like sheet (4 title rows, 3 header rows and a 14 column frame)
+both ways and reports the time and peak RSS of each. Every run is done in its
+own process, since peak RSS is a process high-water mark.
+
+Usage:
+    python -m claret.accountant_report.benchmark_sheet_writer --rows 10000 50000
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Font, NamedStyle
+
+from claret.accountant_report.sheet_writer import (
+    BOLD_TITLE,
+    COLUMN_HEADER,
+    NUMBER,
+    NUMBER_FX,
+    STRING,
+    ReportSheetWriter,
+    get_column_styles,
+    register_report_styles,
+)
+
+N_COLUMNS = 14
+HEADERS = [
+    [""] * 6 + ["Local Currency", "", "", "", "Reporting Currency", "", "", ""],
+    [""] * 6 + ["Gross", "Withholding", "Net", "", "Gross", "Withholding", "Net", ""],
+    [""] * 3 + ["Ex-Date", "Pay-Date", "Description"] + ["Amount"] * 8,
+]
+
+
+def get_frame(n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {}
+    for idx in range(N_COLUMNS):
+        if idx < 6 or idx == N_COLUMNS - 1:
+            data[f"col_{idx}"] = rng.choice(["Equity", "Bond", "Cash", ""], n_rows)
+        else:
+            data[f"col_{idx}"] = rng.normal(0, 10000, n_rows).round(2)
+    return pd.DataFrame(data)
+
+
+def write_in_memory(df: pd.DataFrame, filename: str) -> None:
+    """The way the report sheets were written before streaming."""
+    wb = Workbook()
+    ws = wb.create_sheet("Income")
+    for row_idx in range(1, 5):
+        ws.merge_cells(
+            start_row=row_idx, start_column=1, end_row=row_idx, end_column=N_COLUMNS
+        )
+        cell = ws.cell(row=row_idx, column=1, value=f"Title {row_idx}")
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+        cell.font = Font(name="Arial", size=8, bold=True)
+    for row_idx, header_row in enumerate(HEADERS, start=5):
+        for col_idx, value in enumerate(header_row, start=1):
+            cell = ws.cell(row=row_idx, column=col_idx, value=value)
+            cell.alignment = Alignment(horizontal="center", vertical="center")
+            cell.font = Font(size=8, bold=True)
+    string_style = NamedStyle(
+        name="StringStyle",
+        font=Font(name="Arial", size=8),
+        alignment=Alignment(horizontal="left"),
+    )
+    number_style = NamedStyle(
+        name="NumberStyle",
+        font=Font(name="Arial", size=8),
+        alignment=Alignment(horizontal="right"),
+        number_format="#,##0.00",
+    )
+    fx_number_style = NamedStyle(
+        name="NumberStyleFx",
+        font=Font(name="Arial", size=8),
+        alignment=Alignment(horizontal="right"),
+        number_format="#,##0.0000",
+    )
+    for row_idx, row in enumerate(df.itertuples(index=False), start=8):
+        for col_idx, value in enumerate(row, start=1):
+            cell = ws.cell(row=row_idx, column=col_idx, value=value)
+            if col_idx <= 6 or col_idx == N_COLUMNS:
+                cell.style = string_style
+            elif col_idx == 10:
+                cell.style = fx_number_style
+            else:
+                cell.style = number_style
+    for row in ws.iter_rows(min_row=1, max_row=ws.max_row):
+        ws.row_dimensions[row[0].row].height = 12
+    del wb["Sheet"]
+    wb.save(filename)
+
+
+def write_streaming(df: pd.DataFrame, filename: str) -> None:
+    wb = Workbook(write_only=True)
+    register_report_styles(wb)
+    writer = ReportSheetWriter(wb.create_sheet("Income"))
+    writer.append_title_rows(
+        [f"Title {row_idx}" for row_idx in range(1, 5)], N_COLUMNS, style=BOLD_TITLE
+    )
+    for header_row in HEADERS:
+        writer.append_row(header_row, COLUMN_HEADER)
+    column_styles = get_column_styles(
+        N_COLUMNS,
+        NUMBER,
+        {STRING: [0, 1, 2, 3, 4, 5, N_COLUMNS - 1], NUMBER_FX: [9]},
+    )
+    writer.append_frame(df, column_styles)
+    wb.save(filename)
+
+
+WRITERS = {"in_memory": write_in_memory, "streaming": write_streaming}
+
+
+def run_writer(name: str, n_rows: int, results) -> None:
+    df = get_frame(n_rows)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, f"{name}.xlsx")
+        start = time.perf_counter()
+        WRITERS[name](df, filename)
+        seconds = time.perf_counter() - start
+        size_mb = os.path.getsize(filename) / 1024**2
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results.put((name, n_rows, seconds, peak_rss, peak_rss - rss_before, size_mb))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000])
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    print(
+        f"{'writer':>10} {'rows':>8} {'seconds':>8} {'peak MB':>8} {'growth MB':>10} {'file MB':>8}"
+    )
+    for n_rows in args.rows:
+        for name in WRITERS:
+            process = ctx.Process(target=run_writer, args=(name, n_rows, results))
+            process.start()
+            process.join()
+            name, n_rows, seconds, peak_rss, growth, size_mb = results.get()
+            print(
+                f"{name:>10} {n_rows:>8} {seconds:>8.2f} {peak_rss:>8.1f} {growth:>10.1f} {size_mb:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
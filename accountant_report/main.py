@@ -11,25 +11,49 @@ Usage:
                             -o s3://d1g1t-client-ca/claret/accountant-reports
 """
 
+import copy
+import getpass
+import hashlib
+import json
 import logging
+import threading
 import time
 import os
 import pathlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from functools import cached_property
 
+from drf_client.exceptions import HttpClientError
 from openpyxl import Workbook
+import fsspec
 import pandas as pd
 import i18n
 
 from ps.base import PSMain
+from ps.parser import ChartTableFormatter
 from exceptions import InputValidationError
 import claret.accountant_report.reports as reports
 from utils.main_utils import valid_date_input
 from claret.accountant_report.lookup import currency_code_to_currency_name
+from claret.accountant_report.sheet_writer import register_report_styles
 
 LOG = logging.getLogger(__name__)
 
+CACHE_MAX_AGE_HOURS = 12
+TOKEN_REFRESH_SECONDS = 45 * 60  # age at which the token is refreshed before a call
+LOG_DETAILS_REPORTS = {
+    "CapitalTransactions",
+    "IncomeReport",
+    "NonCashTransactions",
+    "RealizedGainLossReport",
+    "RealizedGainLossFXReport",
+    "DepositsWithdrawalsFees",
+}
+
+_token_lock = threading.Lock()
+_translator_lock = threading.Lock()
+
 
 class AccountantReport(PSMain):
     """Class to handle Accountant report generation."""
@@ -39,6 +63,16 @@ class AccountantReport(PSMain):
         self.start_date = self.args.start_date
         self.end_date = self.args.end_date
         self.output_location = self.args.output_location
+        self.cache_dir = self.args.cache_dir
+        self.workers = max(1, self.args.workers)
+        # shared by the worker copies, so all accounts together run at most
+        # self.workers calculations at once
+        self._calculation_slots = threading.BoundedSemaphore(self.workers)
+        self.cache_max_age = self.args.cache_max_age
+        self._log_details = dict()
+        self._log_details_requests = dict()
+        self._log_details_responses = dict()
+        self._token_state = {"refreshed_at": None}  # shared by the worker copies
 
     def add_extra_args(self):
         """Add extra cmd line arguments to the script."""
@@ -93,15 +127,62 @@ class AccountantReport(PSMain):
             help="Local or s3 path to save output to",
             required=True,
         )
+        self.parser.add_argument(
+            "--cache-dir",
+            type=str,
+            default=None,
+            help="Local or s3 folder to cache calculation responses in",
+            required=False,
+        )
+        self.parser.add_argument(
+            "--cache-max-age",
+            type=float,
+            default=CACHE_MAX_AGE_HOURS,
+            help="Hours a cached calculation response is used for",
+            required=False,
+        )
+        self.parser.add_argument(
+            "--refresh-cache",
+            action="store_true",
+            help="Fetch calculations again instead of using cached responses",
+            required=False,
+        )
+        self.parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of accounts, and of calculations across them, run concurrently.",
+            required=False,
+        )
 
     @staticmethod
     def _get_report_workbook() -> Workbook:
-        wb = Workbook()
+        """Write-only workbook, reports stream their rows with ReportSheetWriter."""
+        wb = Workbook(write_only=True)
+        register_report_styles(wb)
         return wb
 
     def _save_report_workbook(self):
-        del self._workbook["Sheet"]  # TODO: hack!
+        self._order_report_sheets()
         self._workbook.save(self.report_filename)
+
+    def _rank_new_sheets(self, position: int) -> None:
+        """Ranks the sheets created since the last call under the report at position."""
+        for sheet in self._workbook.worksheets:
+            self._sheet_ranks.setdefault(sheet.title, (position, len(self._sheet_ranks)))
+
+    def _order_report_sheets(self) -> None:
+        """
+        Reports are all constructed before any of them runs, so the sheets are
+        put in the order of the reports that created them, as if each report
+        ran right after it was constructed. Later sheets, like the
+        reconciliation, come last.
+        """
+        self._rank_new_sheets(len(self.reports_to_run))
+        sheets = sorted(self._workbook.worksheets, key=lambda x: self._sheet_ranks[x.title])
+        for idx, sheet in enumerate(sheets):
+            self._workbook.move_sheet(sheet.title, idx - self._workbook.index(sheet))
     
     @cached_property
     def trxs_start_date(self) -> str:
@@ -146,23 +227,31 @@ class AccountantReport(PSMain):
         today = datetime.today().strftime("%Y-%m-%d")
         return f"Claret_AccountantReport_{account_fpk}_{today}.xlsx"
     
-    def get_translator(self, lang_code: str = 'en'):
+    @staticmethod
+    def configure_translations() -> None:
+        """Sets up python-i18n, whose settings are global, once before accounts run."""
         i18n.load_path.clear()
 
         dir_path = pathlib.Path(__file__).parent.resolve()
         translation_path = os.path.join(dir_path, "data", "translations")
         i18n.load_path.append(translation_path)
-        
+
         i18n.set("file_format", "json")
-        i18n.set("filename_format", "{locale}.{format}") 
-        i18n.set("locale", lang_code)                       
-        i18n.set("fallback", "en")                     
+        i18n.set("filename_format", "{locale}.{format}")
+        i18n.set("fallback", "en")
         i18n.set("deep_key_transformer", lambda k: k)
 
-        # i18n.t("dummy") #Force-load the translation file (first .t() does that)
-        return i18n.t
-
+    @staticmethod
+    def get_translator(lang_code: str = 'en'):
+        """
+        Translates to lang_code. i18n loads translation files lazily into its
+        global store on lookups, so concurrent accounts translate one at a time.
+        """
+        def translate(key: str, **kwargs) -> str:
+            with _translator_lock:
+                return i18n.t(key, locale=lang_code, **kwargs)
 
+        return translate
 
     @staticmethod
     def _parse_account_info(response: dict) -> None:
@@ -173,9 +262,12 @@ class AccountantReport(PSMain):
 
     def get_account_info(self, account_fpk: str) -> dict:
         """Make api call to get all account information."""
-        api_call = self.api.data.accounts
-        api_call._store["base_url"] += f"{account_fpk}/"
-        response = api_call.get(extra="limit=10")
+        def get_account():
+            api_call = self.api.data.accounts
+            api_call._store["base_url"] += f"{account_fpk}/"
+            return api_call.get(extra="limit=10")
+
+        response = self.call_api(get_account)
         if response:
             self._parse_account_info(response)
             return response
@@ -189,6 +281,154 @@ class AccountantReport(PSMain):
         dir_path = pathlib.Path(__file__).parent.resolve()
         return os.path.join(dir_path, "data", "payloads", payload_filename)
     
+    @staticmethod
+    def get_payload_hash(payload: dict) -> str:
+        """Stable hash of a calculation payload."""
+        payload_str = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(payload_str.encode()).hexdigest()
+
+    def get_log_details_key(self, payload: dict) -> str:
+        """
+        Hash of a log-details payload without its metrics. Payloads with the
+        same key select the same transactions, so one call requesting all of
+        their metrics serves them all.
+        """
+        return self.get_payload_hash(
+            {key: value for key, value in payload.items() if key != "metrics"}
+        )
+
+    @staticmethod
+    def get_metric_slugs(payload: dict) -> set:
+        return {metric["slug"] for metric in payload["metrics"]["selected"]}
+
+    def merge_log_details_payloads(self, payloads: list) -> dict:
+        """First payload with the metrics of the others added, each slug once."""
+        merged = copy.deepcopy(payloads[0])
+        selected = merged["metrics"]["selected"]
+        slugs = self.get_metric_slugs(merged)
+        for payload in payloads[1:]:
+            for metric in payload["metrics"]["selected"]:
+                if metric["slug"] not in slugs:
+                    selected.append(copy.deepcopy(metric))
+                    slugs.add(metric["slug"])
+        return merged
+
+    def plan_log_details(self, payloads: list) -> None:
+        """Merges the payloads of an account's reports into one request per key."""
+        groups = dict()
+        for payload in payloads:
+            groups.setdefault(self.get_log_details_key(payload), []).append(payload)
+        self._log_details_requests = {
+            key: self.merge_log_details_payloads(group) for key, group in groups.items()
+        }
+
+    def _get_cache_file(self, request_hash: str) -> str:
+        return f"{self.cache_dir}/log-details-{request_hash}.json"
+
+    def _read_cached_response(self, request_hash: str):
+        """
+        Cached response of a request. None when there is none, when it is older
+        than --cache-max-age hours or when --refresh-cache is set, so re-runs
+        pick up upstream data fixes.
+        """
+        if not self.cache_dir or self.args.refresh_cache:
+            return None
+        cache_file = self._get_cache_file(request_hash)
+        try:
+            with fsspec.open(cache_file, "r") as infile:
+                cached = json.load(infile)
+        except FileNotFoundError:
+            return None
+        except Exception as err:
+            LOG.warning(f"Could not read cached response {cache_file}: {err}")
+            return None
+
+        age_hours = (time.time() - cached.get("fetched_at", 0)) / 3600
+        if age_hours > self.cache_max_age:
+            LOG.info(f"Cached response {cache_file} is too old, fetching it again...")
+            return None
+        return cached["response"]
+
+    def _write_cached_response(self, request_hash: str, response: dict) -> None:
+        if not self.cache_dir:
+            return
+        cache_file = self._get_cache_file(request_hash)
+        try:
+            with fsspec.open(cache_file, "w", auto_mkdir=True) as outfile:
+                json.dump({"fetched_at": time.time(), "response": response}, outfile)
+        except Exception as err:
+            LOG.warning(f"Could not cache response to {cache_file}: {err}")
+
+    def select_response_metrics(self, response: dict, request: dict, payload: dict) -> dict:
+        """
+        Response to a merged request as payload alone would have got it: the
+        categories of the other metrics are dropped and those of payload's
+        metrics listed in payload's order.
+        """
+        metric_order = {
+            metric["slug"]: idx
+            for idx, metric in enumerate(payload["metrics"]["selected"])
+        }
+        other_metrics = self.get_metric_slugs(request) - set(metric_order)
+        categories = [x for x in response["categories"] if x["id"] not in other_metrics]
+        metric_categories = iter(
+            sorted(
+                (x for x in categories if x["id"] in metric_order),
+                key=lambda x: metric_order[x["id"]],
+            )
+        )
+        categories = [
+            next(metric_categories) if x["id"] in metric_order else x
+            for x in categories
+        ]
+        return dict(response, categories=categories)
+
+    def get_log_details_response(self, key: str) -> dict:
+        """Response to the request of key, from memory, the cache or the api."""
+        request = self._log_details_requests[key]
+        request_hash = self.get_payload_hash(request)
+        cached = self._log_details_responses.get(key)
+        if cached is None or cached[0] != request_hash:
+            response = self._read_cached_response(request_hash)
+            if response is None:
+                response = self.get_calculation("log-details", request)
+                self._write_cached_response(request_hash, response)
+            else:
+                LOG.info(f"Using cached log-details response {request_hash[:12]}...")
+            cached = (request_hash, response)
+            self._log_details_responses[key] = cached
+        return cached[1]
+
+    def get_log_details(self, payload: dict) -> pd.DataFrame:
+        """
+        Parsed log-details calculation for a transactions report payload.
+
+        Payloads differing only in their metrics share one call requesting all
+        of them, see plan_log_details. Each report parses the response with
+        only its own metric categories, which gives the frame its payload alone
+        would return. Each report gets its own copy.
+        """
+        payload_hash = self.get_payload_hash(payload)
+        if payload_hash not in self._log_details:
+            key = self.get_log_details_key(payload)
+            request = self._log_details_requests.get(key)
+            if request is None:
+                self._log_details_requests[key] = copy.deepcopy(payload)
+            elif not self.get_metric_slugs(payload) <= self.get_metric_slugs(request):
+                # not planned, the request of its key is extended and fetched again
+                self._log_details_requests[key] = self.merge_log_details_payloads(
+                    [request, payload]
+                )
+            response = self.get_log_details_response(key)
+
+            if self._log_details_requests[key] != payload:
+                response = self.select_response_metrics(
+                    response, self._log_details_requests[key], payload
+                )
+            parsed = ChartTableFormatter(response, payload).parse_data()
+            self._log_details[payload_hash] = parsed
+        return self._log_details[payload_hash].copy()
+
     def get_accounts_list(self) -> set:
         if self.args.account_fpk:
             return {self.args.account_fpk}
@@ -207,16 +447,32 @@ class AccountantReport(PSMain):
 
         self.report_filename = self.get_report_filename(account_fpk)
         self._workbook = self._get_report_workbook()
+        self._sheet_ranks = dict()  # sheet title -> (report position, creation order)
         self.recon = dict()  # Gathers data for reconciliation
+        self._log_details = dict()  # Parsed log-details shared by reports
+        self._log_details_requests = dict()
+        self._log_details_responses = dict()
 
-        for report_to_run in self.reports_to_run:
-            LOG.info(f"Running {report_to_run} report for {account_fpk}...")
+        account_reports = []
+        for position, report_to_run in enumerate(self.reports_to_run):
             try:
                 report_cls = getattr(reports, report_to_run)
-                report = report_cls(self)
+                account_reports.append((report_to_run, report_cls(self)))
+            except Exception as err:
+                LOG.error(f"Unexpected error running {report_to_run} report for {account_fpk}: {err}!")
+            self._rank_new_sheets(position)
+
+        self.plan_log_details(self.get_log_details_payloads(account_reports))
+        if self.workers > 1:
+            self.prefetch_log_details()
+
+        for report_to_run, report in account_reports:
+            LOG.info(f"Running {report_to_run} report for {account_fpk}...")
+            try:
                 report.run()
             except Exception as err:
                 LOG.error(f"Unexpected error running {report_to_run} report for {account_fpk}: {err}!")
+            self._rank_new_sheets(self.reports_to_run.index(report_to_run))
 
         if self.all_reports_run_successfully:
             LOG.info(f"Running reconciliation report for {account_fpk}...")
@@ -231,19 +487,123 @@ class AccountantReport(PSMain):
         self._save_report_workbook()
 
 
+    @staticmethod
+    def get_log_details_payloads(account_reports: list) -> list:
+        """Payloads of the transaction reports, failures are left for the report to log."""
+        payloads = []
+        for report_to_run, report in account_reports:
+            if report_to_run in LOG_DETAILS_REPORTS:
+                try:
+                    payloads.append(report.get_calculation_payload())
+                except Exception as err:
+                    LOG.warning(f"Could not get {report_to_run} payload: {err}")
+        return payloads
+
+    def prefetch_log_details(self) -> None:
+        """
+        Fetches the planned log-details requests concurrently so the reports,
+        which share one workbook, can then run one after the other. The calls
+        take their turn in the calculation slots shared by all accounts.
+        Failures are left for the report itself to raise and log.
+        """
+        keys = list(self._log_details_requests)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.get_log_details_response, x) for x in keys]
+            for future in as_completed(futures):
+                if future.exception():
+                    LOG.warning(f"Could not prefetch log-details: {future.exception()}")
+
+    def login(self) -> bool:
+        """Logs in, keeping the password to refresh the token with."""
+        self._password = getpass.getpass()
+        ok = self.api.login(username=self.args.username, password=self._password)
+        if ok:
+            LOG.info(f"Welcome {self.args.username}")
+            self._token_state["refreshed_at"] = time.time()
+        return ok
+
+    def refresh_api_token(self) -> None:
+        """Logs in again, resources created afterwards use the new token."""
+        if not self.api.login(username=self.args.username, password=self._password):
+            raise HttpClientError("Could not refresh the api token!")
+
+    def refresh_api_token_if_expired(self, rejected_token: str = None) -> None:
+        """
+        Refreshes the token shared by all workers once it is old enough, or
+        when rejected_token was refused and no other worker has replaced it.
+        """
+        with _token_lock:
+            refreshed_at = self._token_state["refreshed_at"]
+            if rejected_token is not None:
+                expired = rejected_token == self.api.token
+            elif refreshed_at is None:
+                self._token_state["refreshed_at"] = time.time()
+                expired = False
+            else:
+                expired = time.time() - refreshed_at >= TOKEN_REFRESH_SECONDS
+            if expired:
+                LOG.info("Refreshing the api token...")
+                self.refresh_api_token()
+                self._token_state["refreshed_at"] = time.time()
+
+    def call_api(self, func, *args, **kwargs):
+        """
+        Runs func, which makes one api request, refreshing the token before
+        it when the token is old and retrying once if the token is refused.
+        """
+        self.refresh_api_token_if_expired()
+        token = self.api.token
+        try:
+            return func(*args, **kwargs)
+        except HttpClientError as err:
+            response = getattr(err, "response", None)
+            if response is None or response.status_code != 401:
+                raise
+        self.refresh_api_token_if_expired(rejected_token=token)
+        return func(*args, **kwargs)
+
+    def get_calculation(self, calc_string: str, payload: dict):
+        with self._calculation_slots:
+            return self.call_api(super().get_calculation, calc_string, payload)
+
+    def get_fx_data(self, fx_params: dict):
+        return self.call_api(super().get_fx_data, fx_params)
+
+    def run_account(self, account_fpk: str) -> None:
+        """
+        Runs the reports of one account on a copy of this object, so workers
+        share the api connection and token but not the account state.
+        """
+        worker = copy.copy(self)
+        worker.run_single_account_accountant_report(account_fpk)
+
     def after_login(self):
         """After login gets the specific report and runs it"""
-        start = time.time()
+        self.configure_translations()
         self.accounts_list = self.get_accounts_list()
-        for account_fpk in self.accounts_list:
-            elapsed_time  = time.time() - start
-            if elapsed_time >= 5: # 45 mins
-                self.refresh_api_token()
-                start = time.time()
-            try:
-                self.run_single_account_accountant_report(account_fpk)
-            except Exception as err:
-                LOG.error(f"Unexpected error running report for {account_fpk} : {err}")
+        total = len(self.accounts_list)
+        failures = dict()
+        if not total:
+            LOG.info("No accounts to run accountant reports for.")
+            return failures
+        workers = min(self.workers, total)
+        LOG.info(f"Running accountant reports for {total} accounts with {workers} workers...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.run_account, account_fpk): account_fpk
+                for account_fpk in self.accounts_list
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                account_fpk = futures[future]
+                err = future.exception()
+                if err is not None:
+                    failures[account_fpk] = err
+                    LOG.error(f"Unexpected error running report for {account_fpk} : {err}")
+                LOG.info(f"Finished {done}/{total} accounts ({len(failures)} failed).")
+
+        for account_fpk, err in failures.items():
+            LOG.error(f"Accountant report failed for {account_fpk}: {err}")
+        return failures
 
 
 
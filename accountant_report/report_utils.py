@@ -4,78 +4,50 @@ warnings.simplefilter(action="ignore", category=FutureWarning)
 
 import pandas as pd
 import numpy as np
-from openpyxl.cell.cell import MergedCell
 
 PAYLOAD_PAGINATION_SIZE = 5000
 DEFAULT_DATE_FORMAT = "%Y-%m-%d"
+DEFAULT_TOTAL_PREFIX = "Total -"
 
 
-def _get_summation_frame(frame: pd.DataFrame, total_prefix) -> pd.DataFrame:
-    df = frame.copy()
-    for col in df.select_dtypes(
-        "object"
-    ).columns:  # TODO: Change this to use the grouping_fields
-        data = df[col].astype(str)
-        total_idx = data.str.startswith(total_prefix)
-        df = df[~total_idx]
-    return df
+# Place of a row within its node: header rows, child rows, total, empty row
+_HEADER, _ROWS, _TOTAL, _AFTER_TOTAL = 0, 1, 2, 3
 
 
-def _get_total_row(
-    df: pd.DataFrame,
-    columns: str,
-    labels: str,
-    sum_columns: list,
-    total_prefix=None,
-) -> pd.DataFrame:
-    row_dict = {col: [label] for col, label in zip(columns, labels)}
-
-    if total_prefix:
-        last_column, last_label = columns[-1], labels[-1]
-        row_dict.pop(last_column)
-        row_dict[last_column] = [f"{total_prefix} {last_label}"]
-
-    row = pd.DataFrame(row_dict)
-    row[sum_columns] = df[sum_columns].fillna(0).sum()
-    if len(columns) == 1:
-        row.loc[max(row.index) + 1, :] = pd.NA
-    return row
-
-
-def _get_grand_total(df: pd.DataFrame, sum_columns: list, total_prefix) -> pd.DataFrame:
-    sum_frame = _get_summation_frame(df, total_prefix)
-    columns = [df.columns[0]]
-    labels = ["Grand Total"]
-    total = _get_total_row(
-        sum_frame, columns=columns, labels=labels, sum_columns=sum_columns
-    )
-    return total
+def _get_total_like_rows(frame: pd.DataFrame, total_prefix: str) -> np.ndarray:
+    """Rows with a text value starting with total_prefix, left out of sums."""
+    res = np.zeros(len(frame), dtype=bool)
+    for col, dtype in frame.dtypes.items():
+        if pd.api.types.is_string_dtype(dtype):
+            res |= frame[col].astype(str).str.startswith(total_prefix).to_numpy()
+    return res
+
+
+def _get_sort_keys(n_rows: int, *keys) -> list:
+    """Sort keys of n_rows rows, scalar keys are repeated for every row."""
+    return [np.broadcast_to(key, n_rows) for key in keys]
 
 
-def _shift_non_grouping_fields(df: pd.DataFrame, grouping_fields: list):
-    shift_cols = [x for x in df.columns if x not in grouping_fields]
-    df.loc[max(df.index) + 1, :] = pd.NA
-    df[shift_cols] = df[shift_cols].shift(1)
-    df[grouping_fields] = df[grouping_fields].fillna(method="ffill")
+def _get_ordered_rows(parts: list, columns: pd.Index) -> pd.DataFrame:
+    """
+    Concatenates (frame, sort_keys) parts once and orders the rows by their
+    sort keys, the first key being the most significant.
+    """
+    frame = pd.concat([part for part, _ in parts], ignore_index=True)
+    keys = [np.concatenate(level_keys) for level_keys in zip(*[x for _, x in parts])]
+    order = np.lexsort(keys[::-1])
+    return frame.take(order).reset_index(drop=True)[columns]
 
 
-def _get_summation_group(df: pd.DataFrame, grouping_fields: list) -> pd.DataFrame:
-    dx = df.reset_index().drop(columns=["index"])
-    field_length = len(grouping_fields)
-    if field_length > 1:
-        _shift_non_grouping_fields(dx, grouping_fields)
-        dx.loc[max(dx.index) + 1, :] = pd.NA  # insert empty row at last
-        shift_cols = [x for x in dx.columns if x not in grouping_fields[:-1]]
-        dx[shift_cols] = dx[shift_cols].shift(1)
-        dx[grouping_fields[:-1]] = dx[grouping_fields[:-1]].fillna(method="ffill")
-    return dx
+def _get_empty_rows(n_rows: int) -> pd.DataFrame:
+    return pd.DataFrame(index=range(n_rows))
 
 
 def generate_group_totals(
     frame: pd.DataFrame,
     grouping_fields: list,
     sum_columns: list,
-    total_prefix="Total -",
+    total_prefix=DEFAULT_TOTAL_PREFIX,
     grand_total_sum_columns: list = None,
     grand_total_prefix: str = None,
 ) -> pd.DataFrame:
@@ -98,44 +70,108 @@ def get_individual_group_totals(
     frame: pd.DataFrame,
     grouping_fields: list,
     sum_columns: list,
-    total_prefix="Total -",
+    total_prefix=DEFAULT_TOTAL_PREFIX,
     grand_total_sum_columns: list = None,
     grand_total_prefix: str = None,
 ) -> pd.DataFrame:
     """Function to get summation of datatable based on grouping_fields
-    with totals at the bottom of each node."""
-    if grouping_fields:
-        container = []
-        groups = frame.groupby(grouping_fields, sort=False)
-        for labels, _df in groups:
-            _df = _get_summation_group(_df, grouping_fields)
-            sum_frame = _get_summation_frame(_df, total_prefix)
-            total = _get_total_row(
-                sum_frame,
-                grouping_fields,
-                labels,
-                sum_columns,
-                total_prefix=total_prefix,
-            )
-            label_result = pd.concat([_df, total])
-            container.append(label_result)
-        result = pd.concat(container, ignore_index=True)
-        return get_individual_group_totals(
-            result,
-            grouping_fields[:-1],
-            sum_columns,
-            grand_total_prefix=grand_total_prefix,
-            grand_total_sum_columns=grand_total_sum_columns,
+    with totals at the bottom of each node.
+
+    A node of grouping_fields[:k] starts, below the first level, with a row of
+    its parent labels and one of its own labels. Its child nodes (its rows on
+    the last level) follow in order of appearance and it ends with its total,
+    followed by an empty row on the first level. The result is enclosed by an
+    empty row and the grand total.
+
+    The totals of every level are rolled up from one groupby of the last
+    level, and the rows are put in place with a single sort instead of being
+    concatenated node by node. Rows without all grouping fields are dropped.
+    """
+    n_levels = len(grouping_fields)
+    columns = frame.columns
+    data = frame.dropna(subset=grouping_fields).reset_index(drop=True)
+    if n_levels and data.empty:
+        raise ValueError("No rows to compute group totals for!")
+    n_rows = len(data)
+    parts = []
+
+    if n_levels:
+        # Last level nodes, numbered in order of appearance
+        leaf_ids = data.groupby(grouping_fields, sort=False).ngroup().to_numpy()
+        n_leaves = leaf_ids.max() + 1
+        first_rows = np.unique(leaf_ids, return_index=True)[1]
+        leaf_keys = data[grouping_fields].iloc[first_rows].reset_index(drop=True)
+        summed = ~_get_total_like_rows(data, total_prefix)
+        leaf_sums = (
+            data.loc[summed, sum_columns]
+            .fillna(0)
+            .groupby(leaf_ids[summed])
+            .sum()
+            .reindex(range(n_leaves), fill_value=0)
         )
+
+        # Node of each leaf on every level, numbered in order of appearance
+        level_ids = [
+            leaf_keys.groupby(grouping_fields[:level], sort=False).ngroup().to_numpy()
+            for level in range(1, n_levels + 1)
+        ]
+        row_keys = []
+        for ids in level_ids:
+            row_keys += [ids[leaf_ids], _ROWS]
+        parts.append((data, _get_sort_keys(n_rows, 1, *row_keys, np.arange(n_rows))))
+
+        for level in range(1, n_levels + 1):
+            ids = level_ids[level - 1]
+            first_leaves = np.unique(ids, return_index=True)[1]
+            n_nodes = len(first_leaves)
+            labels = leaf_keys.iloc[first_leaves].reset_index(drop=True)
+            node_keys = []
+            for parent_ids in level_ids[: level - 1]:
+                node_keys += [parent_ids[first_leaves], _ROWS]
+            node_ids = ids[first_leaves]
+            deeper_keys = [0, 0] * (n_levels - level)
+
+            def _get_node_keys(section, position):
+                return _get_sort_keys(
+                    n_nodes,
+                    1,
+                    *node_keys,
+                    node_ids,
+                    section,
+                    *deeper_keys,
+                    position,
+                )
+
+            if level > 1:
+                parent_header = labels[grouping_fields[: level - 1]]
+                parts.append((parent_header, _get_node_keys(_HEADER, 0)))
+                header = labels[grouping_fields[:level]]
+                parts.append((header, _get_node_keys(_HEADER, 1)))
+
+            prefix = total_prefix if level == n_levels else DEFAULT_TOTAL_PREFIX
+            total = labels[grouping_fields[:level]].copy()
+            last_field = grouping_fields[level - 1]
+            total[last_field] = [f"{prefix} {label}" for label in total[last_field]]
+            total[sum_columns] = leaf_sums.groupby(ids).sum().to_numpy()
+            parts.append((total, _get_node_keys(_TOTAL, 0)))
+            if level == 1:
+                parts.append((_get_empty_rows(n_nodes), _get_node_keys(_AFTER_TOTAL, 0)))
     else:
-        _sum_cols = (
-            sum_columns if not grand_total_sum_columns else grand_total_sum_columns
-        )
-        _prefix = total_prefix if not grand_total_prefix else grand_total_prefix
-        grand_total = _get_grand_total(frame, _sum_cols, _prefix)
-        nan_row = pd.DataFrame([[pd.NA] * len(frame.columns)], columns=frame.columns)
-        res = pd.concat([nan_row, frame, grand_total], ignore_index=True)
-        return res
+        parts.append((data, _get_sort_keys(n_rows, 1, np.arange(n_rows))))
+
+    _sum_cols = sum_columns if not grand_total_sum_columns else grand_total_sum_columns
+    _prefix = total_prefix if not grand_total_prefix else grand_total_prefix
+    summed = ~_get_total_like_rows(data, _prefix)
+    grand_total = pd.DataFrame({columns[0]: ["Grand Total"]})
+    grand_total[_sum_cols] = data.loc[summed, _sum_cols].fillna(0).sum().to_numpy()
+    n_keys = len(parts[0][1])
+    parts += [
+        (_get_empty_rows(1), _get_sort_keys(1, 0, *[0] * (n_keys - 1))),
+        (grand_total, _get_sort_keys(1, 2, *[0] * (n_keys - 1))),
+        (_get_empty_rows(1), _get_sort_keys(1, 3, *[0] * (n_keys - 1))),
+    ]
+    return _get_ordered_rows(parts, columns)
+
 
 def get_group_with_no_totals(
     frame: pd.DataFrame,
@@ -145,14 +181,18 @@ def get_group_with_no_totals(
     f"""Function to get summation of datatable based on {grouping_fields}
         with totals at the bottom of each node. The order of grouping_fields is very important"""
     first_group_name = grouping_fields[0]
-    first_group_list = np.unique(frame[first_group_name])
-    res = pd.DataFrame(columns=frame.columns)
-    for first_group_item in first_group_list:
-        first_group_first_row_df = pd.DataFrame(columns=frame.columns)
-        first_group_first_row_df["Group"] = [currency_code_to_name[first_group_item]]
-        tmp_df = frame[frame[first_group_name].isin([first_group_item])].copy()
-        res = pd.concat([res, first_group_first_row_df,tmp_df])
-    return res
+    data = frame.reset_index(drop=True)
+    n_rows = len(data)
+    codes, first_group_list = pd.factorize(data[first_group_name], sort=True)
+    header = pd.DataFrame(
+        {"Group": [currency_code_to_name[item] for item in first_group_list]}
+    )
+    n_groups = len(header)
+    parts = [
+        (data, _get_sort_keys(n_rows, codes, _ROWS, np.arange(n_rows))),
+        (header, _get_sort_keys(n_groups, np.arange(n_groups), _HEADER, 0)),
+    ]
+    return _get_ordered_rows(parts, frame.columns.union(["Group"], sort=False))
 
 
 def get_group_totals_with_currency(
@@ -166,56 +206,59 @@ def get_group_totals_with_currency(
     first_group_name = grouping_fields[0]
     second_group_name = grouping_fields[1]
     third_group_name = grouping_fields[2]
-    first_group_list = np.unique(frame[first_group_name])
-    res = pd.DataFrame(columns=frame.columns)
-    all_total = pd.DataFrame(columns=frame.columns)
-    all_total[first_group_name] = ["NET INCOME"]
-    all_total[sum_columns[-3:]] = [frame[sum_columns[-3:]].sum()]
-    for first_group_item in first_group_list:
-        first_group_first_row_df = pd.DataFrame(columns=frame.columns)
-        first_group_first_row_df[first_group_name] = [first_group_item]
-        tmp_df = frame[frame[first_group_name].isin([first_group_item])].copy()
-        first_group_total = pd.DataFrame(columns=frame.columns)
-        first_group_total[sum_columns[-3:]] = [tmp_df[sum_columns[-3:]].sum()]
-        first_group_total[first_group_name] = ["Total - " + first_group_item]
-        res = pd.concat([res, first_group_first_row_df])
-        second_group_list = np.unique(tmp_df[second_group_name])
-        for second_group_item in second_group_list:
-            second_group_first_row_df = pd.DataFrame(columns=frame.columns)
-            second_group_first_row_df[second_group_name] = [
-                currency_code_to_name[second_group_item]
-            ]
-            tmp_df_2 = tmp_df[
-                tmp_df[second_group_name].isin([second_group_item])
-            ].copy()
-            second_group_total = pd.DataFrame(columns=frame.columns)
-            second_group_total[sum_columns] = [tmp_df_2[sum_columns].sum()]
-            second_group_total[second_group_name] = [
-                "Total - " + currency_code_to_name[second_group_item]
-            ]
-            res = pd.concat([res, second_group_first_row_df])
-            third_group_list = np.unique(tmp_df_2[third_group_name])
-            for third_group_item in third_group_list:
-                third_group_first_row_df = pd.DataFrame(columns=frame.columns)
-                third_group_first_row_df[third_group_name] = [
-                    third_group_item# + " (" + second_group_item + ")"
-                ]
-                tmp_df_3 = tmp_df_2[
-                    tmp_df_2[third_group_name].isin([third_group_item])
-                ].copy()
-                tmp_df_3[grouping_fields] = ""
-                third_group_total = pd.DataFrame(columns=frame.columns)
-                third_group_total[sum_columns] = [tmp_df_3[sum_columns].sum()]
-                third_group_total[third_group_name] = [
-                    "Total - " + third_group_item# + " (" + second_group_item + ")"
-                ]
-                res = pd.concat(
-                    [res, third_group_first_row_df, tmp_df_3, third_group_total]
-                )
-            res = pd.concat([res, second_group_total])
-        res = pd.concat([res, first_group_total])
-    res = pd.concat([res, all_total])
-    return res
+    level_fields = [first_group_name, second_group_name, third_group_name]
+    net_columns = sum_columns[-3:]
+    data = frame.reset_index(drop=True)
+    n_rows = len(data)
+
+    # Nodes are in sorted order of their labels, rows keep their order
+    codes = [pd.factorize(data[col], sort=True)[0] for col in level_fields]
+    row_keys = []
+    for level_codes in codes:
+        row_keys += [level_codes, _ROWS]
+    rows = data.copy()
+    rows[grouping_fields] = ""
+    parts = [(rows, _get_sort_keys(n_rows, 0, *row_keys, np.arange(n_rows)))]
+
+    for level in range(1, 4):
+        field = level_fields[level - 1]
+        node_sums = data.groupby(codes[:level]).agg(
+            {**{col: "sum" for col in sum_columns}, field: "first"}
+        )
+        node_codes = node_sums.index.to_frame(index=False).to_numpy().T
+        n_nodes = len(node_sums)
+        labels = node_sums[field].tolist()
+        if level == 2:
+            labels = [currency_code_to_name[item] for item in labels]
+        node_keys = []
+        for parent_codes in node_codes[:-1]:
+            node_keys += [parent_codes, _ROWS]
+        deeper_keys = [0, 0] * (3 - level)
+        header = pd.DataFrame({field: labels})
+        parts.append(
+            (
+                header,
+                _get_sort_keys(
+                    n_nodes, 0, *node_keys, node_codes[-1], _HEADER, *deeper_keys, 0
+                ),
+            )
+        )
+        total_columns = net_columns if level == 1 else sum_columns
+        total = node_sums[total_columns].reset_index(drop=True)
+        total[field] = ["Total - " + label for label in labels]
+        parts.append(
+            (
+                total,
+                _get_sort_keys(
+                    n_nodes, 0, *node_keys, node_codes[-1], _TOTAL, *deeper_keys, 0
+                ),
+            )
+        )
+
+    all_total = pd.DataFrame({first_group_name: ["NET INCOME"]})
+    all_total[net_columns] = data[net_columns].sum().to_numpy()
+    parts.append((all_total, _get_sort_keys(1, 1, *[0] * 6, 0)))
+    return _get_ordered_rows(parts, frame.columns)
 
 
 def remove_unheld_positions(df: pd.DataFrame, position_col: str) -> pd.DataFrame:
@@ -233,12 +276,6 @@ def set_pagination_size(payload: dict) -> None:
         payload["pagination"]["size"] = PAYLOAD_PAGINATION_SIZE
 
 
-def update_cell_range_values(cell_range: tuple, values: list) -> None:
-    cells = [c for c in cell_range if type(c) != MergedCell]
-    for cell, header in zip(cells, values):
-        cell.value = header
-
-
 def set_trx_payload_custom_date_range(
     payload: dict, start: str, end: str, months: int = 3
 ) -> None:
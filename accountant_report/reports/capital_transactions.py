@@ -1,10 +1,6 @@
 import logging
 
 import pandas as pd
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import Alignment, Font, Border, Side
-
-from ps.parser import ChartTableFormatter
 from utils.main_utils import get_json
 from claret.accountant_report.main import AccountantReport
 from claret.accountant_report.reports.tax_prep import TaxPrepReport
@@ -12,7 +8,15 @@ from claret.accountant_report.report_utils import (
     generate_group_totals,
     set_pagination_size,
     set_trx_payload_custom_date_range,
-    update_cell_range_values,
+)
+from claret.accountant_report.sheet_writer import (
+    AMOUNT,
+    DECIMAL,
+    RATE,
+    TEXT,
+    UNDERLINE,
+    ReportSheetWriter,
+    get_column_styles,
 )
 from claret.accountant_report import lookup
 
@@ -235,23 +239,22 @@ class CapitalTransactions:
         return res[self.report_columns]
 
     def generate_worksheet(self, df) -> None:
-        sheet = self.report_sheet
-
-        # Merge cells for the headers
-        sheet.merge_cells("A1:O1")
-        sheet.merge_cells("A2:O2")
-        sheet.merge_cells("A3:O3")
-
-        # Add headers to the merged cells
-        sheet["A1"] = "CAPITAL TRANSACTION SUMMARY - SETTLED TRADES"
-        sheet["A2"] = self.account_info["name"]
-        sheet["A3"] = f"From {self.report.trxs_start_date} to {self.report.end_date}"
-        sheet["A4"] = self.report_header
-
-        # Center align the headers
-        for row in range(1, 4):
-            cell = sheet[f"A{row}"]
-            cell.alignment = Alignment(horizontal="center", vertical="center")
+        # Adjust column widths
+        col_widths = {col: 1 for col in "ABCP"}
+        col_widths.update({col: 7 for col in "DEFHIJKLMNO"})
+        col_widths.update({"G": 33})
+        writer = ReportSheetWriter(self.report_sheet, col_widths)
+
+        # Merged and centered headers
+        writer.append_title_rows(
+            [
+                "CAPITAL TRANSACTION SUMMARY - SETTLED TRADES",
+                self.account_info["name"],
+                f"From {self.report.trxs_start_date} to {self.report.end_date}",
+            ],
+            n_columns=15,
+        )
+        writer.append_row([self.report_header])
 
         def _first_header():
             cash_real = ["Cash", "Realized"]
@@ -284,55 +287,26 @@ class CapitalTransactions:
                 + ["Rep. Cur."] * 2
             )
 
-        update_cell_range_values(sheet[5:5], _first_header())
-        update_cell_range_values(sheet[6:6], _second_header())
-        update_cell_range_values(sheet[7:7], _third_header())
-
-        # underline rows A to O
-        underline = Border(bottom=Side(style="thin"))
-        for cell in sheet[7:7]:  # Rows A7 -> O7
-            cell.border = underline
+        writer.append_row(_first_header())
+        writer.append_row(_second_header())
+        writer.append_row(_third_header(), style=UNDERLINE)  # underline A7 -> O7
 
-        for row in dataframe_to_rows(df, index=False, header=False):
-            sheet.append(row)
+        column_styles = get_column_styles(
+            len(self.report_columns),
+            TEXT,
+            {AMOUNT: [5, 7, 8, 11, 13], RATE: [10, 12], DECIMAL: [9, 14]},
+        )
+        writer.append_frame(df, column_styles)
 
         # Legend
-        last_row = sheet.max_row + 1
-        sheet[f"A{last_row}"] = "Legend"
-        for i, (key, value) in enumerate(
-            lookup.ASSETCLASS_ID_MAP.items(), start=last_row + 1
-        ):
-            sheet[f"A{i}"] = f"{value} - {key}"
-
-        # Define the font style
-        font_style = Font(name="Arial", size=8)
-
-        # Apply the styling to all cells in the sheet
-        for row_idx, row in enumerate(sheet.iter_rows()):
-            for cell in row:
-                cell.font = font_style
-            if row_idx >= 8:
-                for idx in [5, 7, 8, 11, 13]:
-                    row[idx].number_format = "#,##0.00"
-                for idx in [10, 12]:
-                    row[idx].number_format = "0.0000"
-                for idx in [9, 14]:
-                    row[idx].number_format = "0.00"
-            sheet.row_dimensions[row_idx].height = 12
-
-        # Adjust column widths
-        col_widths = {col: 1 for col in "ABCP"}
-        col_widths.update({col: 7 for col in "DEFHIJKLMNO"})
-        col_widths.update({"G": 33})
-        for col, width in col_widths.items():
-            sheet.column_dimensions[col].width = width
+        writer.append_row(["Legend"])
+        for key, value in lookup.ASSETCLASS_ID_MAP.items():
+            writer.append_row([f"{value} - {key}"])
 
     def run(self):
         payload = self.get_calculation_payload()
         try:
-            response = self.report.get_calculation("log-details", payload)
-            prser = ChartTableFormatter(response, payload)
-            parsed_response = prser.parse_data()
+            parsed_response = self.report.get_log_details(payload)
             res = self.parse_report(parsed_response)
             self.generate_worksheet(res)
         except Exception as err:
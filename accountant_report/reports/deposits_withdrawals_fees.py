@@ -6,10 +6,6 @@ warnings.simplefilter(action="ignore", category=(FutureWarning, SettingWithCopyW
 import logging
 
 import pandas as pd
-from openpyxl.styles import Alignment, Border, Side, Font
-from openpyxl.utils.dataframe import dataframe_to_rows
-
-from ps.parser import ChartTableFormatter
 from utils.main_utils import get_json
 from claret.accountant_report.main import AccountantReport
 from claret.accountant_report.report_utils import (
@@ -18,6 +14,15 @@ from claret.accountant_report.report_utils import (
     set_trx_payload_custom_date_range,
     get_client_required_date_format,
 )
+from claret.accountant_report.sheet_writer import (
+    AMOUNT,
+    RATE,
+    TEXT,
+    TITLE,
+    UNDERLINE,
+    ReportSheetWriter,
+    get_column_styles,
+)
 from lookup import currency_code_to_currency_name
 
 LOG = logging.getLogger(__name__)
@@ -189,23 +194,21 @@ class DepositsWithdrawalsFees:
         return res[self.report_columns]
 
     def generate_worksheet(self, df) -> None:
-        sheet = self.report_sheet
-
-        # Merge cells for the headers
-        sheet.merge_cells("A1:G1")
-        sheet.merge_cells("A2:G2")
-        sheet.merge_cells("A3:G3")
-
-        # Add headers to the merged cells
-        sheet["A1"] = self.report.translate("DEPOSIT, WITHDRAWALS, AND FEES")
-        sheet["A2"] = self.report.translate(self.account_info["name"])
-        sheet["A3"] = self.report.translate(f"From {self.report.trxs_start_date} to {self.report.end_date}")
-        sheet["A4"] =  self.report.translate(self.report_header)
-
-        # Center align the headers
-        for row in range(1, 5):
-            cell = sheet[f"A{row}"]
-            cell.alignment = Alignment(horizontal="center", vertical="center")
+        # Adjust column widths
+        col_widths = {"A": 1, "B": 1,"D": 33,}
+        col_widths.update({col : 7 for col in "CEFG"})
+        writer = ReportSheetWriter(self.report_sheet, col_widths)
+
+        # Merged and centered headers
+        writer.append_title_rows(
+            [
+                self.report.translate("DEPOSIT, WITHDRAWALS, AND FEES"),
+                self.report.translate(self.account_info["name"]),
+                self.report.translate(f"From {self.report.trxs_start_date} to {self.report.end_date}"),
+            ],
+            n_columns=7,
+        )
+        writer.append_row([self.report.translate(self.report_header)], style=TITLE)
 
         def _first_header():
             return [""] * 3 + ["Trade", "", "Amount", "Amount"]
@@ -213,47 +216,19 @@ class DepositsWithdrawalsFees:
         def _second_header():
             return [""] * 2 + ["Date", "Security", "local", "FX Rate", "Rep. Cur."]
 
-        for cell, header in zip(sheet["5:5"], _first_header()):
-            cell.value = self.report.translate(header)
-
-        for cell, header in zip(sheet["6:6"], _second_header()):
-            cell.value = self.report.translate(header)
-
-        # Underline row G
-        underline = Border(bottom=Side(style="thin"))
-        for cell in sheet["6:6"]:  # Rows A6 -> G6
-            cell.border = underline
-
-        for row in dataframe_to_rows(df, index=False, header=False):
-            self.report_sheet.append(row) # TODO: translate row first.
-        
-        # Define the font style
-        font_style = Font(name="Arial", size=8)
-
-        # Apply the styling to all cells in the sheet
-        for row_idx, row in enumerate(sheet.iter_rows()):
-            for cell in row:
-                cell.font = font_style
-            if row_idx >= 7:
-                for idx in [4,6]: # Cols E,G
-                    row[idx].number_format = "#,##0.00"
-                row[5].number_format = "0.0000"
-            sheet.row_dimensions[row_idx].height = 12
-        
-        # Adjust column widths
-        col_widths = {"A": 1, "B": 1,"D": 33,}
-        col_widths.update({col : 7 for col in "CEFG"})
-        for col, width in col_widths.items():
-            sheet.column_dimensions[col].width = width
-
+        writer.append_row([self.report.translate(x) for x in _first_header()])
+        # Underline row A6 -> G6
+        writer.append_row(
+            [self.report.translate(x) for x in _second_header()], style=UNDERLINE
+        )
 
+        column_styles = get_column_styles(7, TEXT, {AMOUNT: [4, 6], RATE: [5]}) # Cols E,G
+        writer.append_frame(df, column_styles) # TODO: translate row first.
 
     def run(self):
         payload = self.get_calculation_payload()
         try:
-            response = self.report.get_calculation("log-details", payload)
-            prser = ChartTableFormatter(response, payload)
-            parsed_response = prser.parse_data()
+            parsed_response = self.report.get_log_details(payload)
             res = self.parse_report(parsed_response)
             self.generate_worksheet(res)
         except Exception as err:
@@ -1,16 +1,20 @@
 import logging
 
 import pandas as pd
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import Alignment, Font, Border, Side
-
 from ps.parser import ChartTableFormatter
 from utils.main_utils import get_json
 from claret.accountant_report.main import AccountantReport
 from claret.accountant_report.report_utils import remove_unheld_positions
-from claret.accountant_report.report_utils import (
-    generate_group_totals,
-    update_cell_range_values,
+from claret.accountant_report.report_utils import generate_group_totals
+from claret.accountant_report.sheet_writer import (
+    AMOUNT,
+    AMOUNT_3DP,
+    TEXT,
+    TITLE,
+    UNDERLINE,
+    WRAPPED,
+    ReportSheetWriter,
+    get_column_styles,
 )
 from claret.accountant_report.lookup import currency_code_to_currency_name
 
@@ -212,31 +216,22 @@ class EvaluationReport:
         return res[self.report_columns]
 
     def generate_worksheet(self, df, dte) -> None:
-        sheet = self.report_sheet
-
-        # Merge cells for the headers
-        sheet.merge_cells("A1:O1")
-        sheet.merge_cells("A2:O2")
-        sheet.merge_cells("A3:O3")
-
-        # Add headers to the merged cells
-        sheet["A1"] = "Portfolio Valuation - SETTLED TRADES"
-        sheet["A2"] = self.account_info["name"]
-        sheet["A3"] = dte
-        sheet["A4"] =  self.report_headers
-
-        # Center align the headers
-        for row in range(1, 4):
-            cell = sheet[f"A{row}"]
-            cell.alignment = Alignment(horizontal="center", vertical="center")
+        # Adjust column widths
+        col_widths = {"E": 30}
+        col_widths.update({col: 1 for col in "ABC"})
+        col_widths.update({col: 7 for col in "DGILN"})
+        col_widths.update({col: 4 for col in "FHJKMO"})
+        writer = ReportSheetWriter(self.report_sheet, col_widths)
 
-        sheet.merge_cells("F5:I5")
-        sheet.merge_cells("K5:O5")
-        for row in ["F5", "K5"]:
-            sheet[row].alignment = Alignment(horizontal="center", vertical="center")
+        # Merged and centered headers
+        writer.append_title_rows(
+            ["Portfolio Valuation - SETTLED TRADES", self.account_info["name"], dte],
+            n_columns=15,
+        )
+        writer.append_row([self.report_headers])
 
         def _first_header():
-            return [""] * 5 + ["Local Currency", "", "Reporting Currency"]
+            return [""] * 5 + ["Local Currency"] + [None] * 3 + [""] + ["Reporting Currency"]
 
         def _second_header():
             metric_list = ["Unit", "Total", "", "Market"]
@@ -253,40 +248,23 @@ class EvaluationReport:
                 + ["Assets"]
             )
 
-        update_cell_range_values(sheet[5:5], _first_header())
-        update_cell_range_values(sheet[6:6], _second_header())
-        update_cell_range_values(sheet[7:7], _third_header())
-
-        # underline rows A to O
-        underline = Border(bottom=Side(style="thin"))
-        for cell in sheet["7:7"]:  # Rows A7 -> O7
-            cell.border = underline
-
-        for row in dataframe_to_rows(df, index=False, header=False):
-            sheet.append(row)
-
-        # Define the font style
-        font_style = Font(name="Arial", size=8)
-
-        # Apply the styling to all cells in the sheet
-        for row_idx, row in enumerate(sheet.iter_rows()):
-            for cell in row:
-                cell.font = font_style
-            if row_idx >= 8:
-                for idx in [3, 6, 8, 11, 13]:
-                    row[idx].number_format = "#,##0.000"
-                for idx in [5, 7, 9, 10, 12, 14]:
-                    row[idx].number_format = "#,##0.00"
-                row[4].alignment = Alignment(wrap_text=True)
-            sheet.row_dimensions[row_idx].height = 12
-
-        # Adjust column widths
-        col_widths = {"E": 30}
-        col_widths.update({col: 1 for col in "ABC"})
-        col_widths.update({col: 7 for col in "DGILN"})
-        col_widths.update({col: 4 for col in "FHJKMO"})
-        for col, width in col_widths.items():
-            sheet.column_dimensions[col].width = width
+        # Currency headers are merged across F5:I5 and K5:O5
+        writer.merge(6, 9)
+        writer.merge(11, 15)
+        writer.append_row(_first_header(), get_column_styles(11, TEXT, {TITLE: [5, 10]}))
+        writer.append_row(_second_header())
+        writer.append_row(_third_header(), style=UNDERLINE)  # underline A7 -> O7
+
+        column_styles = get_column_styles(
+            15,
+            TEXT,
+            {
+                AMOUNT_3DP: [3, 6, 8, 11, 13],
+                AMOUNT: [5, 7, 9, 10, 12, 14],
+                WRAPPED: [4],
+            },
+        )
+        writer.append_frame(df, column_styles)
 
     def run(self):
         payload = self.get_calculation_payload()
@@ -1,9 +1,7 @@
 import logging
 
 import pandas as pd
-from openpyxl.styles import Alignment, Font, NamedStyle, Border, Side
 
-from ps.parser import ChartTableFormatter
 from claret.accountant_report.reports.tax_prep import TaxPrepReport
 from utils.main_utils import get_json
 from claret.accountant_report.main import AccountantReport
@@ -18,6 +16,17 @@ from claret.accountant_report.report_utils import (
     set_pagination_size,
     set_trx_payload_custom_date_range
 )
+from claret.accountant_report.sheet_writer import (
+    BOLD_TEXT,
+    BOLD_TITLE,
+    COLUMN_HEADER,
+    COLUMN_HEADER_UNDERLINE,
+    NUMBER,
+    NUMBER_FX,
+    STRING,
+    ReportSheetWriter,
+    get_column_styles,
+)
 
 LOG = logging.getLogger(__name__)
 
@@ -250,129 +259,45 @@ class IncomeReport:
         reporting_currency: str,
         report_headers: list,
     ) -> None:
-        # wb = Workbook()
-        ws = self.report_sheet
-        # ws.title = sheet_name
         num_header_rows = len(report_headers)
         num_header_cols = len(report_headers[0])
-        # Merge the first 4 rows
-        ws.merge_cells(
-            start_row=1, start_column=1, end_row=1, end_column=num_header_cols
-        )  # Merge cells
-        ws.merge_cells(
-            start_row=2, start_column=1, end_row=2, end_column=num_header_cols
-        )  # Merge cells
-        ws.merge_cells(
-            start_row=3, start_column=1, end_row=3, end_column=num_header_cols
-        )  # Merge cells
-        ws.merge_cells(
-            start_row=4, start_column=1, end_row=4, end_column=num_header_cols
-        )  # Merge cells
-        # Add centered report name
-        report_name_cell = ws.cell(row=1, column=1)
-        report_name_cell.value = report_name
-        report_name_cell.alignment = Alignment(
-            horizontal="center", vertical="center"
-        )  # Center alignment
-        report_name_cell.font = Font(name="Arial", size=8, bold=True)
-        # Add centered account name
-        account_name_cell = ws.cell(row=2, column=1)
-        account_name_cell.value = account_name
-        account_name_cell.alignment = Alignment(
-            horizontal="center", vertical="center"
-        )  # Center alignment
-        account_name_cell.font = Font(name="Arial", size=8, bold=True)
-        # Add centered date range
-        date_range_cell = ws.cell(row=3, column=1)
-        date_range_cell.value = date_range
-        date_range_cell.alignment = Alignment(
-            horizontal="center", vertical="center"
-        )  # Center alignment
-        date_range_cell.font = Font(name="Arial", size=8, bold=True)
-        # Add left aligned rporting currency
-        reporting_currency_cell = ws.cell(row=4, column=1)
-        reporting_currency_cell.value = reporting_currency
-        reporting_currency_cell.alignment = Alignment(
-            horizontal="left", vertical="center"
-        )  # Center alignment
-        reporting_currency_cell.font = Font(name="Arial", size=8, bold=True)
-        # Add Column Headers (2 rows)
-        for row_idx, header_row in enumerate(report_headers, start=5):
-            for col_idx, col_value in enumerate(header_row, start=1):
-                tmp_cell = ws.cell(row=row_idx, column=col_idx, value=col_value)
-                tmp_cell.alignment = Alignment(
-                    horizontal="center", vertical="center"
-                )  # Center alignment
-                tmp_cell.font = Font(size=8, bold=True)
-        ws.merge_cells(
-            start_row=5, start_column=7, end_row=5, end_column=9
-        )  # Merge cells
-        ws.merge_cells(
-            start_row=5, start_column=11, end_row=5, end_column=13
-        )  # Merge cells
-        # Define a border style
-        thin_bottom_border = Border(bottom=Side(style="thin"))
-        for col in [7, 8, 9, 11, 12, 13]:
-            cell = ws.cell(row=5, column=col)
-            cell.border = thin_bottom_border
-        for col in range(4, num_header_cols + 1):
-            cell = ws.cell(row=6, column=col)
-            cell.border = thin_bottom_border
-        # Define Custom Styles
-        string_style = NamedStyle(
-            name="StringStyle",
-            font=Font(name="Arial", size=8),
-            alignment=Alignment(horizontal="left"),
-        )
-        english_number_format = "#,##0.00"
-        english_fx_number_format = "#,##0.0000"
-        number_style = NamedStyle(
-            name="NumberStyle",
-            font=Font(name="Arial", size=8),
-            alignment=Alignment(horizontal="right"),
-            number_format=english_number_format,
-        )
-        fx_number_style = NamedStyle(
-            name="NumberStyleFx",
-            font=Font(name="Arial", size=8),
-            alignment=Alignment(horizontal="right"),
-            number_format=english_fx_number_format,
-        )
-        # Add DataFrame Data with Alignment
-        data_start_row = 5 + num_header_rows  # Data starts after the title + headers
-        for row_idx, row in enumerate(df.itertuples(index=False), start=data_start_row):
-            for col_idx, value in enumerate(row, start=1):
-                cell = ws.cell(row=row_idx, column=col_idx, value=value)
-                # Apply styles based on column
-                if (
-                    col_idx <= 6
-                ):  # | col_idx == num_header_cols:  # first 6 columns are text
-                    cell.style = string_style
-                else:  # Columns 2-6: Numbers, right-aligned with thousands separator
-                    cell.style = number_style
-                if col_idx == 10:
-                    cell.style = fx_number_style
-                if col_idx == num_header_cols:
-                    cell.style = string_style
-        # Set global row height
-        for row in ws.iter_rows(min_row=1, max_row=ws.max_row):
-            ws.row_dimensions[row[0].row].height = 12  # Set height to 12
         # TODO: Make this generic
         columns_to_adjust = {"A": 1, "B": 1, "C": 1, "D": 7, "E": 7, "F": 33}
-        for col, width in columns_to_adjust.items():
-            ws.column_dimensions[col].width = width
-        # wb.save(
-        #     "/Users/carlosmartinezamaya/Documents/Work/d1g1t/Code/fe-scripts/claret/accountant_report/out/test.xlsx"
-        # )
-        # document_name = self.get_report_filename()
-        # wb.save(document_name)
+        writer = ReportSheetWriter(self.report_sheet, columns_to_adjust)
+        # Merged first 4 rows, centered except for the reporting currency
+        writer.append_title_rows(
+            [report_name, account_name, date_range], num_header_cols, style=BOLD_TITLE
+        )
+        writer.append_title_rows([reporting_currency], num_header_cols, style=BOLD_TEXT)
+        # Add Column Headers, currency headers are merged and underlined
+        writer.merge(7, 9)
+        writer.merge(11, 13)
+        header_styles = [
+            get_column_styles(
+                num_header_cols,
+                COLUMN_HEADER,
+                {COLUMN_HEADER_UNDERLINE: [6, 7, 8, 10, 11, 12]},
+            ),
+            get_column_styles(
+                num_header_cols,
+                COLUMN_HEADER,
+                {COLUMN_HEADER_UNDERLINE: range(3, num_header_cols)},
+            ),
+        ] + [COLUMN_HEADER] * (num_header_rows - 2)
+        for header_row, style in zip(report_headers, header_styles):
+            writer.append_row(header_row, style)
+        # Add DataFrame Data, first 6 and last columns are text
+        column_styles = get_column_styles(
+            num_header_cols,
+            NUMBER,
+            {STRING: [0, 1, 2, 3, 4, 5, num_header_cols - 1], NUMBER_FX: [9]},
+        )
+        writer.append_frame(df, column_styles)
 
     def run(self):
         payload = self.get_calculation_payload()
         try:
-            response = self.report.get_calculation("log-details", payload)
-            prser = ChartTableFormatter(response, payload)
-            parsed_response = prser.parse_data()
+            parsed_response = self.report.get_log_details(payload)
             res = self.parse_report(parsed_response)
             (
                 account_name,
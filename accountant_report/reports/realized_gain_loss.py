@@ -1,18 +1,21 @@
 import logging
 
 import pandas as pd
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import Alignment, Font, Border, Side
-
-from ps.parser import ChartTableFormatter
 from utils.main_utils import get_json
 from claret.accountant_report.main import AccountantReport
 from claret.accountant_report.report_utils import (
     generate_group_totals,
     set_pagination_size,
-    update_cell_range_values,
     set_trx_payload_custom_date_range
 )
+from claret.accountant_report.sheet_writer import (
+    AMOUNT,
+    RATE,
+    TEXT,
+    UNDERLINE,
+    ReportSheetWriter,
+    get_column_styles,
+)
 
 LOG = logging.getLogger(__name__)
 
@@ -179,23 +182,21 @@ class RealizedGainLossReport:
         return res[self.report_columns]
 
     def generate_worksheet(self, df) -> None:
-        sheet = self.report_sheet
-
-        # Merge cells for the headers
-        sheet.merge_cells("A1:J1")
-        sheet.merge_cells("A2:J2")
-        sheet.merge_cells("A3:J3")
-
-        # Add headers to the merged cells
-        sheet["A1"] = "REALIZED GAINS AND LOSSES - SETTLED TRADES"
-        sheet["A2"] = self.account_info["name"]
-        sheet["A3"] = f"From {self.report.start_date} to {self.report.end_date}"
-        sheet["A4"] = self.report_header
-
-        # Center align the headers
-        for row in range(1, 4):
-            cell = sheet[f"A{row}"]
-            cell.alignment = Alignment(horizontal="center", vertical="center")
+        # Adjust column widths
+        col_widths = {"A": 1, "D": 33, "J": 4}
+        col_widths.update({col: 7 for col in "BCEFGHI"})
+        writer = ReportSheetWriter(self.report_sheet, col_widths)
+
+        # Merged and centered headers
+        writer.append_title_rows(
+            [
+                "REALIZED GAINS AND LOSSES - SETTLED TRADES",
+                self.account_info["name"],
+                f"From {self.report.start_date} to {self.report.end_date}",
+            ],
+            n_columns=10,
+        )
+        writer.append_row([self.report_header])
 
         def _first_header():
             return [""] + ["Settlement"] + [""] * 8
@@ -213,42 +214,16 @@ class RealizedGainLossReport:
                 "Country",
             ]
 
-        update_cell_range_values(sheet[5:5], _first_header())
-        update_cell_range_values(sheet[6:6], _second_header())
-
-        # underline rows A to O
-        underline = Border(bottom=Side(style="thin"))
-        for cell in sheet[6:6]:  # Rows
-            cell.border = underline
-
-        for row in dataframe_to_rows(df, index=False, header=False):
-            sheet.append(row)
-
-        # Define the font style
-        font_style = Font(name="Arial", size=8)
+        writer.append_row(_first_header())
+        writer.append_row(_second_header(), style=UNDERLINE)
 
-        # Apply the styling to all cells in the sheet
-        for row_idx, row in enumerate(sheet.iter_rows()):
-            for cell in row:
-                cell.font = font_style
-            if row_idx >= 8:
-                for idx in [4, 8]:
-                    row[idx].number_format = "#,##0.00"
-                row[2].number_format = "0.0000"
-            sheet.row_dimensions[row_idx].height = 12
-
-        # Adjust column widths
-        col_widths = {"A": 1, "D": 33, "J": 4}
-        col_widths.update({col: 7 for col in "BCEFGHI"})
-        for col, width in col_widths.items():
-            sheet.column_dimensions[col].width = width
+        column_styles = get_column_styles(10, TEXT, {AMOUNT: [4, 8], RATE: [2]})
+        writer.append_frame(df, column_styles)
 
     def run(self):
         payload = self.get_calculation_payload()
         try:
-            response = self.report.get_calculation("log-details", payload)
-            prser = ChartTableFormatter(response, payload)
-            parsed_response = prser.parse_data()
+            parsed_response = self.report.get_log_details(payload)
             res = self.parse_report(parsed_response)
             self.generate_worksheet(res)
         except Exception as err:
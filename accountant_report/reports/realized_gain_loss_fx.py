@@ -1,19 +1,21 @@
 import logging
 
 import pandas as pd
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import Alignment, Font, Border, Side
-
-from ps.parser import ChartTableFormatter
 from utils.main_utils import get_json
 from claret.accountant_report.main import AccountantReport
 from lookup import currency_code_to_currency_name
 from claret.accountant_report.report_utils import (
     generate_group_totals,
     set_pagination_size,
-    update_cell_range_values,
     set_trx_payload_custom_date_range
 )
+from claret.accountant_report.sheet_writer import (
+    AMOUNT,
+    TEXT,
+    UNDERLINE,
+    ReportSheetWriter,
+    get_column_styles,
+)
 
 LOG = logging.getLogger(__name__)
 class RealizedGainLossFXReport:
@@ -98,23 +100,21 @@ class RealizedGainLossFXReport:
         return res[self.report_columns]
 
     def generate_worksheet(self, df) -> None:
-        sheet = self.report_sheet
-
-        # Merge cells for the headers
-        sheet.merge_cells("A1:E1")
-        sheet.merge_cells("A2:E2")
-        sheet.merge_cells("A3:E3")
-
-        # Add headers to the merged cells
-        sheet["A1"] = "REALIZED GAINS AND LOSSES ON FOREIGN EXCHANGE"
-        sheet["A2"] = self.account_info["name"]
-        sheet["A3"] = f"From {self.report.trxs_start_date} to {self.report.end_date}"
-        sheet["A4"] = self.report_header 
-
-        # Center align the headers
-        for row in range(1, 4):
-            cell = sheet[f"A{row}"]
-            cell.alignment = Alignment(horizontal="center", vertical="center")
+        # Adjust column widths
+        col_widths = {"A": 7}
+        col_widths.update({col: 4 for col in "BCDE"})
+        writer = ReportSheetWriter(self.report_sheet, col_widths)
+
+        # Merged and centered headers
+        writer.append_title_rows(
+            [
+                "REALIZED GAINS AND LOSSES ON FOREIGN EXCHANGE",
+                self.account_info["name"],
+                f"From {self.report.trxs_start_date} to {self.report.end_date}",
+            ],
+            n_columns=5,
+        )
+        writer.append_row([self.report_header])
 
         def _first_header():
             return [""] + ["Settlement"] + [""] * 3
@@ -122,41 +122,15 @@ class RealizedGainLossFXReport:
         def _second_header():
             return [""] + ["Date", "Cost", "Proceeds", "Gain/Loss"]
 
-        update_cell_range_values(sheet[5:5], _first_header())
-        update_cell_range_values(sheet[6:6], _second_header())
-
-        # underline rows A to O
-        underline = Border(bottom=Side(style="thin"))
-        for cell in sheet[6:6]:  # Rows
-            cell.border = underline
-
-        for row in dataframe_to_rows(df, index=False, header=False):
-            sheet.append(row)
-        
-        # Define the font style
-        font_style = Font(name="Arial", size=8)
-
-        # Apply the styling to all cells in the sheet
-        for row_idx, row in enumerate(sheet.iter_rows()):
-            for cell in row:
-                cell.font = font_style
-            if row_idx >= 8:
-                for idx in [2, 3, 4]:
-                    row[idx].number_format = "#,##0.00"
-            sheet.row_dimensions[row_idx].height = 12
+        writer.append_row(_first_header())
+        writer.append_row(_second_header(), style=UNDERLINE)
 
-        # Adjust column widths
-        col_widths = {"A": 7}
-        col_widths.update({col: 4 for col in "BCDE"})
-        for col, width in col_widths.items():
-            sheet.column_dimensions[col].width = width
+        writer.append_frame(df, get_column_styles(5, TEXT, {AMOUNT: [2, 3, 4]}))
 
     def run(self):
         payload = self.get_calculation_payload()
         try:
-            response = self.report.get_calculation("log-details", payload)
-            prser = ChartTableFormatter(response, payload)
-            parsed_response = prser.parse_data()
+            parsed_response = self.report.get_log_details(payload)
             res = self.parse_report(parsed_response)
             self.generate_worksheet(res)
         except Exception as err:
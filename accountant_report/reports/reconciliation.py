@@ -6,11 +6,16 @@ warnings.simplefilter(action="ignore", category=(FutureWarning, SettingWithCopyW
 import logging
 
 import pandas as pd
-from openpyxl.styles import Alignment, Border, Side, Font
-from openpyxl.utils.dataframe import dataframe_to_rows
 
 from claret.accountant_report.main import AccountantReport
-from claret.accountant_report.report_utils import update_cell_range_values
+from claret.accountant_report.sheet_writer import (
+    AMOUNT,
+    TEXT,
+    TITLE,
+    UNDERLINE,
+    ReportSheetWriter,
+    get_column_styles,
+)
 from lookup import currency_code_to_currency_name
 
 LOG = logging.getLogger(__name__)
@@ -306,41 +311,32 @@ class Reconciliation:
         return res[self.report_columns]
 
     def generate_worksheet(self, df) -> None:
-        sheet = self.report_sheet
-
-        # Merge cells for the headers
-        sheet.merge_cells("A1:H1")
-        sheet.merge_cells("A2:H2")
-        sheet.merge_cells("A3:H3")
-
-        # Add headers to the merged cells
-        sheet["A1"] = "Period Activity Reconciliation"
-        sheet["A2"] = self.account_info["name"]
-        sheet["A3"] = f"From {self.report.start_date} to {self.report.end_date}"
-        sheet["A6"] = self.report_header
+        # Adjust column widths
+        col_widths = {"A": 2, "B": 33}
+        col_widths.update({col: 7 for col in "CDEFGH"})
+        writer = ReportSheetWriter(self.report_sheet, col_widths)
 
+        # Merged and centered headers
+        writer.append_title_rows(
+            [
+                "Period Activity Reconciliation",
+                self.account_info["name"],
+                f"From {self.report.start_date} to {self.report.end_date}",
+            ],
+            n_columns=8,
+        )
+        writer.append_row([])
+        writer.append_row([])
         # underline rows A to H
-        underline = Border(bottom=Side(style="thin"))
-        for cell in sheet[6:6]:  # Rows
-            cell.border = underline
-
-        # Center align the headers
-        for row in range(1, 4):
-            cell = sheet[f"A{row}"]
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        sheet.merge_cells("C7:D7")
-        sheet.merge_cells("E7:F7")
-        sheet.merge_cells("G7:H7")
-
-        sheet["C7"] = "Cash"
-        sheet["E7"] = "Investments"
-        sheet["G7"] = "Total Portfolio"
-
-        # Center align the headers
-        for col in ["CEG"]:
-            cell = sheet[f"{col}7"]
-            cell.alignment = Alignment(horizontal="center", vertical="center")
+        writer.append_row([self.report_header] + [None] * 7, style=UNDERLINE)
+
+        # Centered headers merged across C7:D7, E7:F7 and G7:H7
+        for first_column in [3, 5, 7]:
+            writer.merge(first_column, first_column + 1)
+        writer.append_row(
+            ["", "", "Cash", None, "Investments", None, "Total Portfolio", None],
+            get_column_styles(8, TEXT, {TITLE: [2, 4, 6]}),
+        )
 
         def _first_header():
             return [""] * 2 + ["Local", "Reporting"] * 3
@@ -348,29 +344,10 @@ class Reconciliation:
         def _second_header():
             return [""] * 2 + ["Currency"] * 6
 
-        update_cell_range_values(sheet[8:8], _first_header())
-        update_cell_range_values(sheet[9:9], _second_header())
-
-        for row in dataframe_to_rows(df, index=False, header=False):
-            self.report_sheet.append(row)
-
-        # Define the font style
-        font_style = Font(name="Arial", size=8)
+        writer.append_row(_first_header())
+        writer.append_row(_second_header())
 
-        # Apply the styling to all cells in the sheet
-        for row_idx, row in enumerate(sheet.iter_rows()):
-            for cell in row:
-                cell.font = font_style
-            if row_idx >= 9:
-                for idx in range(2, 8):
-                    row[idx].number_format = "#,##0.00"
-            sheet.row_dimensions[row_idx].height = 12
-
-        # Adjust column widths
-        col_widths = {"A": 2, "B": 33}
-        col_widths.update({col: 7 for col in "CDEFGH"})
-        for col, width in col_widths.items():
-            sheet.column_dimensions[col].width = width
+        writer.append_frame(df, get_column_styles(8, TEXT, {AMOUNT: range(2, 8)}))
 
     def run(self):
         try:
@@ -1,9 +1,9 @@
 import logging
 
 import pandas as pd
-from openpyxl.utils.dataframe import dataframe_to_rows
 
 from claret.accountant_report.main import AccountantReport
+from claret.accountant_report.sheet_writer import ReportSheetWriter
 
 LOG = logging.getLogger(__name__)
 
@@ -105,11 +105,9 @@ class TaxPrepReport:
         return res
 
     def generate_worksheet(self, df: pd.DataFrame) -> None:
-        sheet = self.report_sheet
-        sheet["A1"] = "[|0|1]"
-
-        for row in dataframe_to_rows(df, index=False, header=False):
-            sheet.append(row)
+        writer = ReportSheetWriter(self.report_sheet, row_height=None)
+        writer.append_row(["[|0|1]"], style=None)
+        writer.append_frame(df, style=None)
 
     def run(self, frame: pd.DataFrame) -> None:
         df = self.get_taxprep_frame(frame)
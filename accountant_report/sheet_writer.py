@@ -0,0 +1,192 @@
+"""
+Streaming sheet writer for the accountant report.
+
+The report workbook is opened in openpyxl write-only mode, so each row is
+serialised as soon as it is appended instead of every cell being kept in
+memory until the workbook is saved. In that mode nothing can be changed once
+written: column widths and the row height are set before the first row, a
+merge is declared with the row it starts on and cells are styled with the
+named styles registered on the workbook when it is created.
+"""
+
+from copy import copy
+from typing import Optional, Union
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.worksheet.cell_range import CellRange
+
+ROW_HEIGHT = 12
+
+# Named styles
+TEXT = "Report Text"
+TITLE = "Report Title"
+UNDERLINE = "Report Underline"
+AMOUNT = "Report Amount"
+AMOUNT_3DP = "Report Amount 3dp"
+DECIMAL = "Report Decimal"
+RATE = "Report Rate"
+WRAPPED = "Report Wrapped"
+BOLD_TITLE = "Report Bold Title"
+BOLD_TEXT = "Report Bold Text"
+COLUMN_HEADER = "Report Column Header"
+COLUMN_HEADER_UNDERLINE = "Report Column Header Underline"
+STRING = "Report String"
+NUMBER = "Report Number"
+NUMBER_FX = "Report Number Fx"
+
+
+def _get_report_styles() -> list:
+    font = Font(name="Arial", size=8)
+    bold_font = Font(name="Arial", size=8, bold=True)
+    header_font = Font(size=8, bold=True)
+    center = Alignment(horizontal="center", vertical="center")
+    underline = Border(bottom=Side(style="thin"))
+    return [
+        NamedStyle(name=TEXT, font=font),
+        NamedStyle(name=TITLE, font=font, alignment=center),
+        NamedStyle(name=UNDERLINE, font=font, border=underline),
+        NamedStyle(name=AMOUNT, font=font, number_format="#,##0.00"),
+        NamedStyle(name=AMOUNT_3DP, font=font, number_format="#,##0.000"),
+        NamedStyle(name=DECIMAL, font=font, number_format="0.00"),
+        NamedStyle(name=RATE, font=font, number_format="0.0000"),
+        NamedStyle(name=WRAPPED, font=font, alignment=Alignment(wrap_text=True)),
+        NamedStyle(name=BOLD_TITLE, font=bold_font, alignment=center),
+        NamedStyle(
+            name=BOLD_TEXT,
+            font=bold_font,
+            alignment=Alignment(horizontal="left", vertical="center"),
+        ),
+        NamedStyle(name=COLUMN_HEADER, font=header_font, alignment=center),
+        NamedStyle(
+            name=COLUMN_HEADER_UNDERLINE,
+            font=header_font,
+            alignment=center,
+            border=underline,
+        ),
+        NamedStyle(name=STRING, font=font, alignment=Alignment(horizontal="left")),
+        NamedStyle(
+            name=NUMBER,
+            font=font,
+            alignment=Alignment(horizontal="right"),
+            number_format="#,##0.00",
+        ),
+        NamedStyle(
+            name=NUMBER_FX,
+            font=font,
+            alignment=Alignment(horizontal="right"),
+            number_format="#,##0.0000",
+        ),
+    ]
+
+
+def register_report_styles(workbook: Workbook) -> None:
+    """Adds the report named styles, once, to a new workbook."""
+    for style in _get_report_styles():
+        if style.name not in workbook.named_styles:
+            workbook.add_named_style(style)
+
+
+def get_column_styles(
+    n_columns: int, style: Optional[str] = TEXT, overrides: Optional[dict] = None
+) -> list:
+    """
+    One style per column, e.g. get_column_styles(5, TEXT, {AMOUNT: [2, 3]})
+    for text columns with amounts in the third and fourth.
+    :param n_columns: number of columns.
+    :param style: style of the columns not overridden, None for unstyled.
+    :param overrides: style to the 0-based indexes of its columns.
+    """
+    styles = [style] * n_columns
+    for column_style, columns in (overrides or dict()).items():
+        for idx in columns:
+            styles[idx] = column_style
+    return styles
+
+
+class ReportSheetWriter:
+    """Appends styled rows to a write-only report sheet."""
+
+    def __init__(
+        self,
+        sheet,
+        column_widths: Optional[dict] = None,
+        row_height: Optional[float] = ROW_HEIGHT,
+    ) -> None:
+        """
+        :param sheet: empty sheet of a write-only workbook.
+        :param column_widths: column letter to width.
+        :param row_height: height of every row, None for the Excel default.
+        """
+        self.sheet = sheet
+        self.row_idx = 0
+        # Cells covered by a merge but not at its start, by row
+        self._merged = dict()
+        self._style_arrays = dict()
+        if row_height is not None:
+            self.sheet.sheet_format.defaultRowHeight = row_height
+            self.sheet.sheet_format.customHeight = True
+        for col, width in (column_widths or dict()).items():
+            self.sheet.column_dimensions[col].width = width
+
+    def merge(self, first_column: int, last_column: int, rows: int = 1) -> None:
+        """
+        Merges columns first_column to last_column (1-based) starting on the
+        next row to be written.
+        """
+        first_row = self.row_idx + 1
+        last_row = first_row + rows - 1
+        cell_range = CellRange(
+            min_col=first_column, min_row=first_row, max_col=last_column, max_row=last_row
+        )
+        self.sheet.merged_cells.add(cell_range)
+        for row in range(first_row, last_row + 1):
+            covered = self._merged.setdefault(row, set())
+            start = first_column + 1 if row == first_row else first_column
+            covered.update(range(start, last_column + 1))
+
+    def _get_cell(self, value, style: Optional[str]) -> WriteOnlyCell:
+        cell = WriteOnlyCell(self.sheet, value=value)
+        if style is not None:
+            if style not in self._style_arrays:
+                cell.style = style
+                self._style_arrays[style] = cell._style
+            # Looking the named style up for every cell is most of the write time
+            cell._style = copy(self._style_arrays[style])
+        return cell
+
+    def append_row(
+        self, values: list, style: Union[str, list, None] = TEXT, merge: bool = False
+    ) -> None:
+        """
+        Writes the next row.
+        :param values: cell values, None or "" for an empty cell.
+        :param style: named style of every cell or a list with one per cell.
+        :param merge: merges the row across all of its cells (titles).
+        """
+        if merge:
+            self.merge(1, len(values))
+        styles = style if isinstance(style, list) else [style] * len(values)
+        self.row_idx += 1
+        covered = self._merged.pop(self.row_idx, ())
+        row = []
+        for col_idx, (value, cell_style) in enumerate(zip(values, styles), start=1):
+            if col_idx in covered:
+                value = None
+            row.append(self._get_cell(value, cell_style))
+        self.sheet.append(row)
+
+    def append_title_rows(
+        self, titles: list, n_columns: int, style: str = TITLE
+    ) -> None:
+        """Each title on its own row, merged across the first n_columns columns."""
+        for title in titles:
+            self.append_row([title] + [None] * (n_columns - 1), style, merge=True)
+
+    def append_frame(self, df: pd.DataFrame, style: Union[str, list, None] = TEXT) -> None:
+        """Writes the rows of a frame, without its index or header."""
+        for values in dataframe_to_rows(df, index=False, header=False):
+            self.append_row(values, style)
@@ -0,0 +1,138 @@
+"""
+Asynchronous client for d1g1t calculations.
+
+A calculation that is still running is answered with 202 (502 while the
+server is busy). D1G1TPSRestResource.post waits for it in the calling
+thread, so calculations run one after the other. This client waits with
+asyncio instead, so many calculations can be in flight from one event loop.
+
+Each calculation is submitted once. When the 202 carries a Location, that
+status url is polled with GET. Otherwise the serialized payload is posted
+again, which is how d1g1t returns the result once it is ready. Polls back off
+with jitter and honour Retry-After, see get_poll_delay.
+
+Requests go through the shared keep-alive session in worker threads, and
+waits between polls do not hold a thread.
+
+Sample Usage:
+    client = AsyncCalculationClient(api, max_concurrency=8)
+    results = client.run([("cph-table", payload), ("trend-aum", payload2)])
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import List, Optional, Tuple
+import urllib.parse as url_parse
+
+from ps.base import (
+    POLL_STATUSES,
+    POLL_TIMEOUT,
+    D1g1tApi,
+    get_poll_delay,
+    get_session,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class AsyncCalculationClient:
+    """Run d1g1t calculations concurrently from one event loop."""
+
+    def __init__(
+        self,
+        api: D1g1tApi,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        poll_timeout: float = POLL_TIMEOUT,
+    ):
+        """
+        :param api: logged in api.
+        :param max_concurrency: most calculations submitted or polled at once.
+        :param poll_timeout: seconds to wait for a calculation to finish.
+        """
+        self.api = api
+        self.max_concurrency = max(1, max_concurrency)
+        self.poll_timeout = poll_timeout
+        self._semaphore = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Semaphore of the running loop, as asyncio.run makes a new loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    @staticmethod
+    def get_poll_url(resp) -> Optional[str]:
+        """Status url of a running calculation, if the server sends one."""
+        location = resp.headers.get("Location")
+        if not location:
+            return None
+        return url_parse.urljoin(resp.url, location)
+
+    async def post(self, calc_string: str, payload: dict) -> dict:
+        """
+        Return a json calculation result, see PSMain.get_calculation.
+
+        :param calc_string: e.g. 'trend-aum', 'cph-table'
+        :param payload: Calculation payload (json)
+        """
+        resource = self.api.calc(calc_string)
+        url = resource.url()
+        headers = dict(resource._get_headers())
+        data = json.dumps(payload) if payload else None
+        session = get_session()
+
+        async with self._get_semaphore():
+            resp = await asyncio.to_thread(
+                session.post, url, data=data, headers=headers
+            )
+            poll_url = self.get_poll_url(resp)
+            attempt = 0
+            deadline = time.monotonic() + self.poll_timeout
+            while resp.status_code in POLL_STATUSES:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(
+                        f"{calc_string} still running after {self.poll_timeout}s"
+                    )
+                    break
+                await asyncio.sleep(get_poll_delay(attempt, resp, remaining))
+                if poll_url:
+                    resp = await asyncio.to_thread(
+                        session.get, poll_url, headers=headers
+                    )
+                else:
+                    resp = await asyncio.to_thread(
+                        session.post, url, data=data, headers=headers
+                    )
+                poll_url = self.get_poll_url(resp) or poll_url
+                attempt += 1
+            logger.debug(f"{calc_string} done after {attempt} polls")
+
+        response = resource._process_response(resp)
+        if not response:
+            raise ValueError("Request returned no result!")
+        return response
+
+    async def gather(
+        self, calculations: List[Tuple[str, dict]], return_exceptions=False
+    ) -> list:
+        """Results of (calc_string, payload) calculations, in order."""
+        return await asyncio.gather(
+            *[self.post(calc, payload) for calc, payload in calculations],
+            return_exceptions=return_exceptions,
+        )
+
+    def run(
+        self, calculations: List[Tuple[str, dict]], return_exceptions=False
+    ) -> list:
+        """Blocking gather, for callers without an event loop."""
+        return asyncio.run(
+            self.gather(calculations, return_exceptions=return_exceptions)
+        )
@@ -1,9 +1,15 @@
 """Base Engine that supports interacting with PS API."""
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import copy
+from email.utils import parsedate_to_datetime
 import json
 import logging
+import random
+import threading
 import time
-from typing import Dict
+from typing import Dict, Optional
 import urllib.parse as url_parse
 
 from drf_client.connection import Api as RestApi
@@ -12,9 +18,73 @@ from drf_client.exceptions import HttpClientError
 from drf_client.helpers.base_main import BaseMain
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+SESSION_POOL_SIZE = 16
+
+# d1g1t answers 202 while a calculation runs, 502 while it is busy
+POLL_STATUSES = (202, 502)
+INITIAL_POLL_DELAY = 0.5
+POLL_BACKOFF = 1.5
+MAX_POLL_DELAY = 10
+POLL_TIMEOUT = 600
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Keep-alive session shared by all resources and threads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(
+                pool_connections=SESSION_POOL_SIZE,
+                pool_maxsize=SESSION_POOL_SIZE,
+            )
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def get_retry_after(resp) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, in seconds or as a date."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def get_poll_delay(
+    attempt: int, resp=None, remaining: Optional[float] = None
+) -> float:
+    """
+    Wait before polling a calculation again, at most the remaining seconds.
+
+    Retry-After is honoured when the response has one, however long it is.
+    Otherwise the wait grows by POLL_BACKOFF from INITIAL_POLL_DELAY up to
+    MAX_POLL_DELAY, with half of it random so that calculations started
+    together do not poll together.
+    """
+    retry_after = get_retry_after(resp) if resp is not None else None
+    if retry_after is not None:
+        delay = retry_after
+    else:
+        delay = min(MAX_POLL_DELAY, INITIAL_POLL_DELAY * POLL_BACKOFF**attempt)
+        delay = delay / 2 + random.uniform(0, delay / 2)
+    return delay if remaining is None else min(delay, remaining)
+
 
 class D1G1TPSRestResource(RestResource):
     """d1g1t custom rest resource."""
@@ -25,6 +95,15 @@ class D1G1TPSRestResource(RestResource):
         options["USE_DASHES"] = True
         return options
 
+    def get(self, extra_headers: dict = None, **kwargs):
+        """Overwrite RestResource 'get' method to use the shared session."""
+        headrs = self._get_headers()
+        if extra_headers:
+            headrs = headrs | extra_headers
+
+        resp = get_session().get(self.url(kwargs.get("extra")), headers=headrs)
+        return self._process_response(resp)
+
     def post(self, data=None, **kwargs):
         """Overwrite RestResource 'post' method to handle d1g1t 202 'waiting' response status."""
         if data:
@@ -34,16 +113,47 @@ class D1G1TPSRestResource(RestResource):
 
         url = self.url()
         headrs = self._get_headers()
-        resp = requests.post(url, data=payload, headers=headrs)
-
-        counter = 200
-        while resp.status_code in [202, 502] and counter > 0:
-            time.sleep(3)
-            resp = requests.post(url, data=payload, headers=headrs)
-            counter -= 1
+        session = get_session()
+        resp = session.post(url, data=payload, headers=headrs)
+
+        attempt = 0
+        deadline = time.monotonic() + POLL_TIMEOUT
+        while resp.status_code in POLL_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(get_poll_delay(attempt, resp, remaining))
+            resp = session.post(url, data=payload, headers=headrs)
+            attempt += 1
 
         return self._process_response(resp)
 
+
+class PageAccumulator:
+    """Collect paginated result items into one list per field."""
+
+    def __init__(self):
+        self.columns = {}
+        self.n_rows = 0
+
+    def add(self, items: list) -> None:
+        """Append items, fields missing from an item are left as None."""
+        columns = self.columns
+        for item in items:
+            for key, value in item.items():
+                if key not in columns:
+                    columns[key] = [None] * self.n_rows
+                columns[key].append(value)
+            self.n_rows += 1
+            if len(item) < len(columns):
+                for column in columns.values():
+                    if len(column) < self.n_rows:
+                        column.append(None)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns, index=range(self.n_rows))
+
+
 class D1g1tApi(RestApi):
     """d1g1t custom rest api."""
 
@@ -60,6 +170,7 @@ class PSMain(BaseMain):
     """
 
     PAGE_SIZE: int = 1000
+    PAGE_WORKERS: int = 4
 
     payload: Dict = {
         "data": {
@@ -116,6 +227,57 @@ class PSMain(BaseMain):
         """Get count from a response object."""
         return response.get("count", 0)
 
+    @staticmethod
+    def get_page_offsets(offset, count: int, page_size: int) -> Optional[list]:
+        """
+        Offsets of all pages after the first one.
+
+        :param offset: offset of the second page, from get_offset.
+        :param count: total number of results.
+        :param page_size: number of results per page, for int offsets.
+        :returns: offsets, None if they cannot be derived from the response.
+        """
+        if not offset or not count:
+            return None
+        if isinstance(offset, int):
+            return list(range(offset, count, page_size))
+
+        query = url_parse.parse_qsl(offset, keep_blank_values=True)
+        params = dict(query)
+        try:
+            start, limit = int(params["offset"]), int(params["limit"])
+        except (KeyError, ValueError):
+            return None
+        return [
+            url_parse.urlencode(
+                [(k, page if k == "offset" else v) for k, v in query]
+            )
+            for page in range(start, count, limit)
+        ]
+
+    def fetch_pages(self, api, payload, offsets, method, result_key):
+        """
+        Fetch pages concurrently, PAGE_WORKERS at a time.
+
+        Pages are yielded in offset order and at most twice PAGE_WORKERS pages
+        wait to be consumed.
+        """
+
+        def fetch(offset):
+            page_payload = copy.deepcopy(payload)
+            self.set_offset(payload=page_payload, offset=offset)
+            resp = getattr(api, method)(**page_payload)
+            return resp.get(result_key, [])
+
+        with ThreadPoolExecutor(max_workers=self.PAGE_WORKERS) as executor:
+            pending = deque()
+            for offset in offsets:
+                pending.append(executor.submit(fetch, offset))
+                if len(pending) >= 2 * self.PAGE_WORKERS:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
     def paginate(
         self, api, payload=None, method="post", result_key="items", filters=""
     ):
@@ -138,6 +300,14 @@ class PSMain(BaseMain):
         )
         yield resp.get(result_key, [])
 
+        offsets = self.get_page_offsets(offset, count, self.PAGE_SIZE)
+        if offsets and self.PAGE_WORKERS > 1:
+            logger.debug(f"Fetching {len(offsets)} pages of {url_path}")
+            yield from self.fetch_pages(
+                api, payload, offsets, method, result_key
+            )
+            return
+
         while offset:
             self.set_offset(payload=payload, offset=offset)
             resp = getattr(api, method)(**payload)
@@ -173,14 +343,13 @@ class PSMain(BaseMain):
 
         See https://api-rc.d1g1tdev.com/api/v1/data/ for all data api endpoints!
         """
-        dfs = []
+        results = PageAccumulator()
         resource = getattr(self.api.data, data_type)
         for items in self.paginate(
             resource, method="get", result_key="results"
         ):
-            df = pd.DataFrame(items)
-            dfs.append(df)
-        return pd.concat(dfs)
+            results.add(items)
+        return results.to_frame()
 
     def get_fx_data(self,fx_params: dict):
         extra_url = '?base=' + fx_params['base'] + '&foreign=' + fx_params['foreign'] + '&date=' + fx_params['date']
@@ -0,0 +1,180 @@
+"""
+Benchmark of the async calculation client against blocking posts.
+
+Runs a local fake calculation server that answers 202 until a calculation
+has run for the seconds given in its payload, then times a batch of
+calculations posted one after the other with D1G1TPSRestResource.post and
+all at once with AsyncCalculationClient.
+
+Sample Usage:
+    python -m ps.benchmark_calc_polling --calcs 20 --seconds 1 8
+    python -m ps.benchmark_calc_polling --location --retry-after 1
+"""
+
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import json
+import random
+import threading
+import time
+
+from ps.async_calc import AsyncCalculationClient
+from ps.base import D1g1tApi
+
+
+class FakeCalcServer(ThreadingHTTPServer):
+    """
+    Answers 202 to a calculation until payload["seconds"] have passed since
+    it was first posted, then 200 with the payload as the result.
+
+    :param location: send a status url to poll with GET in the 202s.
+    :param retry_after: Retry-After seconds to send in the 202s.
+    """
+
+    def __init__(self, location=False, retry_after=None):
+        super().__init__(("127.0.0.1", 0), FakeCalcHandler)
+        self.location = location
+        self.retry_after = retry_after
+        self.started = {}
+        self.payloads = {}
+        self.requests = {"POST": 0, "GET": 0}
+        self.bytes_posted = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeCalcHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body=None, headers=None) -> None:
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _answer(self, key: str) -> None:
+        server = self.server
+        payload = server.payloads[key]
+        if time.monotonic() - server.started[key] >= payload["seconds"]:
+            self._send(200, payload)
+            return
+
+        headers = {}
+        if server.location:
+            headers["Location"] = f"/api/v1/calc-status/{key}/"
+        if server.retry_after is not None:
+            headers["Retry-After"] = str(server.retry_after)
+        self._send(202, {"status": "running"}, headers)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        key = hashlib.sha256(body).hexdigest()[:16]
+        with self.server.lock:
+            self.server.requests["POST"] += 1
+            self.server.bytes_posted += len(body)
+            if key not in self.server.started:
+                self.server.started[key] = time.monotonic()
+                self.server.payloads[key] = json.loads(body)
+        self._answer(key)
+
+    def do_GET(self):
+        key = self.path.rstrip("/").split("/")[-1]
+        with self.server.lock:
+            self.server.requests["GET"] += 1
+        if key not in self.server.started:
+            self._send(404, {"detail": "Not found."})
+            return
+        self._answer(key)
+
+
+def get_api(url: str) -> D1g1tApi:
+    api = D1g1tApi({"DOMAIN": url, "USE_DASHES": True})
+    api.set_token("benchmark")
+    return api
+
+
+def get_calculations(n_calcs: int, min_seconds, max_seconds) -> list:
+    rng = random.Random(0)
+    return [
+        (
+            "cph-table",
+            {
+                "calc": idx,
+                "seconds": rng.uniform(min_seconds, max_seconds),
+                # stands in for a heavy payload
+                "settings": {"entities": list(range(2000))},
+            },
+        )
+        for idx in range(n_calcs)
+    ]
+
+
+def run_blocking(api, calculations):
+    return [
+        api.calc(calc).post(data=payload) for calc, payload in calculations
+    ]
+
+
+def run_async(api, calculations, max_concurrency):
+    client = AsyncCalculationClient(api, max_concurrency=max_concurrency)
+    return client.run(calculations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calcs", type=int, default=20)
+    parser.add_argument("--seconds", type=float, nargs=2, default=[1, 8])
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--location", action="store_true")
+    parser.add_argument("--retry-after", type=float, default=None)
+    args = parser.parse_args()
+
+    calculations = get_calculations(args.calcs, *args.seconds)
+    expected = [payload for _, payload in calculations]
+    print(
+        f"{args.calcs} calculations of {args.seconds[0]}-{args.seconds[1]}s"
+        f" (sum {sum(x['seconds'] for x in expected):.1f}s)"
+    )
+    print(
+        f"{'client':>9} {'seconds':>8} {'POSTs':>6} {'GETs':>6} {'MB posted':>10}"
+    )
+    runners = {
+        "blocking": lambda api: run_blocking(api, calculations),
+        "async": lambda api: run_async(
+            api, calculations, args.max_concurrency
+        ),
+    }
+    for name, runner in runners.items():
+        with FakeCalcServer(args.location, args.retry_after) as server:
+            start = time.perf_counter()
+            results = runner(get_api(server.url))
+            seconds = time.perf_counter() - start
+        assert results == expected, f"{name} returned wrong results"
+        print(
+            f"{name:>9} {seconds:>8.2f} {server.requests['POST']:>6}"
+            f" {server.requests['GET']:>6} {server.bytes_posted / 1024**2:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark of the columnar ChartTableFormatter against the row parser.
+
+Builds a synthetic cph-table like response (nested "name" levels, a date and
+numeric metric columns) and times parse_data both ways. A second response
+nests items deeper than the recursion limit, which only the columnar parser
+can read.
+
+Sample Usage:
+    python -m ps.benchmark_parser --rows 100000 --metrics 20
+"""
+
+import argparse
+import sys
+import time
+
+import numpy
+import pandas as pd
+
+from ps.parser import ChartTableFormatter
+
+
+def get_response(n_rows: int, n_metrics: int, n_levels: int = 3) -> dict:
+    """Response with about n_rows items spread over n_levels nested levels."""
+    rng = numpy.random.default_rng(0)
+    categories = [
+        {"id": "name", "name": "Name", "value_type": "string"},
+        {"id": "date", "name": "Date", "value_type": "integer"},
+    ] + [
+        {"id": f"metric-{i}", "name": f"Metric {i}", "value_type": "decimal"}
+        for i in range(n_metrics)
+    ]
+    # children per node so that all levels hold about n_rows items together
+    fan_out = max(2, int(round(n_rows ** (1 / n_levels))))
+    values = rng.normal(0, 1000, (n_rows, n_metrics))
+    count = 0
+
+    def get_items(depth):
+        nonlocal count
+        items = []
+        for _ in range(fan_out):
+            if count >= n_rows:
+                break
+            data = [
+                {"category_id": "name", "value": f"Node {count}"},
+                {"category_id": "date", "value": 1700000000000 + count},
+            ] + [
+                {"category_id": f"metric-{i}", "value": values[count, i]}
+                for i in range(n_metrics)
+            ]
+            count += 1
+            item = {"data": data}
+            if depth < n_levels:
+                item["items"] = get_items(depth + 1)
+            items.append(item)
+        return items
+
+    items = []
+    while count < n_rows:
+        items.extend(get_items(1))
+    return {"categories": categories, "items": items}
+
+
+def get_deep_response(depth: int) -> dict:
+    """One chain of nested items, depth levels deep."""
+    item = {"data": [{"category_id": "value", "value": float(depth)}]}
+    for level in range(depth - 1, 0, -1):
+        item = {
+            "data": [{"category_id": "value", "value": float(level)}],
+            "items": [item],
+        }
+    return {
+        "categories": [
+            {"id": "value", "name": "Value", "value_type": "decimal"}
+        ],
+        "items": [item],
+    }
+
+
+def time_parser(response: dict, columnar: bool):
+    start = time.perf_counter()
+    try:
+        res = ChartTableFormatter(response, columnar=columnar).parse_data()
+    except RecursionError:
+        return None, time.perf_counter() - start
+    return res, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--metrics", type=int, default=20)
+    parser.add_argument("--levels", type=int, default=3)
+    args = parser.parse_args()
+
+    response = get_response(args.rows, args.metrics, args.levels)
+    rows, seconds = time_parser(response, columnar=False)
+    columns, columnar_seconds = time_parser(response, columnar=True)
+    pd.testing.assert_frame_equal(rows, columns)
+    print(f"{len(columns)} rows x {columns.shape[1]} columns")
+    print(f"{'row parser':>16} {seconds:>8.2f}s")
+    print(f"{'columnar parser':>16} {columnar_seconds:>8.2f}s")
+
+    depth = sys.getrecursionlimit() * 2
+    response = get_deep_response(depth)
+    print(f"{depth} nested levels")
+    for columnar in (False, True):
+        res, seconds = time_parser(response, columnar=columnar)
+        name = "columnar parser" if columnar else "row parser"
+        result = "RecursionError" if res is None else f"{len(res)} rows"
+        print(f"{name:>16} {seconds:>8.2f}s {result}")
+
+
+if __name__ == "__main__":
+    main()
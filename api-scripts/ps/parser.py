@@ -26,7 +26,9 @@ class ChartTableFormatter:
 
     NESTED_CATEGORY_ID = "name"
 
-    def __init__(self, response, request_data=None, fill_blanks=False):
+    def __init__(
+        self, response, request_data=None, fill_blanks=False, columnar=True
+    ):
         """
         Create a DataFrame representation of standardized response data.
 
@@ -34,14 +36,17 @@ class ChartTableFormatter:
         :param request_data: data from request payload.
         :param fill_blanks: used to fill out missing nodes in parsed response.
         fyi: Doesn't work for contribution tables
+        :param columnar: fill one array per column instead of a list per row.
         """
         self.response = response
         self.categories = response["categories"]
         self.items = response["items"]
         self.request_data = request_data or {}
         self.columns = self._get_columns()
+        self.column_positions = self._get_column_positions()
         self.df_rows = []
         self.fill_blanks = fill_blanks
+        self.columnar = columnar
 
     @staticmethod
     def format_period_label(start_date, end_date) -> str:
@@ -137,15 +142,18 @@ class ChartTableFormatter:
 
         return label
 
-    def _get_data_depth(self, items):
+    @staticmethod
+    def _get_data_depth(items):
         """Return a number of nested `items` levels."""
-        if not items:
-            return 0
-
-        max_depth = max(
-            self._get_data_depth(items=item.get("items")) for item in items
-        )
-        return 1 + max_depth
+        max_depth = 0
+        stack = [(items, 1)]
+        while stack:
+            items, depth = stack.pop()
+            if not items:
+                continue
+            max_depth = max(max_depth, depth)
+            stack.extend((item.get("items"), depth + 1) for item in items)
+        return max_depth
 
     def _dfs_category(self, category, columns):
         """Deep first search a category and its sub-categories."""
@@ -234,6 +242,21 @@ class ChartTableFormatter:
                 return column
         return None
 
+    def _get_column_positions(self) -> dict:
+        """
+        Map (category_id, item depth) to the 0-based position of its column.
+
+        Depth is None for non nested categories, as they match at any depth.
+        The first column wins, as in `_get_column_for`.
+        """
+        positions = {}
+        for position, column in enumerate(self.columns):
+            depth = None
+            if column.category_id == self.NESTED_CATEGORY_ID:
+                depth = column.index
+            positions.setdefault((column.category_id, depth), position)
+        return positions
+
     @staticmethod
     def _include_fields(df, **kwargs) -> None:
         """
@@ -263,10 +286,12 @@ class ChartTableFormatter:
         """Parse response object. Matches _export_data."""
         hdrs = [column.category_name for column in self.columns]
 
-        for item in self.items:
-            self._get_row(item=item)
-
-        res = pd.DataFrame(self.df_rows, columns=hdrs)
+        if self.columnar:
+            res = self._get_columnar_frame(hdrs)
+        else:
+            for item in self.items:
+                self._get_row(item=item)
+            res = pd.DataFrame(self.df_rows, columns=hdrs)
         if any(res.columns.duplicated()):
             self._rename_name_cols(res)
         if self.fill_blanks:
@@ -293,6 +318,78 @@ class ChartTableFormatter:
         for nested_item in item.get("benchmarks", []):
             self._get_row(item=nested_item, current_depth=current_depth)
 
+    def _iter_items(self):
+        """Yield (item, depth) in row order, without recursion."""
+        stack = [(item, 1) for item in reversed(self.items)]
+        while stack:
+            item, depth = stack.pop()
+            yield item, depth
+            # pushed in reverse, so nested items come out first and in order
+            for benchmark in reversed(item.get("benchmarks", [])):
+                stack.append((benchmark, depth))
+            for nested_item in reversed(item.get("items", [])):
+                stack.append((nested_item, depth + 1))
+
+    def _get_columnar_frame(self, hdrs):
+        """
+        Same rows as `_get_row`, filled into one preallocated array per column.
+
+        A cell's column is looked up in `self.column_positions` instead of
+        scanning `self.columns`.
+        """
+        items = list(self._iter_items())
+        values = [
+            numpy.full(len(items), None, dtype=object) for _ in self.columns
+        ]
+        date_positions = {
+            position
+            for position, column in enumerate(self.columns)
+            if str(column.category_id).lower() == "date"
+        }
+        # integer timestamps are converted per column once all rows are read
+        timestamps = {position: {} for position in date_positions}
+        positions = self.column_positions
+        nested_id = self.NESTED_CATEGORY_ID
+
+        for row, (item, depth) in enumerate(items):
+            for data in item.get("data"):
+                category_id = data["category_id"]
+                key_depth = depth if category_id == nested_id else None
+                position = positions.get((category_id, key_depth))
+                if position is None:
+                    continue
+
+                value = data.get("value")
+                if position in date_positions:
+                    # a later value of the same cell replaces the timestamp
+                    pending = timestamps[position]
+                    pending.pop(row, None)
+                    if type(value) is int:
+                        pending[row] = value
+                        continue
+                    if isinstance(value, int):
+                        value = self.timestamp_to_datetime(value)
+
+                if isinstance(value, numpy.float64):
+                    value = float(value)
+                values[position][row] = value
+
+        for position, row_stamps in timestamps.items():
+            if row_stamps:
+                rows = list(row_stamps)
+                stamps = self.timestamp_to_datetime(
+                    numpy.array(list(row_stamps.values()))
+                )
+                values[position][rows] = numpy.array(
+                    list(stamps), dtype=object
+                )
+
+        res = pd.DataFrame(dict(enumerate(values)), index=range(len(items)))
+        # numeric columns get the dtypes the row parser infers
+        res = res.infer_objects()
+        res.columns = hdrs
+        return res
+
     @staticmethod
     def _rename_name_cols(df):
         """Rename all 'Name' columns in dataframe if there are multiple."""
@@ -1,11 +1,13 @@
 import logging
-from typing import List, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 import warnings
 
 import pandas as pd
 
 import layers.recon.data_processing as dp
-from layers.recon.data_processing.d1g1t import get_d1g1t_client_data
+from layers.recon.data_processing.d1g1t.provider import D1g1tDataProvider
 from layers.recon.utils import get_ignored_accounts, archive_s3_files
 from layers.recon.exceptions import (
     ClientDataNotFoundException,
@@ -15,11 +17,18 @@ from layers.recon.exceptions import (
     FirmSpecificLogicException,
 )
 from layers.recon.validation import validate_custodian_data
+from layers.recon.incremental import get_recon_snapshot_file
+from layers.recon.profiling import (
+    StageProfiler,
+    get_rows,
+    get_timing_report_filename,
+)
 import layers.recon.data_processing.d1g1t_clients as dc
 from layers.recon.reporting import (
     send_recon_summary,
     send_recon_to_spotlight,
-    generate_output_file,
+    generate_output_files,
+    OUTPUT_FORMATS,
     get_recon_output_filename,
     generate_breaking_accounts,
 )
@@ -28,6 +37,8 @@ warnings.filterwarnings("ignore", category=RuntimeWarning)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CUSTODIAN_FETCH_WORKERS = 1  # 1 keeps the serial feed retrieval
+
 
 class CustodianValidation:
     def __init__(
@@ -36,6 +47,8 @@ class CustodianValidation:
         client_info: dict,
         custodian_metric_map: dict,
         custodian_aliases: dict,
+        feed_cache: Optional[dict] = None,
+        d1g1t_data: Optional[D1g1tDataProvider] = None,
     ) -> None:
         self.environment = environment
         self.client_info = client_info
@@ -43,6 +56,9 @@ class CustodianValidation:
         self.custodian_aliases = custodian_aliases
         self.recon_metric_map = {}
         self.custodian_data_error_msg = ""
+        self.feed_cache = feed_cache
+        self.d1g1t_data = d1g1t_data or D1g1tDataProvider()
+        self.profiler = StageProfiler()
 
     @staticmethod
     def get_custodian_n_feed(custdn_feed: str) -> Tuple:
@@ -87,12 +103,48 @@ class CustodianValidation:
             msg = "Threshold settings are incorrect. Correct format is: metric,threshold_type,threshold|..."
             raise InputValidationException(msg)
 
+    def get_snapshot_file(self, client: str) -> Optional[str]:
+        """Recon snapshot used for incremental recons, if configured."""
+        snapshot_path = self.client_info.get(
+            "recon_snapshot_path"
+        )  # Remove get once added to config
+        if pd.isna(snapshot_path) or not snapshot_path:
+            return None
+        return get_recon_snapshot_file(snapshot_path.strip(), client)
+
     @staticmethod
     def get_additional_columns(cols: str) -> List[str]:
         if not cols:
             return []
         return [x.strip() for x in cols.split(",")]
 
+    def get_output_formats(self) -> List[str]:
+        """Formats written next to the csv output files, e.g. csv.gz,parquet"""
+        formats = self.client_info.get(
+            "output_file_formats", ""
+        )  # Remove get once added to config
+        if pd.isna(formats) or not formats:
+            return []
+        formats = [x.strip() for x in formats.split(",")]
+        unsupported = [x for x in formats if x not in OUTPUT_FORMATS]
+        if unsupported:
+            msg = f"Unsupported output file formats {unsupported}. Expected any of {OUTPUT_FORMATS}."
+            raise InputValidationException(msg)
+        return formats
+
+    def get_custodian_fetch_workers(self) -> int:
+        """Number of custodian feeds retrieved concurrently for a firm."""
+        workers = self.client_info.get(
+            "custodian_fetch_workers", DEFAULT_CUSTODIAN_FETCH_WORKERS
+        )  # Remove get once added to config
+        if pd.isna(workers) or workers == "":
+            return DEFAULT_CUSTODIAN_FETCH_WORKERS
+        try:
+            return max(1, int(workers))
+        except ValueError:
+            msg = "Custodian fetch workers is invalid. Expected a positive integer."
+            raise InputValidationException(msg)
+
     def get_single_custodian_data(
         self, firm: str, client: str, custdn_feed: str, dte: str
     ) -> pd.DataFrame:
@@ -106,6 +158,7 @@ class CustodianValidation:
         try:
             cls = getattr(dp, custodian_str)
             custodian = cls(firm, client, custodian_str, feed_str, region_str, metrics)
+            custodian.feed_cache = self.feed_cache
             df = custodian.get_custdn_data(dte)
             df["custodian_mapper"] = custodian_str
             self.recon_metric_map[custodian_str] = metrics
@@ -114,6 +167,29 @@ class CustodianValidation:
             raise CustodianFeedException(msg)
         return df
 
+    def get_timed_custodian_data(
+        self, firm: str, client: str, custdn_feed: str, dte: str
+    ) -> Tuple[Optional[pd.DataFrame], Optional[Exception]]:
+        """
+        Retrieves a single feed, isolating its errors from the other feeds.
+        :return: (feed frame, None) on success or (None, exception) on failure.
+        """
+        logger.info(f"Retrieving {custdn_feed} feed for {firm}...")
+        start_time = time.perf_counter()
+        with self.profiler.stage("custodian_fetch", custodian=custdn_feed) as stage:
+            try:
+                df = self.get_single_custodian_data(firm, client, custdn_feed, dte)
+                stage["rows_out"] = get_rows(df)
+                return df, None
+            except Exception as err:
+                stage["error"] = str(err)
+                return None, err
+            finally:
+                elapsed = time.perf_counter() - start_time
+                logger.info(
+                    f"Retrieved {custdn_feed} feed for {firm} in {elapsed:.2f}s."
+                )
+
     def get_firm_custodian_data(
         self,
         firm: str,
@@ -121,22 +197,47 @@ class CustodianValidation:
         custdn_feeds: list,
         dte: str,
     ) -> pd.DataFrame:
+        workers = min(self.get_custodian_fetch_workers(), len(custdn_feeds))
+        if workers > 1:
+            logger.info(f"Retrieving {firm} feeds with {workers} workers...")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(
+                        self.get_timed_custodian_data, firm, client, custdn_feed, dte
+                    )
+                    for custdn_feed in custdn_feeds
+                ]
+                feed_results = [future.result() for future in futures]
+        else:
+            feed_results = [
+                self.get_timed_custodian_data(firm, client, custdn_feed, dte)
+                for custdn_feed in custdn_feeds
+            ]
+
         result = []
-        for custdn_feed in custdn_feeds:
-            logger.info(f"Retrieving {custdn_feed} feed for {firm}...")
-            try:
-                df = self.get_single_custodian_data(firm, client, custdn_feed, dte)
-                result.append(df)
-            except Exception as err:
+        for custdn_feed, (df, err) in zip(custdn_feeds, feed_results):
+            if err is not None:
                 msg = f"Exception while retrieving feed from {custdn_feed} for {firm}: {err} "
                 logger.error(msg)
                 logger.warning("Continuing...")
+                continue
+            result.append(df)
         if not result:
             msg = f"Could not retrieve {firm} data feeds for: {custdn_feeds}! Please check Cloudwatch for details."
             self.custodian_data_error_msg += msg + "\n"
             raise ClientDataNotFoundException(msg)
+        self.order_recon_metric_map(custdn_feeds)
         return pd.concat(result)
 
+    def order_recon_metric_map(self, custdn_feeds: list) -> None:
+        """Keeps recon_metric_map in feed order regardless of completion order."""
+        custodians = [self.get_custodian_n_feed(x)[0] for x in custdn_feeds]
+        self.recon_metric_map = {
+            custodian: self.recon_metric_map[custodian]
+            for custodian in dict.fromkeys(custodians)
+            if custodian in self.recon_metric_map
+        }
+
     @staticmethod
     def __column_rename(rename: str) -> Tuple:
         old_col, new_col = rename.split("|")
@@ -219,8 +320,9 @@ class CustodianValidation:
         additional_output_columns = self.get_additional_columns(
             self.client_info["additional_output_columns"]
         )
+        output_formats = self.get_output_formats()
         custodian_df = self.get_firm_custodian_data(firm, client, custdn_feeds, dte)
-        d1g1t_df = get_d1g1t_client_data(
+        d1g1t_df = self.d1g1t_data.get_client_data(
             firm,
             client,
             d1g1t_input_path,
@@ -238,18 +340,28 @@ class CustodianValidation:
             self.recon_metric_map,
             ignored_accounts,
             additional_output_columns,
+            self.get_snapshot_file(client),
         )
-        recon_frame = self.get_alive_positions_in_recon(recon_frame)
-        recon_frame = self.get_firm_specific_post_recon_logic(firm, client, recon_frame)
+        with self.profiler.stage(
+            "firm_post_processing", rows_in=get_rows(recon_frame)
+        ) as stage:
+            recon_frame = self.get_alive_positions_in_recon(recon_frame)
+            recon_frame = self.get_firm_specific_post_recon_logic(
+                firm, client, recon_frame
+            )
+            stage["rows_out"] = get_rows(recon_frame)
 
         # archive old files from previous day
         for source_path in output_paths:
-            try:
-                archive_s3_files(source_path, archive_name="archive")
-            except Exception as e:
-                msg = f"Could not archive {source_path} due to the following exception: {e}"
-                logger.error(msg)
-                continue
+            with self.profiler.stage("archive") as stage:
+                try:
+                    stage["rows_out"], stage["bytes"] = archive_s3_files(
+                        source_path, archive_name="archive"
+                    )
+                except Exception as e:
+                    msg = f"Could not archive {source_path} due to the following exception: {e}"
+                    logger.error(msg)
+                    continue
 
         output_filenames = []
         output_filenames_excs = []
@@ -263,46 +375,49 @@ class CustodianValidation:
                 self.environment, output_path, client, dte, "_exceptions"
             ).strip()
 
-            generate_breaking_accounts(
-                recon_frame,
-                self.environment,
-                d1g1t_input_path,
-                output_path,
-                client,
-                dte,
-            )
+            with self.profiler.stage("breaking_accounts", rows_in=len(recon_frame)):
+                generate_breaking_accounts(
+                    recon_frame,
+                    self.environment,
+                    d1g1t_input_path,
+                    output_path,
+                    client,
+                    dte,
+                )
 
             output_filenames.append(output_filename)
             output_filenames_excs.append(output_filename_excs)
 
         # send summary to spotlight
-        try:
-            send_recon_to_spotlight(
-                recon_frame=recon_frame,
-                client_info=self.client_info,
-                environment=self.environment,
-                client_version=client_version,
-                dte=dte,
-            )
-        except Exception as e:
-            msg = f"Could not send recon summaries to spotlight: {e}"
-            logger.error(msg)
-
-        # slack summary reporting
-        for slack_channel in slack_webhook_urls:
+        with self.profiler.stage("spotlight", rows_in=len(recon_frame)):
             try:
-                send_recon_summary(
+                send_recon_to_spotlight(
                     recon_frame=recon_frame,
-                    client=client,
-                    dte=dte,
-                    output_filename=output_filenames[0],
                     client_info=self.client_info,
-                    slack_webhook_URL=slack_channel.strip(),
+                    environment=self.environment,
+                    client_version=client_version,
+                    dte=dte,
                 )
-            except ValueError:
-                msg = "slack channel is not provided for posting summary."
+            except Exception as e:
+                msg = f"Could not send recon summaries to spotlight: {e}"
                 logger.error(msg)
-                logger.warning("Continuing...")
+
+        # slack summary reporting
+        for slack_channel in slack_webhook_urls:
+            with self.profiler.stage("slack", rows_in=len(recon_frame)):
+                try:
+                    send_recon_summary(
+                        recon_frame=recon_frame,
+                        client=client,
+                        dte=dte,
+                        output_filename=output_filenames[0],
+                        client_info=self.client_info,
+                        slack_webhook_URL=slack_channel.strip(),
+                    )
+                except ValueError:
+                    msg = "slack channel is not provided for posting summary."
+                    logger.error(msg)
+                    logger.warning("Continuing...")
 
         recon_frame_excs = recon_frame[
             recon_frame.filter(like="_reconciled").eq(False).any(axis=1)
@@ -319,14 +434,18 @@ class CustodianValidation:
             logger.warning("Continuing...")
 
         # generate output files
-        for output_filename, output_filename_excs in zip(
-            output_filenames, output_filenames_excs
-        ):
-            generate_output_file(recon_frame, d1g1t_input_path, output_filename, client)
-            generate_output_file(
-                recon_frame_excs, d1g1t_input_path, output_filename_excs, client
+        with self.profiler.stage("output_write", rows_in=len(recon_frame)):
+            generate_output_files(
+                recon_frame, d1g1t_input_path, output_filenames, client, output_formats
+            )
+            generate_output_files(
+                recon_frame_excs,
+                d1g1t_input_path,
+                output_filenames_excs,
+                client,
+                output_formats,
             )
-        return output_filename
+        return output_filenames[-1]
 
 
 def run(
@@ -339,15 +458,30 @@ def run(
     custodian_metric_map: dict,
     reporting_currency: str,
     custodian_aliases: dict,
+    feed_cache: Optional[dict] = None,
+    d1g1t_data: Optional[D1g1tDataProvider] = None,
 ):
     runner = CustodianValidation(
-        environment, client_info, custodian_metric_map, custodian_aliases
+        environment,
+        client_info,
+        custodian_metric_map,
+        custodian_aliases,
+        feed_cache,
+        d1g1t_data,
     )
-    output_filename = runner.run_custodian_validation(
+    with runner.profiler.activate():
+        output_filename = runner.run_custodian_validation(
+            firm=firm,
+            client=client,
+            client_version=client_version,
+            dte=date,
+            reporting_currency=reporting_currency,
+        )
+    runner.profiler.save_report(
+        get_timing_report_filename(output_filename),
         firm=firm,
         client=client,
-        client_version=client_version,
-        dte=date,
-        reporting_currency=reporting_currency,
+        date=date,
+        environment=environment,
     )
     return output_filename
@@ -9,6 +9,10 @@ logger = logging.getLogger(__name__)
 
 
 class Custodian(ABC):
+    # True when read_data only depends on client, feed, region and date so the
+    # raw frame can be shared between firms reading the same feed.
+    shares_feed = False
+
     def __init__(
         self,
         firm: str,
@@ -25,6 +29,7 @@ class Custodian(ABC):
         self.custodian = custodian.lower()
         self.feed_path = self.get_feed_path
         self.metrics = metrics
+        self.feed_cache = None
 
     @property
     def get_feed_path(self) -> str:
@@ -36,6 +41,20 @@ class Custodian(ABC):
         metric_cols = [f"custodian_{metric}" for metric in self.metrics]
         return position_cols + metric_cols
 
+    def read_shared_data(self, dte: str) -> pd.DataFrame:
+        """
+        read_data through the batch feed cache when one is set.
+        :param: dte: date string representing dated bucket where data is read.
+        """
+        if self.feed_cache is None or not self.shares_feed:
+            return self.read_data(dte)
+        key = (self.custodian, self.client, self.feed, self.region, dte)
+        if key not in self.feed_cache:
+            self.feed_cache[key] = self.read_data(dte)
+        else:
+            logger.info(f"Reusing {self.custodian} {self.feed} feed for {self.firm}..")
+        return self.feed_cache[key].copy()
+
     @abstractmethod
     def read_data(self, dte: str) -> pd.DataFrame:
         """Implements retrieval of custodian data from s3
@@ -1,15 +1,20 @@
 import pandas as pd
 import logging
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 from layers.recon.data_processing.custodians.custodian import Custodian
+from layers.recon.data_processing.fixed_width import read_fixed_width
 from layers.recon.datehandler import DateUtils, STD_DATE_FORMAT
 from layers.recon.exceptions import InputValidationException
+from layers.recon.reference_cache import read_reference_csv
 
 logger = logging.getLogger(__name__)
 
 
 class Fidelity(Custodian):
+    shares_feed = True
+
     def __init__(
         self,
         firm: str,
@@ -47,12 +52,25 @@ class Fidelity(Custodian):
             "custodian_acb": (217, 233),
         }
 
+        # implied decimal divisors of the signed numeric fields
+        self.sr_scales = {
+            "current_qty": 10000,
+            "sfk_qty": 10000,
+            "pending_qty": 10000,
+            "custodian_bv_ac_cad_usd": 100000,
+            "offbook_qty": 10000,
+            "custodian_mv_bid_price": 100,
+            "custodian_acb": 100000,
+        }
+
         self.dc_cols = {
             "acc_id": (3, 11),
             "acc_currency": (21, 22),
             "cash_balance": (95, 109),
         }
 
+        self.dc_scales = {"cash_balance": -100}  # cash balances have inverted sign
+
         self.sm_cols = {
             "raw_instrument": (3, 12),
             "custodian_bid_price": (50, 69),
@@ -60,12 +78,20 @@ class Fidelity(Custodian):
             "custodian_last_price": (88, 107),
         }
 
+        self.sm_scales = {
+            "custodian_bid_price": 1000000000000,
+            "custodian_ask_price": 1000000000000,
+            "custodian_last_price": 1000000000000,
+        }
+
         self.sm2_cols = {
             "raw_instrument": (110, 119),
             "uom": (99, 110),
             "custodian_price": (132, 143),
         }
 
+        self.sm2_scales = {"uom": 1, "custodian_price": 1}
+
         self.process_return_columns = [
             "date",
             "account",
@@ -76,47 +102,12 @@ class Fidelity(Custodian):
         """
         Access has different file extension for different clients - we store them in a file on FTP
         """
-        self.extension_file = pd.read_csv(
+        self.extension_file = read_reference_csv(
             "s3://d1g1t-custodian-data-ca/fidelity/mapping-rules/fidelity_file_extensions.csv"
         )
 
         self.currency_map = self.get_currency_map()
 
-    def transform_number_sec(self, df: pd.DataFrame, qty_type) -> float:
-        """
-        special logic for fidelity to transform cash/security and identify if it is a positive nuumber
-        input: number that need to be transferred and type of the number - either cash or sec
-        output: transferred number
-        """
-        res = df[qty_type].copy()
-        idx = res.str[-1] == "-"
-        res[idx] = "-" + res[idx].str[:-1]
-        res = pd.to_numeric(res, errors="coerce")
-        if qty_type == "custodian_mv_bid_price":
-            res = res * 100
-        if qty_type in [
-            "custodian_bid_price",
-            "custodian_last_price",
-            "custodian_ask_price",
-        ]:
-            res = res / 100000000
-        if qty_type in [
-            "custodian_bv_ac_cad_usd",
-            "custodian_acb",
-        ]:
-            res = res / 100000
-        else:
-            res = res / 10000
-        return res
-
-    def transform_number_cash(self, df: pd.DataFrame) -> float:
-        res = df["cash_balance"].copy()
-        idx = res.str[-1] == "-"
-        res[idx] = "-" + res[idx].str[:-1]
-        res = pd.to_numeric(res, errors="coerce")
-        res = res / 100 * (-1)
-        return res
-
     def read_data_sr(self, file_date: str):
         """
         read data from one of the input file - sr file
@@ -124,30 +115,14 @@ class Fidelity(Custodian):
         """
         extension = self.get_client_extension(self.feed)
         s3_file_sr = f"{self.feed_path}/{file_date}/sr{file_date[2:8]}.{extension}"
-        data_sr = pd.read_fwf(
-            s3_file_sr,
-            colspecs=list(self.sr_cols.values()),
-            names=self.sr_cols.keys(),
-            dtype=str,
-        )
+        data_sr = read_fixed_width(s3_file_sr, self.sr_cols, self.sr_scales)
 
-        data_sr["custodian_mv_bid_price"] = self.transform_number_sec(
-            data_sr, "custodian_mv_bid_price"
-        )
-        data_sr["custodian_bv_ac_cad_usd"] = self.transform_number_sec(
-            data_sr, "custodian_bv_ac_cad_usd"
-        )
-        data_sr["current_qty"] = self.transform_number_sec(data_sr, "current_qty")
-        data_sr["pending_qty"] = self.transform_number_sec(data_sr, "pending_qty")
-        data_sr["sfk_qty"] = self.transform_number_sec(data_sr, "sfk_qty")
-        data_sr["offbook_qty"] = self.transform_number_sec(data_sr, "offbook_qty")
         data_sr["current_qty"] = (
             data_sr["pending_qty"].fillna(0)
             + data_sr["current_qty"].fillna(0)
             + data_sr["sfk_qty"].fillna(0)
             + data_sr["offbook_qty"].fillna(0)
         )
-        data_sr["custodian_acb"] = self.transform_number_sec(data_sr, "custodian_acb")
         data_sr.rename(
             columns={"cusip": "raw_instrument", "current_qty": "qty"}, inplace=True
         )
@@ -161,14 +136,7 @@ class Fidelity(Custodian):
         extension = self.get_client_extension(self.feed)
         s3_file_dc = f"{self.feed_path}/{file_date}/dc{file_date[2:8]}.{extension}"
 
-        data_dc = pd.read_fwf(
-            s3_file_dc,
-            colspecs=list(self.dc_cols.values()),
-            names=self.dc_cols.keys(),
-            dtype="str",
-        )
-
-        data_dc["cash_balance"] = self.transform_number_cash(data_dc)
+        data_dc = read_fixed_width(s3_file_dc, self.dc_cols, self.dc_scales)
 
         data_dc.rename(
             columns={"acc_currency": "raw_instrument", "cash_balance": "qty"},
@@ -183,18 +151,9 @@ class Fidelity(Custodian):
         """
         s3_file_sm2 = f"{self.feed_path}/{file_date}/sm2{file_date[2:8]}.fid"
 
-        data_sm2 = pd.read_fwf(
-            s3_file_sm2,
-            colspecs=list(self.sm2_cols.values()),
-            names=self.sm2_cols.keys(),
-            dtype="str",
-            encoding="unicode_escape",
+        data_sm2 = read_fixed_width(
+            s3_file_sm2, self.sm2_cols, self.sm2_scales, encoding="unicode_escape"
         )
-
-        data_sm2["uom"] = data_sm2["uom"].astype(float)
-        data_sm2["custodian_price"] = pd.to_numeric(
-            data_sm2["custodian_price"], errors="coerce"
-        ).astype("float64")
         data_sm2.drop_duplicates(inplace=True)
         return data_sm2
 
@@ -205,22 +164,8 @@ class Fidelity(Custodian):
         """
         s3_file_sm = f"{self.feed_path}/{file_date}/sm{file_date[2:8]}"
 
-        data_sm = pd.read_fwf(
-            s3_file_sm,
-            colspecs=list(self.sm_cols.values()),
-            names=self.sm_cols.keys(),
-            dtype="str",
-            encoding="unicode_escape",
-        )
-
-        data_sm["custodian_bid_price"] = self.transform_number_sec(
-            data_sm, "custodian_bid_price"
-        )
-        data_sm["custodian_ask_price"] = self.transform_number_sec(
-            data_sm, "custodian_ask_price"
-        )
-        data_sm["custodian_last_price"] = self.transform_number_sec(
-            data_sm, "custodian_last_price"
+        data_sm = read_fixed_width(
+            s3_file_sm, self.sm_cols, self.sm_scales, encoding="unicode_escape"
         )
         data_sm.drop_duplicates(inplace=True)
         return data_sm
@@ -241,16 +186,33 @@ class Fidelity(Custodian):
         tday = datetime.datetime.strptime(tday, STD_DATE_FORMAT)
         file_date = DateUtils.get_custodian_date(tday)
 
-        data_sr = self.read_data_sr(file_date)
-        data_dc = self.read_data_dc(file_date)
-        data_sm2 = self.read_data_sm2(file_date)
-        data_sm = self.read_data_sm(file_date)
+        readers = [
+            self.read_data_sr,
+            self.read_data_dc,
+            self.read_data_sm2,
+            self.read_data_sm,
+        ]
+        with ThreadPoolExecutor(max_workers=len(readers)) as executor:
+            futures = [executor.submit(reader, file_date) for reader in readers]
+            data_sr, data_dc, data_sm2, data_sm = [x.result() for x in futures]
+
+        security_master = self.get_security_master(data_sm2, data_sm)
         data = pd.concat([data_sr, data_dc])
-        data = pd.merge(data, data_sm2, on="raw_instrument", how="left")
-        data = pd.merge(data, data_sm, on="raw_instrument", how="left")
+        data = data.join(security_master, on="raw_instrument")
         data["date"] = pd.to_datetime(file_date)
         return data
 
+    @staticmethod
+    def get_security_master(
+        data_sm2: pd.DataFrame, data_sm: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Combines the sm2 (scale) and sm (prices) files into a single frame
+        indexed on raw_instrument so positions are joined against it once.
+        """
+        security_master = pd.merge(data_sm2, data_sm, on="raw_instrument", how="outer")
+        return security_master.set_index("raw_instrument")
+
     def set_cash_currency(self, custodian_df):
         custodian_df.replace({"raw_instrument": self.currency_map}, inplace=True)
         return custodian_df
@@ -263,7 +225,7 @@ class Fidelity(Custodian):
 
     def get_currency_map(self) -> dict:
         return (
-            pd.read_csv(
+            read_reference_csv(
                 "s3://d1g1t-custodian-data-ca/fidelity/mapping-rules/fidelity_currency.csv"
             )
             .set_index("character")["currency"]
@@ -303,6 +265,6 @@ class Fidelity(Custodian):
         return df
 
     def get_custdn_data(self, dte) -> pd.DataFrame:
-        df = self.read_data(dte)
+        df = self.read_shared_data(dte)
         res = self.process_data(df)
         return res
@@ -4,6 +4,7 @@ import logging
 
 from layers.recon.data_processing.custodians.custodian import Custodian
 from layers.recon.datehandler import DateUtils, STD_DATE_FORMAT
+from layers.recon.reference_cache import read_reference_csv
 from layers.recon.exceptions import (
     InputValidationException,
     ClientDataNotFoundException,
@@ -45,7 +46,7 @@ class NBIN(Custodian):
 
     @property
     def get_currency_map(self) -> dict:
-        df = pd.read_csv(
+        df = read_reference_csv(
             "s3://d1g1t-custodian-data-ca/nbin/mapping-rules/NBINAccountCurrencyMapping.csv",
             index_col="Last digit",
             dtype=str,
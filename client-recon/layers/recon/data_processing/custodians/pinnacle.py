@@ -5,6 +5,7 @@ import datetime
 from layers.recon.data_processing.custodians.custodian import Custodian
 from layers.recon.datehandler import DateUtils, STD_DATE_FORMAT
 from layers.recon.exceptions import InputValidationException
+from layers.recon.reference_cache import read_reference_csv
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +44,7 @@ class Pinnacle(Custodian):
         """
         Pinnacle has different middle file name for different clients - we store them in a file on FTP
         """
-        self.extension_file = pd.read_csv(
+        self.extension_file = read_reference_csv(
             "s3://d1g1t-custodian-data-ca/pinnacle/mapping-rules/pinnacle_file_extensions.csv"
         )
 
@@ -2,6 +2,7 @@ import pandas as pd
 import logging
 
 from layers.recon.data_processing.custodians.custodian import Custodian
+from layers.recon.data_processing.fixed_width import read_fixed_width
 from layers.recon.datehandler import DateUtils as dtU
 from layers.recon.data_processing.d1g1t import SUPPORTED_CURRENCIES
 
@@ -9,6 +10,8 @@ logger = logging.getLogger(__name__)
 
 
 class RJCS(Custodian):
+    shares_feed = True
+
     def __init__(
         self,
         firm: str,
@@ -31,17 +34,31 @@ class RJCS(Custodian):
             "custodian_bv_ac_cad_usd": (187, 204),
         }
 
+        # implied decimal divisors of the signed numeric fields
+        self.sr_scales = {
+            "current_qty": 10000,
+            "sfk_qty": 10000,
+            "pending_qty": 10000,
+            "offbook_qty": 10000,
+            "custodian_mv_clean_ac_cad_usd": 100,
+            "custodian_bv_ac_cad_usd": 100000,
+        }
+
         self.dc_cols = {
             "acc_id": (3, 11),
             "acc_currency": (21, 22),
             "cash_balance": (95, 109),
         }
 
+        self.dc_scales = {"cash_balance": -100}  # cash balances have inverted sign
+
         self.sm2_cols = {
             "raw_instrument": (110, 119),
             "custodian_price": (132, 143),  # last trade price
         }
 
+        self.sm2_scales = {"custodian_price": 1}
+
         self.process_return_columns = [
             "date",
             "account",
@@ -51,56 +68,16 @@ class RJCS(Custodian):
 
         self.cash_currency = {"C": "CAD", "U": "USD", "E": "EUR"}
 
-    def transform_number_sec(self, df: pd.DataFrame, qty_type) -> float:
-        """
-        special logic for RJCS to transform cash/security and identify if it is a positive nuumber
-        input: number that need to be transferred and type of the number - either cash or sec
-        output: transferred number
-        """
-        res = df[qty_type].copy()
-        idx = res.str[-1] == "-"
-        res[idx] = "-" + res[idx].str[:-1]
-        res = pd.to_numeric(res, errors="coerce")
-        if qty_type == "custodian_mv_clean_ac_cad_usd":
-            res = res / 100
-        elif qty_type == "custodian_bv_ac_cad_usd":
-            res = res / 100000
-        else:
-            res = res / 10000
-        return res
-
-    def transform_number_cash(self, df: pd.DataFrame) -> float:
-        res = df["cash_balance"].copy()
-        idx = res.str[-1] == "-"
-        res[idx] = "-" + res[idx].str[:-1]
-        res = pd.to_numeric(res, errors="coerce")
-        res = res / 100 * (-1)
-        return res
-
     def read_data_sr(self, file_date: str):
         """
         read data from one of the input file - sr file
         output: dataframe from sr
         """
         s3_file_sr = f"{self.feed_path}/{file_date}/sr"
-        data_sr = pd.read_fwf(
-            s3_file_sr,
-            colspecs=list(self.sr_cols.values()),
-            names=self.sr_cols.keys(),
-            dtype=str,
-            encoding="unicode_escape",
+        data_sr = read_fixed_width(
+            s3_file_sr, self.sr_cols, self.sr_scales, encoding="unicode_escape"
         )
 
-        data_sr["current_qty"] = self.transform_number_sec(data_sr, "current_qty")
-        data_sr["pending_qty"] = self.transform_number_sec(data_sr, "pending_qty")
-        data_sr["sfk_qty"] = self.transform_number_sec(data_sr, "sfk_qty")
-        data_sr["offbook_qty"] = self.transform_number_sec(data_sr, "offbook_qty")
-        data_sr["custodian_mv_clean_ac_cad_usd"] = self.transform_number_sec(
-            data_sr, "custodian_mv_clean_ac_cad_usd"
-        )
-        data_sr["custodian_bv_ac_cad_usd"] = self.transform_number_sec(
-            data_sr, "custodian_bv_ac_cad_usd"
-        )
         data_sr["qty"] = (
             data_sr["pending_qty"].fillna(0)
             + data_sr["current_qty"].fillna(0)
@@ -117,15 +94,11 @@ class RJCS(Custodian):
         """
         s3_file_dc = f"{self.feed_path}/{file_date}/dc"
 
-        data_dc = pd.read_fwf(
-            s3_file_dc,
-            colspecs=list(self.dc_cols.values()),
-            names=self.dc_cols.keys(),
-            dtype=str,
-            encoding="unicode_escape",
+        data_dc = read_fixed_width(
+            s3_file_dc, self.dc_cols, self.dc_scales, encoding="unicode_escape"
         )
 
-        data_dc["qty"] = self.transform_number_cash(data_dc)
+        data_dc["qty"] = data_dc["cash_balance"]
 
         data_dc.rename(
             columns={"acc_currency": "raw_instrument"},
@@ -140,17 +113,9 @@ class RJCS(Custodian):
         """
         read_data_sm2 = f"s3://d1g1t-custodian-data-ca/rjcs/secmaster/{file_date}/sm2"
 
-        data_sm2 = pd.read_fwf(
-            read_data_sm2,
-            colspecs=list(self.sm2_cols.values()),
-            names=self.sm2_cols.keys(),
-            dtype=str,
-            encoding="unicode_escape",
-        )
-        data_sm2["custodian_price"] = pd.to_numeric(
-            data_sm2["custodian_price"], errors="coerce"
+        data_sm2 = read_fixed_width(
+            read_data_sm2, self.sm2_cols, self.sm2_scales, encoding="unicode_escape"
         )
-        data_sm2["custodian_price"] = data_sm2["custodian_price"].astype(float)
         data_sm2.drop_duplicates(inplace=True)
         return data_sm2
 
@@ -188,6 +153,6 @@ class RJCS(Custodian):
         return df[self.custodian_return_cols]
 
     def get_custdn_data(self, dte) -> pd.DataFrame:
-        df = self.read_data(dte)
+        df = self.read_shared_data(dte)
         res = self.process_data(df)
         return res
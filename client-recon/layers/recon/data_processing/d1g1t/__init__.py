@@ -8,6 +8,8 @@ from layers.recon.exceptions import (
     FirmSpecificLogicException,
 )
 from layers.recon.datehandler import DateUtils
+from layers.recon.utils import factorize_keys, isin_keys, restore_keys
+from layers.recon.profiling import profile_stage
 import layers.recon.data_processing.d1g1t_clients as dc
 from layers.recon.data_processing.d1g1t import v3, v4
 
@@ -147,27 +149,33 @@ def get_d1g1t_client_data(
     reporting_currency: str,
     custodian_aliases: dict,
 ) -> pd.DataFrame:
-    df_sql = get_client_sql_exract(
-        client,
-        path,
-        environment,
-    )
-    df_ba = get_client_basis_analytics(
-        firm,
-        client,
-        environment,
-        client_version,
-        recon_funds,
-        dt,
-        reporting_currency,
-    )
-    if not df_ba.empty:
-        df_d1g1t = combine_sql_extract_and_basis_anls(df_sql, df_ba, firm)
-    else:
-        df_d1g1t = df_sql
-    df_d1g1t.rename(columns=RENAMED_METRIC_COLS, inplace=True)
-    result = get_firm_specific_logic(firm, client, df_d1g1t)
-    result["custodian"] = get_recon_custodian(result, custodian_aliases)
+    with profile_stage("d1g1t_sql_extract") as stage:
+        df_sql = get_client_sql_exract(
+            client,
+            path,
+            environment,
+        )
+        stage["rows_out"] = len(df_sql)
+    with profile_stage("d1g1t_basis_analytics") as stage:
+        df_ba = get_client_basis_analytics(
+            firm,
+            client,
+            environment,
+            client_version,
+            recon_funds,
+            dt,
+            reporting_currency,
+        )
+        stage["rows_out"] = len(df_ba)
+    with profile_stage("d1g1t_processing", rows_in=len(df_sql) + len(df_ba)) as stage:
+        if not df_ba.empty:
+            df_d1g1t = combine_sql_extract_and_basis_anls(df_sql, df_ba, firm)
+        else:
+            df_d1g1t = df_sql
+        df_d1g1t.rename(columns=RENAMED_METRIC_COLS, inplace=True)
+        result = get_firm_specific_logic(firm, client, df_d1g1t)
+        result["custodian"] = get_recon_custodian(result, custodian_aliases)
+        stage["rows_out"] = len(result)
     return result
 
 
@@ -181,8 +189,12 @@ def get_client_sql_exract(
     return df_sql
 
 
+def get_client_sql_extract_path(client: str, path: str, environment: str) -> str:
+    return f"{path}/{environment}-{client}-latest-tracking.csv"
+
+
 def read_client_sql_extract(client: str, path: str, environment: str) -> pd.DataFrame:
-    s3_path = f"{path}/{environment}-{client}-latest-tracking.csv"
+    s3_path = get_client_sql_extract_path(client, path, environment)
     logger.info(f"Retrieving d1g1t data for client: {client}...")
     try:
         df = pd.read_csv(
@@ -286,7 +298,17 @@ def aggregate_holdings(df: pd.DataFrame) -> pd.DataFrame:
         **{col: "sum" for col in sum_cols},
     }
 
-    agg = df.groupby(position_cols).agg(agg_map).reset_index()
+    # group on integer ids of the string keys, dropping missing keys as groupby would
+    df = df.dropna(subset=["account", "instrument"])
+    key_uniques = {}
+    keyed = df.copy(deep=False)
+    for key in ["account", "instrument"]:
+        (codes,), key_uniques[key] = factorize_keys(df[key])
+        keyed[key] = codes
+
+    agg = keyed.groupby(position_cols).agg(agg_map).reset_index()
+    for key, uniques in key_uniques.items():
+        agg[key] = restore_keys(agg[key], uniques)
     return agg
 
 
@@ -423,7 +445,7 @@ def set_cash_price(df: pd.DataFrame) -> None:
     """
     Cash instruments do not have prices. Set these to 1.
     """
-    cash_idx = df["instrument"].isin(SUPPORTED_CURRENCIES)
+    cash_idx = isin_keys(df["instrument"], SUPPORTED_CURRENCIES)
     df.loc[cash_idx, "price"] = 1
 
 
@@ -433,7 +455,7 @@ def compute_cash_values(df: pd.DataFrame) -> None:
     We get mv based on logic that, for cash price is always 1 and
     mv is always the same as units
     """
-    cash_idx = df.instrument.isin(SUPPORTED_CURRENCIES)
+    cash_idx = isin_keys(df["instrument"], SUPPORTED_CURRENCIES)
     df.loc[cash_idx, "price"] = 1
     df.loc[cash_idx, "mv"] = df["units"]
 
@@ -0,0 +1,164 @@
+"""
+Per-run provider of the processed d1g1t frame.
+
+The custodian recon and both outlier reports of a firm run need the same
+processed d1g1t data. The provider builds it once, optionally persists it as
+Parquet for reuse by later runs, and hands each consumer its own copy since
+consumers rename and overwrite columns in place.
+
+Persisted frames are named by the COB date and the ETag (or modified time) of
+the SQL extract they were built from, so a refreshed extract, which is written
+over the same file, is built again. Frames older than CACHE_MAX_AGE_HOURS are
+built again as well, since basis analytics come from the API.
+"""
+
+from datetime import datetime, timedelta, timezone
+import hashlib
+import json
+import logging
+from typing import Optional
+
+import fsspec
+import pandas as pd
+
+from layers.recon.data_processing.d1g1t import (
+    get_client_sql_extract_path,
+    get_d1g1t_client_data,
+)
+from layers.recon.datehandler import DateUtils, STD_DATE_FORMAT
+
+logger = logging.getLogger(__name__)
+
+# Secondary guard for changes of the basis analytics, which have no source file
+CACHE_MAX_AGE_HOURS = 12
+
+
+class D1g1tDataProvider:
+    def __init__(
+        self,
+        cache_path: Optional[str] = None,
+        max_age_hours: float = CACHE_MAX_AGE_HOURS,
+    ) -> None:
+        """
+        :param: cache_path: s3 or local folder to persist the frames in, frames
+            are only kept in memory if not given.
+        :param: max_age_hours: persisted frames older than this are built again.
+        """
+        self.cache_path = cache_path
+        self.max_age = timedelta(hours=max_age_hours)
+        self.frames = {}
+
+    @staticmethod
+    def get_cache_key(*args) -> str:
+        return hashlib.sha256(json.dumps(args, default=str).encode()).hexdigest()[:16]
+
+    @staticmethod
+    def get_source_version(source_file: str) -> Optional[str]:
+        """ETag of the source file on s3, or its modified time, None if unknown."""
+        try:
+            fs, path = fsspec.core.url_to_fs(source_file)
+            info = fs.info(path)
+        except Exception as e:
+            logger.warning(f"Could not check d1g1t source {source_file}: {e}")
+            return None
+        version = info.get("ETag") or info.get("LastModified") or info.get("mtime")
+        return None if version is None else str(version).strip('"')
+
+    def get_cache_file(
+        self, client: str, path: str, environment: str, dt: str, cache_key: str
+    ) -> Optional[str]:
+        """Persisted frame of cache_key and the current SQL extract, if enabled."""
+        if not self.cache_path:
+            return None
+        source_file = get_client_sql_extract_path(client, path, environment)
+        version = self.get_source_version(source_file)
+        if version is None:
+            return None
+        file_key = self.get_cache_key(cache_key, version)
+        return f"{self.cache_path}/{client}_d1g1t_{dt}_{file_key}.parquet"
+
+    def get_client_data(
+        self,
+        firm: str,
+        client: str,
+        path: str,
+        environment: str,
+        client_version: str,
+        recon_funds: str,
+        dt: str,
+        reporting_currency: str,
+        custodian_aliases: dict,
+    ) -> pd.DataFrame:
+        """Same as get_d1g1t_client_data, built at most once per set of arguments."""
+        # a blank date is the last COB date, which moves from one day to the next
+        cob_dt = dt or DateUtils.get_last_cob_date(datetime.today()).strftime(
+            STD_DATE_FORMAT
+        )
+        cache_key = self.get_cache_key(
+            firm,
+            client,
+            path,
+            environment,
+            client_version,
+            recon_funds,
+            cob_dt,
+            reporting_currency,
+            custodian_aliases,
+        )
+        if cache_key not in self.frames:
+            cache_file = self.get_cache_file(
+                client, path, environment, cob_dt, cache_key
+            )
+            df = self.load_frame(cache_file)
+            if df is None:
+                df = get_d1g1t_client_data(
+                    firm,
+                    client,
+                    path,
+                    environment,
+                    client_version,
+                    recon_funds,
+                    dt,
+                    reporting_currency,
+                    custodian_aliases,
+                )
+                self.save_frame(df, cache_file)
+            self.frames[cache_key] = df
+        else:
+            logger.info(f"Reusing d1g1t data for {client} on {cob_dt}.")
+        return self.frames[cache_key].copy()
+
+    @staticmethod
+    def get_file_age(cache_file: str) -> timedelta:
+        fs, path = fsspec.core.url_to_fs(cache_file)
+        modified = fs.modified(path)
+        if modified.tzinfo is None:
+            modified = modified.astimezone()
+        return datetime.now(timezone.utc) - modified
+
+    def load_frame(self, cache_file: Optional[str]) -> Optional[pd.DataFrame]:
+        if not cache_file:
+            return None
+        try:
+            age = self.get_file_age(cache_file)
+            if age > self.max_age:
+                logger.info(f"d1g1t data in {cache_file} is {age} old, rebuilding it.")
+                return None
+            df = pd.read_parquet(cache_file)
+            logger.info(f"Loaded d1g1t data from {cache_file}.")
+            return df
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Could not read d1g1t data from {cache_file}: {e}")
+            return None
+
+    @staticmethod
+    def save_frame(df: pd.DataFrame, cache_file: Optional[str]) -> None:
+        if not cache_file:
+            return
+        try:
+            df.to_parquet(cache_file, compression="zstd")
+        except Exception as e:
+            logger.error(f"Could not save d1g1t data to {cache_file}: {e}")
+            logger.warning("Continuing...")
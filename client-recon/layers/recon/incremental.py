@@ -0,0 +1,93 @@
+"""
+Snapshots for incremental reconciliation.
+
+The snapshot keeps, per (account, instrument), a hash of the d1g1t and
+custodian metric values that went into the recon plus the resulting _diff and
+_reconciled columns, so positions whose inputs are unchanged on the next run
+can carry their prior results forward.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEYS = ["account", "instrument"]
+
+
+def get_recon_snapshot_file(snapshot_path: str, client: str) -> str:
+    return f"{snapshot_path}/{client}_recon_snapshot.parquet"
+
+
+def load_recon_snapshot(snapshot_file: Optional[str]) -> Optional[pd.DataFrame]:
+    if not snapshot_file:
+        return None
+    try:
+        return pd.read_parquet(snapshot_file)
+    except FileNotFoundError:
+        logger.info(f"No recon snapshot found at {snapshot_file}.")
+    except Exception as e:
+        logger.warning(f"Could not read recon snapshot {snapshot_file}: {e}")
+    return None
+
+
+def save_recon_snapshot(snapshot: pd.DataFrame, snapshot_file: Optional[str]) -> None:
+    if not snapshot_file:
+        return
+    try:
+        snapshot.to_parquet(snapshot_file, index=False, compression="zstd")
+    except Exception as e:
+        logger.error(f"Could not save recon snapshot {snapshot_file}: {e}")
+        logger.warning("Continuing...")
+
+
+def get_settings_hash(threshold_settings: dict, metrics: list) -> str:
+    """Fingerprint of the recon settings, a change invalidates the snapshot."""
+    settings = json.dumps([metrics, threshold_settings], sort_keys=True)
+    return hashlib.sha256(settings.encode()).hexdigest()[:16]
+
+
+def get_input_hashes(df: pd.DataFrame, metrics: list) -> np.ndarray:
+    input_cols = [f"{p}_{metric}" for metric in metrics for p in ["d1g1t", "custodian"]]
+    return pd.util.hash_pandas_object(df[input_cols], index=False).to_numpy()
+
+
+def get_result_cols(metrics: list) -> list:
+    return sum([[f"{metric}_diff", f"{metric}_reconciled"] for metric in metrics], [])
+
+
+def get_carried_forward_results(
+    df: pd.DataFrame,
+    input_hashes: np.ndarray,
+    snapshot: Optional[pd.DataFrame],
+    settings_hash: str,
+    result_cols: list,
+):
+    """
+    Prior results aligned to df and a mask of the positions whose inputs match.
+    """
+    no_match = None, np.zeros(len(df), dtype=bool)
+    if snapshot is None or snapshot.empty:
+        return no_match
+    expected_cols = SNAPSHOT_KEYS + ["input_hash", "settings_hash"] + result_cols
+    if not set(expected_cols).issubset(snapshot.columns):
+        logger.info("Recon snapshot does not cover the current metrics.")
+        return no_match
+    if (snapshot["settings_hash"] != settings_hash).any():
+        logger.info("Recon settings changed since the snapshot was taken.")
+        return no_match
+
+    try:
+        prior = df[SNAPSHOT_KEYS].merge(
+            snapshot[expected_cols], how="left", on=SNAPSHOT_KEYS, validate="1:1"
+        )
+    except pd.errors.MergeError:
+        logger.warning("Recon snapshot keys are not unique, reconciling in full.")
+        return no_match
+    unchanged = (prior["input_hash"] == input_hashes).to_numpy()
+    return prior, unchanged
@@ -1,15 +1,28 @@
+import copy
 import logging
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, Tuple
 
 import pandas as pd
 
 from layers.recon import custodian_reconciliation, outlier_detection
+from layers.recon.data_processing.d1g1t.provider import D1g1tDataProvider
 from layers.recon.exceptions import FirmNotConfiguredException
+from layers.recon.reference_cache import read_reference_csv
 
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_WORKERS = 4
+
+# (firm, client, date, client_version, reporting_currency)
+ReconJob = Tuple[str, str, str, str, str]
+
+_batch_runner = None
+
 
 class MainValidation:
     def __init__(self, environment: str) -> None:
@@ -18,17 +31,18 @@ class MainValidation:
         self.client_config = self.get_client_config()
         self.configured_clients = set(self.client_config["name"])
         self.custodian_metric_map = self.custodian_config.to_dict()["metrics"]
+        self.feed_cache = None
 
     @property
     def custodian_config(self):
-        config = pd.read_csv(
+        config = read_reference_csv(
             f"{self.config_path}/custodian_config.csv", index_col="custodian"
         )
         return config
 
     @property
     def custodian_aliases(self):
-        aliases = pd.read_csv(
+        aliases = read_reference_csv(
             f"{self.config_path}/custodian_aliases.csv", index_col="client-name"
         )
         return aliases.to_dict()["recon-alias"]
@@ -44,7 +58,7 @@ class MainValidation:
         return client in self.configured_clients
 
     def get_client_config(self):
-        config = pd.read_csv(
+        config = read_reference_csv(
             f"{self.config_path}/client_recon_config_{self.environment}.csv"
         )
         for col in [
@@ -79,6 +93,14 @@ class MainValidation:
         reporting_currency: str,
     ) -> None:
         client_info = self.get_client_info(firm, client)
+        # d1g1t data is built once and shared by the recon and outlier reports
+        cache_path = client_info.get(
+            "d1g1t_cache_path"
+        )  # Remove get once added to config
+        if pd.isna(cache_path) or not cache_path:
+            d1g1t_data = D1g1tDataProvider()
+        else:
+            d1g1t_data = D1g1tDataProvider(cache_path.strip())
         output_file_name = custodian_reconciliation.run(
             firm,
             client,
@@ -89,6 +111,8 @@ class MainValidation:
             self.custodian_metric_map,
             reporting_currency,
             self.custodian_aliases,
+            self.feed_cache,
+            d1g1t_data,
         )
         if client_info.get(
             "run_outlier_detection", False
@@ -103,6 +127,7 @@ class MainValidation:
                 reporting_currency,
                 self.custodian_aliases,
                 outlier_type="market_value",
+                d1g1t_data=d1g1t_data,
             )
             outlier_detection.run(
                 firm,
@@ -114,6 +139,7 @@ class MainValidation:
                 reporting_currency,
                 self.custodian_aliases,
                 outlier_type="return",
+                d1g1t_data=d1g1t_data,
             )
         return output_file_name
 
@@ -135,3 +161,129 @@ def recon_main(
         reporting_currency=client_reporting_currency,
     )
     return output_file_name
+
+
+def get_job_feed_keys(runner: MainValidation, job: ReconJob) -> set:
+    """Custodian feeds read by a job, keyed so firms on the same feed/date match."""
+    firm, client, date, *_ = job
+    try:
+        client_info = runner.get_client_info(firm, client)
+    except FirmNotConfiguredException:
+        return set()
+    feeds = client_info["custodian_feed_map"].split(",")
+    return {(feed.replace(" ", ""), client, date) for feed in feeds}
+
+
+def group_jobs_by_shared_feeds(
+    runner: MainValidation, jobs: List[ReconJob]
+) -> List[List[ReconJob]]:
+    """
+    Groups jobs that read at least one common custodian feed on the same date so
+    each group can run in one worker and read the shared feed once.
+    """
+    groups = []
+    for job in jobs:
+        feed_keys = get_job_feed_keys(runner, job)
+        overlapping = [x for x in groups if x["feed_keys"] & feed_keys]
+        group = {"feed_keys": feed_keys, "jobs": []}
+        for other in overlapping:
+            group["feed_keys"] |= other["feed_keys"]
+            group["jobs"].extend(other["jobs"])
+            groups.remove(other)
+        group["jobs"].append(job)
+        groups.append(group)
+    return [sorted(x["jobs"], key=jobs.index) for x in groups]
+
+
+def _init_batch_worker(environment: str) -> None:
+    """Loads shared configuration once per worker process."""
+    global _batch_runner
+    _batch_runner = MainValidation(environment)
+
+
+def _run_job_group_in_worker(jobs: List[ReconJob]) -> List[dict]:
+    return run_job_group(_batch_runner, jobs)
+
+
+def run_job_group(runner: MainValidation, jobs: List[ReconJob]) -> List[dict]:
+    """Runs a group of jobs serially, sharing custodian feeds between them."""
+    runner = copy.copy(runner)
+    runner.feed_cache = {}
+    report = []
+    for firm, client, date, client_version, reporting_currency in jobs:
+        start_time = time.perf_counter()
+        status = {"firm": firm, "client": client, "date": date}
+        try:
+            status["output_file"] = runner.run_client_validation(
+                firm=firm,
+                client=client,
+                client_version=client_version,
+                dte=date,
+                reporting_currency=reporting_currency,
+            )
+            status["status"] = "success"
+        except Exception as e:
+            logger.exception(f"Recon failed for {firm} on {date}: {e}")
+            status["status"] = "failed"
+            status["error"] = str(e)
+        status["duration"] = round(time.perf_counter() - start_time, 1)
+        report.append(status)
+    return report
+
+
+def recon_batch_main(
+    jobs: List[ReconJob],
+    environment: str,
+    max_workers: int = DEFAULT_BATCH_WORKERS,
+    use_processes: bool = True,
+) -> List[dict]:
+    """
+    Runs recons for many firms, loading configuration once per worker.
+    :param: jobs: (firm, client, date, client_version, reporting_currency) tuples.
+    :param: environment: environment all jobs run against.
+    :param: max_workers: number of firm groups run in parallel.
+    :param: use_processes: use a process pool, otherwise threads (e.g. on lambda
+        where multiprocessing is not available).
+    :return: per-firm status report in job order.
+    """
+    runner = MainValidation(environment)
+    job_groups = group_jobs_by_shared_feeds(runner, jobs)
+    logger.info(f"Running {len(jobs)} recons in {len(job_groups)} groups...")
+
+    if use_processes:
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_batch_worker,
+            initargs=(environment,),
+        )
+        submit_args = [(_run_job_group_in_worker, group) for group in job_groups]
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        submit_args = [(run_job_group, runner, group) for group in job_groups]
+
+    report = []
+    with executor:
+        futures = {executor.submit(*args): args[-1] for args in submit_args}
+        for future in as_completed(futures):
+            try:
+                report.extend(future.result())
+            except Exception as e:
+                logger.exception(f"Recon worker failed: {e}")
+                report.extend(
+                    {
+                        "firm": firm,
+                        "client": client,
+                        "date": date,
+                        "status": "failed",
+                        "error": str(e),
+                    }
+                    for firm, client, date, *_ in futures[future]
+                )
+
+    job_order = {(x[0], x[1], x[2]): i for i, x in enumerate(jobs)}
+    report.sort(key=lambda x: job_order[(x["firm"], x["client"], x["date"])])
+    failed = sum(x["status"] == "failed" for x in report)
+    logger.info(
+        f"Batch recon complete: {len(report) - failed} succeeded, {failed} failed."
+    )
+    return report
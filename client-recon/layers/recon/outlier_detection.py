@@ -5,10 +5,25 @@ import warnings
 import pandas as pd
 import numpy as np
 
-from layers.recon.utils import get_ignored_accounts
-from layers.recon.data_processing.d1g1t import get_d1g1t_client_data
+from layers.recon.utils import (
+    factorize_keys,
+    get_ignored_accounts,
+    isin_keys,
+    restore_keys,
+)
+from layers.recon.data_processing.d1g1t.provider import D1g1tDataProvider
 from layers.recon.exceptions import MissingMetricException, InputValidationException
 from layers.recon.data_processing.d1g1t import POSITION_INFO
+from layers.recon.outlier_history import (
+    DEFAULT_HISTORY_DAYS,
+    DEFAULT_SCORE_METHOD,
+    SCORE_METHODS,
+    get_history_scores,
+    get_outlier_history_file,
+    load_outlier_history,
+    save_outlier_history,
+    update_outlier_history,
+)
 from layers.recon.reporting import (
     send_recon_summary,
     generate_output_file,
@@ -21,9 +36,15 @@ logger = logging.getLogger(__name__)
 
 
 class OutlierDetection:
-    def __init__(self, environment: str, client_info: dict) -> None:
+    def __init__(
+        self,
+        environment: str,
+        client_info: dict,
+        d1g1t_data: Optional[D1g1tDataProvider] = None,
+    ) -> None:
         self.environment = environment
         self.client_info = client_info
+        self.d1g1t_data = d1g1t_data or D1g1tDataProvider()
         self.return_report_columns = POSITION_INFO + [
             "total_gain",
             "total_return",
@@ -42,14 +63,42 @@ class OutlierDetection:
         self.mv_cols = ["mv_dirty_t-1", "mv_dirty_t"]
 
         self.outlier_type_map = {  # Add this to config in future
-            "return": {"metric_col": "total_return", "threshold": 0.1},
-            "market_value": {"metric_col": "mv_diff(%)", "threshold": 0.5},
+            "return": {
+                "metric_col": "total_return",
+                "threshold": 0.1,
+                "key_cols": ["account", "instrument"],
+                "score_threshold": 3.5,
+            },
+            "market_value": {
+                "metric_col": "mv_diff(%)",
+                "threshold": 0.5,
+                "key_cols": ["account"],
+                "score_threshold": 3.5,
+            },
         }
 
+        self.history_path = self.get_setting("outlier_history_path", None)
+        self.history_days = int(
+            self.get_setting("outlier_history_days", DEFAULT_HISTORY_DAYS)
+        )
+        self.score_method = self.get_setting(
+            "outlier_score_method", DEFAULT_SCORE_METHOD
+        )
+        if self.score_method not in SCORE_METHODS:
+            msg = f"Outlier score method is invalid. Expected one of {SCORE_METHODS}."
+            raise InputValidationException(msg)
+        self.history_file = None
+
         self.ignored_accounts = get_ignored_accounts(
             self.client_info["ignore_accounts_file"]
         )
 
+    def get_setting(self, setting: str, default):
+        """Optional client setting, blank values fall back to the default."""
+        # Remove get once added to config
+        value = self.client_info.get(setting, default)
+        return default if pd.isna(value) or value == "" else value
+
     @staticmethod
     def override_ignored_account_checks(
         df: pd.DataFrame, ignored_accounts: Optional[set], outlier_column: str
@@ -58,7 +107,7 @@ class OutlierDetection:
         df["Note"] = ""
         if ignored_accounts:
             note = "Account ignored during outlier detection."
-            ignore_idx = df["account"].isin(ignored_accounts)
+            ignore_idx = isin_keys(df["account"], ignored_accounts)
             df.loc[ignore_idx, outlier_column] = False
             df.loc[ignore_idx, "Note"] = note
 
@@ -70,10 +119,44 @@ class OutlierDetection:
         threshold = outlier_info["threshold"]
         try:
             df[f"{outlier_type}_outlier"] = df[outlier_col].abs() >= threshold
-            self.override_ignored_account_checks(df, ignored_accounts, outlier_col)
         except KeyError:
             msg = f"Column required to perform outlier detection ({outlier_col}) cannot be found in d1g1t data!"
             raise MissingMetricException(msg)
+        if self.history_file:
+            self.check_against_history(df, outlier_type)
+        self.override_ignored_account_checks(df, ignored_accounts, outlier_col)
+
+    def check_against_history(self, df: pd.DataFrame, outlier_type: str) -> None:
+        """
+        - Scores each value against the rolling history of its account/position.
+        - Where there is enough history the score replaces the static threshold.
+        - Adds the current values to the history.
+        """
+        outlier_info = self.outlier_type_map[outlier_type]
+        outlier_col = outlier_info["metric_col"]
+        key_cols = outlier_info["key_cols"]
+        history = load_outlier_history(self.history_file)
+        scores = get_history_scores(
+            history, df, key_cols, outlier_col, self.score_method
+        )
+        df[f"{outlier_type}_score"] = scores
+        scored = ~np.isnan(scores)
+        df.loc[scored, f"{outlier_type}_outlier"] = (
+            np.abs(scores[scored]) >= outlier_info["score_threshold"]
+        )
+        history = update_outlier_history(
+            history, df, key_cols, outlier_col, self.history_days
+        )
+        save_outlier_history(history, self.history_file)
+
+    @staticmethod
+    def get_report_columns(df: pd.DataFrame, columns: list, outlier_type: str) -> list:
+        """Adds the history score next to the outlier flag when it was computed."""
+        score_col = f"{outlier_type}_score"
+        if score_col not in df.columns:
+            return columns
+        idx = columns.index(f"{outlier_type}_outlier")
+        return columns[:idx] + [score_col] + columns[idx:]
 
     @staticmethod
     def set_date_t_mv_dirty(df: pd.DataFrame, reporting_currency: str) -> None:
@@ -83,7 +166,11 @@ class OutlierDetection:
 
     def get_account_level_market_values(self, df: pd.DataFrame) -> pd.DataFrame:
         """Aggregate market values to the account level"""
-        res = df.groupby(["date", "account"])[self.mv_cols].sum().reset_index()
+        df = df.dropna(subset=["account"])
+        (codes,), accounts = factorize_keys(df["account"])
+        keyed = df[["date"] + self.mv_cols].assign(account=codes)
+        res = keyed.groupby(["date", "account"])[self.mv_cols].sum().reset_index()
+        res["account"] = restore_keys(res["account"], accounts)
         return res
 
     def get_mv_pct_change(self, df: pd.DataFrame):
@@ -111,7 +198,7 @@ class OutlierDetection:
         res = self.get_account_level_market_values(df)
         res["mv_diff(%)"] = self.get_mv_pct_change(res)
         self.check_for_outliers(res, self.ignored_accounts, outlier_type="market_value")
-        return res[self.mv_report_columns]
+        return res[self.get_report_columns(res, self.mv_report_columns, "market_value")]
 
     def get_position_return_outlier_report(self, df: pd.DataFrame):
         """
@@ -119,7 +206,7 @@ class OutlierDetection:
         - Check for return outliers using MV_THRESHOLD
         """
         self.check_for_outliers(df, self.ignored_accounts, outlier_type="return")
-        return df[self.return_report_columns]
+        return df[self.get_report_columns(df, self.return_report_columns, "return")]
 
     def run_outlier_detection(
         self,
@@ -135,8 +222,12 @@ class OutlierDetection:
         output_paths = self.client_info["output_file_destination"].split(",")
         slack_webhook_urls = self.client_info["slack_webhook_URL"].split(",")
         recon_funds = self.client_info["recon_funds"]
+        if self.history_path:
+            self.history_file = get_outlier_history_file(
+                self.history_path, client, outlier_type
+            )
 
-        d1g1t_df = get_d1g1t_client_data(
+        d1g1t_df = self.d1g1t_data.get_client_data(
             firm,
             client,
             d1g1t_input_path,
@@ -193,8 +284,9 @@ def run(
     reporting_currency: str,
     custodian_aliases: dict,
     outlier_type: str,
+    d1g1t_data: Optional[D1g1tDataProvider] = None,
 ):
-    runner = OutlierDetection(environment, client_info)
+    runner = OutlierDetection(environment, client_info, d1g1t_data)
     runner.run_outlier_detection(
         firm=firm,
         client=client,
@@ -0,0 +1,131 @@
+"""
+Rolling history for outlier detection.
+
+Each run appends the outlier metric of every account (market value change) or
+position (return) to a compact per client Parquet history that keeps the last
+N dates. Current values are scored against each key's history with a robust
+z-score (median/MAD) or a plain z-score (mean/std), computed for all keys at
+once on a keys x dates matrix.
+"""
+
+import logging
+import warnings
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from layers.recon.utils import factorize_keys
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_DAYS = 20
+DEFAULT_SCORE_METHOD = "mad"
+SCORE_METHODS = ["mad", "zscore"]
+MIN_HISTORY_POINTS = 5
+MAD_SCALE = 1.4826  # makes the MAD a consistent estimator of the std
+
+
+def get_outlier_history_file(history_path: str, client: str, outlier_type: str) -> str:
+    return f"{history_path}/{client}_{outlier_type}_outlier_history.parquet"
+
+
+def load_outlier_history(history_file: Optional[str]) -> Optional[pd.DataFrame]:
+    if not history_file:
+        return None
+    try:
+        return pd.read_parquet(history_file)
+    except FileNotFoundError:
+        logger.info(f"No outlier history found at {history_file}.")
+    except Exception as e:
+        logger.warning(f"Could not read outlier history {history_file}: {e}")
+    return None
+
+
+def save_outlier_history(history: pd.DataFrame, history_file: Optional[str]) -> None:
+    if not history_file:
+        return
+    try:
+        history.to_parquet(history_file, index=False, compression="zstd")
+    except Exception as e:
+        logger.error(f"Could not save outlier history {history_file}: {e}")
+        logger.warning("Continuing...")
+
+
+def update_outlier_history(
+    history: Optional[pd.DataFrame],
+    current: pd.DataFrame,
+    key_cols: List[str],
+    value_col: str,
+    n_days: int = DEFAULT_HISTORY_DAYS,
+) -> pd.DataFrame:
+    """
+    Appends the current values, replacing any earlier values of the same date,
+    and keeps the last n_days dates.
+    """
+    history_cols = ["date"] + key_cols + [value_col]
+    current = current[history_cols]
+    if history is not None and set(history_cols).issubset(history.columns):
+        current_dates = current["date"].unique()
+        history = history.loc[~history["date"].isin(current_dates), history_cols]
+        current = pd.concat([history, current], ignore_index=True)
+    kept_dates = np.sort(current["date"].unique())[-n_days:]
+    return current[current["date"].isin(kept_dates)].reset_index(drop=True)
+
+
+def get_history_scores(
+    history: Optional[pd.DataFrame],
+    current: pd.DataFrame,
+    key_cols: List[str],
+    value_col: str,
+    method: str = DEFAULT_SCORE_METHOD,
+    min_periods: int = MIN_HISTORY_POINTS,
+) -> np.ndarray:
+    """
+    Score of each current value against the history of its key. Keys with
+    fewer than min_periods prior values or no dispersion get NaN.
+    :param: history: prior values, the dates of current are ignored.
+    :param: current: values to score.
+    :param: key_cols: columns identifying an account or position.
+    :param: value_col: metric to score.
+    :param: method: "mad" for median/MAD or "zscore" for mean/std.
+    """
+    scores = np.full(len(current), np.nan)
+    if history is None or history.empty or current.empty:
+        return scores
+    if not set(["date", value_col] + key_cols).issubset(history.columns):
+        logger.info(f"Outlier history does not have {value_col}, skipping scores.")
+        return scores
+    history = history[~history["date"].isin(current["date"].unique())]
+
+    # one integer id per key across history and current
+    history_ids = np.zeros(len(history), dtype=np.int64)
+    current_ids = np.zeros(len(current), dtype=np.int64)
+    for key in key_cols:
+        (history_codes, current_codes), uniques = factorize_keys(
+            history[key], current[key]
+        )
+        history_ids = history_ids * len(uniques) + history_codes
+        current_ids = current_ids * len(uniques) + current_codes
+    (history_ids, current_ids), ids = factorize_keys(
+        pd.Series(history_ids), pd.Series(current_ids)
+    )
+    date_codes, dates = pd.factorize(history["date"])
+
+    values = np.full((len(ids), len(dates)), np.nan)
+    values[history_ids, date_codes] = history[value_col].to_numpy(dtype=float)
+    counts = (~np.isnan(values)).sum(axis=1)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN keys
+        if method == "mad":
+            center = np.nanmedian(values, axis=1)
+            scale = MAD_SCALE * np.nanmedian(np.abs(values - center[:, None]), axis=1)
+        elif method == "zscore":
+            center = np.nanmean(values, axis=1)
+            scale = np.nanstd(values, axis=1)
+        else:
+            raise ValueError(f"Unknown score method {method}, expected {SCORE_METHODS}")
+        scale[(counts < min_periods) | (scale == 0)] = np.nan
+        current_values = current[value_col].to_numpy(dtype=float)
+        scores = (current_values - center[current_ids]) / scale[current_ids]
+    return scores
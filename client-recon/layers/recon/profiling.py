@@ -0,0 +1,180 @@
+"""
+Stage instrumentation for the recon pipeline.
+
+Each stage records its wall time, rows in/out and the process peak RSS, and the
+stages of a run are written as a JSON timing report next to the recon output.
+Setting RECON_PROFILE to "cprofile" or "pyinstrument" also captures a profile
+of the run, saved next to the report.
+"""
+
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import resource
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Optional
+
+import fsspec
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODE = os.environ.get("RECON_PROFILE", "").lower()
+
+_active_profiler = contextvars.ContextVar("recon_stage_profiler", default=None)
+
+# Endings of the timing report and profiles written next to an output file
+TIMING_REPORT_SUFFIXES = ("_timings.json", "_timings.prof", "_timings.html")
+
+
+def get_peak_rss_mb() -> float:
+    """High-water mark of the process resident memory, ru_maxrss is in KB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_rows(df) -> Optional[int]:
+    return None if df is None else len(df)
+
+
+def get_timing_report_filename(output_filename: str) -> str:
+    return f"{output_filename.rsplit('.', 1)[0]}_timings.json"
+
+
+class StageProfiler:
+    """
+    Collects stage timings of one recon run. Stages may be recorded from
+    worker threads. Peak RSS is process wide, so stages that run concurrently
+    (e.g. custodian feeds) share the same high-water mark.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.started_at = None
+        self.total_seconds = None
+        self.profile = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(
+        self,
+        name: str,
+        custodian: Optional[str] = None,
+        rows_in: Optional[int] = None,
+    ):
+        """
+        Times the enclosed block. Set "rows_out" on the yielded record to
+        report the stage output size.
+        """
+        record = {
+            "stage": name,
+            "custodian": custodian,
+            "rows_in": rows_in,
+            "rows_out": None,
+        }
+        rss_before = get_peak_rss_mb()
+        start_time = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.perf_counter() - start_time, 4)
+            record["peak_rss_mb"] = round(get_peak_rss_mb(), 1)
+            record["peak_rss_growth_mb"] = round(record["peak_rss_mb"] - rss_before, 1)
+            with self._lock:
+                self.records.append(record)
+
+    @contextmanager
+    def activate(self):
+        """
+        Makes this the profiler used by profile_stage in the current context
+        and captures a profile of the block if RECON_PROFILE is set.
+        """
+        token = _active_profiler.set(self)
+        self.started_at = datetime.now().isoformat()
+        self.profile = self.start_profile()
+        start_time = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total_seconds = round(time.perf_counter() - start_time, 4)
+            self.stop_profile()
+            _active_profiler.reset(token)
+
+    @staticmethod
+    def start_profile():
+        if PROFILE_MODE == "cprofile":
+            profile = cProfile.Profile()  # only profiles the calling thread
+            profile.enable()
+            return profile
+        if PROFILE_MODE == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                logger.warning("pyinstrument is not installed, skipping profile.")
+                return None
+            profile = Profiler()
+            profile.start()
+            return profile
+        return None
+
+    def stop_profile(self) -> None:
+        if isinstance(self.profile, cProfile.Profile):
+            self.profile.disable()
+        elif self.profile is not None:
+            self.profile.stop()
+
+    def get_report(self, **metadata) -> dict:
+        return {
+            **metadata,
+            "started_at": self.started_at,
+            "total_seconds": self.total_seconds,
+            "stages": self.records,
+        }
+
+    def save_report(self, report_filename: str, **metadata) -> None:
+        """
+        Writes the timing report, and the profile if one was captured.
+        :param: report_filename: s3 url or local path of the json report.
+        :param: metadata: run details added to the report, e.g. firm and client.
+        """
+        report = self.get_report(**metadata)
+        try:
+            with fsspec.open(report_filename, "w") as outfile:
+                json.dump(report, outfile, indent=2, default=str)
+            logger.info(f"Saved timing report as {report_filename}.")
+            if self.profile is not None:
+                self.save_profile(report_filename.rsplit(".", 1)[0])
+        except Exception as e:
+            logger.error(f"Could not save timing report {report_filename}: {e}")
+            logger.info(json.dumps(report, default=str))
+
+    def save_profile(self, base_filename: str) -> None:
+        if isinstance(self.profile, cProfile.Profile):
+            with tempfile.NamedTemporaryFile(suffix=".prof") as tmp:
+                self.profile.dump_stats(tmp.name)
+                content = tmp.read()
+            profile_filename = f"{base_filename}.prof"
+        else:
+            content = self.profile.output_html().encode()
+            profile_filename = f"{base_filename}.html"
+        with fsspec.open(profile_filename, "wb") as outfile:
+            outfile.write(content)
+        logger.info(f"Saved {PROFILE_MODE} profile as {profile_filename}.")
+
+
+def profile_stage(
+    name: str, custodian: Optional[str] = None, rows_in: Optional[int] = None
+):
+    """
+    Stage context of the profiler active in this context, a no-op if there is
+    none. Context variables don't carry over to worker threads, use
+    StageProfiler.stage directly there.
+    """
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return nullcontext({})
+    return profiler.stage(name, custodian, rows_in)
@@ -0,0 +1,120 @@
+"""
+Read-through cache for small reference files (configs, aliases, mapping rules)
+that are read from s3 several times per run.
+
+- Parsed frames are memoized in-process for RECON_CACHE_TTL seconds.
+- Once the TTL lapses the object's ETag is checked with a HEAD request and the
+  raw file is only downloaded again if its content changed.
+- Downloaded files are kept on disk under RECON_CACHE_DIR, named by ETag, so a
+  new process (or a warm lambda) can skip the download as well.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import boto3
+import pandas as pd
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get(
+    "RECON_CACHE_DIR", os.path.join(tempfile.gettempdir(), "recon-cache")
+)
+CACHE_TTL = float(os.environ.get("RECON_CACHE_TTL", 300))
+
+_memo = {}
+_lock = threading.Lock()
+
+
+def read_reference_csv(path: str, **kwargs) -> pd.DataFrame:
+    """
+    Cached drop-in for pd.read_csv on s3 reference files.
+    Non-s3 paths are passed straight through to pd.read_csv.
+    :param: path: s3 url of the csv file.
+    :param: kwargs: pd.read_csv keyword arguments.
+    """
+    if not isinstance(path, str) or not path.startswith("s3://"):
+        return pd.read_csv(path, **kwargs)
+
+    key = (path, json.dumps(kwargs, sort_keys=True, default=str))
+    with _lock:
+        entry = _memo.get(key)
+    if entry and time.time() - entry["loaded_at"] < CACHE_TTL:
+        return entry["frame"].copy()
+
+    etag = get_etag(path)
+    if entry and entry["etag"] == etag:
+        entry["loaded_at"] = time.time()
+        return entry["frame"].copy()
+
+    frame = pd.read_csv(io.BytesIO(get_file_content(path, etag)), **kwargs)
+    with _lock:
+        _memo[key] = {"frame": frame, "etag": etag, "loaded_at": time.time()}
+    return frame.copy()
+
+
+def invalidate_reference_cache(path: Optional[str] = None) -> None:
+    """
+    Drops cached copies of path, or of every file if no path is given.
+    :param: path: s3 url of the file to invalidate.
+    """
+    with _lock:
+        for key in [x for x in _memo if path is None or x[0] == path]:
+            del _memo[key]
+    cache_dir = CACHE_DIR if path is None else get_cache_dir(path)
+    if not os.path.isdir(cache_dir):
+        return
+    for root, _, files in os.walk(cache_dir):
+        for file in files:
+            os.remove(os.path.join(root, file))
+
+
+def get_bucket_and_key(path: str) -> tuple:
+    parsed_url = urlparse(path)
+    return parsed_url.netloc, parsed_url.path.lstrip("/")
+
+
+def get_etag(path: str) -> str:
+    bucket, key = get_bucket_and_key(path)
+    try:
+        metadata = boto3.client("s3").head_object(Bucket=bucket, Key=key)
+    except ClientError as err:
+        if err.response["Error"]["Code"] in ["404", "NoSuchKey"]:
+            raise FileNotFoundError(f"No such file: {path}") from err
+        raise
+    return metadata["ETag"].strip('"')
+
+
+def get_cache_dir(path: str) -> str:
+    return os.path.join(CACHE_DIR, hashlib.sha256(path.encode()).hexdigest())
+
+
+def get_file_content(path: str, etag: str) -> bytes:
+    """Raw file content from the disk cache, downloading it on a miss."""
+    cache_file = os.path.join(get_cache_dir(path), etag)
+    if os.path.exists(cache_file):
+        with open(cache_file, "rb") as infile:
+            return infile.read()
+
+    logger.info(f"Downloading reference file {path}...")
+    bucket, key = get_bucket_and_key(path)
+    response = boto3.client("s3").get_object(Bucket=bucket, Key=key)
+    content = response["Body"].read()
+    cache_file = os.path.join(get_cache_dir(path), response["ETag"].strip('"'))
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "wb") as outfile:
+            outfile.write(content)
+        os.replace(tmp_file, cache_file)
+    except OSError as err:
+        logger.warning(f"Could not write {path} to the reference cache: {err}")
+    return content
@@ -1,15 +1,26 @@
+import copy
+import gzip
+import io
 import json
 import logging
 import requests
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from urllib.parse import urlencode
 
 import boto3
+import fsspec
+from boto3.s3.transfer import TransferConfig
+import numpy as np
 import pandas as pd
 from tabulate import tabulate
 from datetime import datetime
 import time
 from layers.recon.datehandler import DateUtils, STD_DATE_FORMAT, HM_DATE_FORMAT
 from pytz import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 et = timezone("US/Eastern")
 SPOTLIGHTPSMETRICSPERFORMANCE = (
@@ -19,11 +30,91 @@ SPOTLIGHTRECONBASE = "https://spotlight.d1g1tapps.com/api/v1/recon/"
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PUBLISH_WORKERS = 8
+
+
+class ThrottledRetry(Retry):
+    """
+    Retries throttled POSTs. Publishing POSTs aren't idempotent, so a 503 is
+    only retried when it has Retry-After, while a 429 means the request wasn't
+    processed and is always retried with backoff.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False) -> bool:
+        if status_code == 503 and not has_retry_after:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+# read=0: a POST whose response was lost may have been applied already
+HTTP_RETRIES = ThrottledRetry(
+    total=3,
+    read=0,
+    backoff_factor=0.5,
+    status_forcelist=[429, 503],
+    allowed_methods=["POST"],
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+OUTPUT_FORMATS = ["csv.gz", "parquet"]
+DEFAULT_UPLOAD_WORKERS = 4
+UPLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024, multipart_chunksize=16 * 1024 * 1024
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Session shared by the Slack and Spotlight publishing, pooling connections
+    and retrying requests the server throttled.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(
+                pool_connections=DEFAULT_PUBLISH_WORKERS,
+                pool_maxsize=DEFAULT_PUBLISH_WORKERS,
+                max_retries=HTTP_RETRIES,
+            )
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+SUMMARY_CACHE_ATTR = "recon_summary_rows"
+
 
 def generate_summary_rows(
     recon_frame: pd.DataFrame,
     client_info: dict,
 ) -> list:
+    """
+    Rows of [custodian, metric, break count, percentage, position count].
+    The rows are cached on the recon frame so the Slack and Spotlight
+    summaries share one computation.
+    """
+    cache_key = (
+        id(recon_frame),
+        len(recon_frame),
+        tuple(recon_frame.columns),
+        client_info["slack_report_metrics_overwrite"],
+        client_info["slack_report_exceptions_only"],
+    )
+    cached = recon_frame.attrs.get(SUMMARY_CACHE_ATTR)
+    if cached is not None and cached["key"] == cache_key:
+        return copy.deepcopy(cached["rows"])
+
+    results = get_summary_rows(recon_frame, client_info)
+    recon_frame.attrs[SUMMARY_CACHE_ATTR] = {"key": cache_key, "rows": results}
+    return copy.deepcopy(results)
+
+
+def get_summary_rows(recon_frame: pd.DataFrame, client_info: dict) -> list:
     results = []
     reporting_frame = recon_frame[
         recon_frame["Note"].astype(str) != "Account ignored during reconciliation"
@@ -37,45 +128,54 @@ def generate_summary_rows(
     if slack_report_metrics_overwrite:
         all_metrics = slack_report_metrics_overwrite.split(",")
     slack_report_exceptions_only = client_info["slack_report_exceptions_only"]
+
+    # break counts of every custodian/metric pair in one grouped sum
+    breaks = (
+        reporting_frame[[f"{metric}_reconciled" for metric in all_metrics]]
+        .isin([False])
+        .to_numpy()
+    )
+    codes, custodians = pd.factorize(reporting_frame["custodian"])
+    custodian_idx = {custodian: i for i, custodian in enumerate(custodians)}
+    group_breaks = (
+        pd.DataFrame(breaks)
+        .groupby(codes)
+        .sum()
+        .reindex(range(len(custodians)), fill_value=0)
+        .to_numpy()
+    )
+    group_totals = np.bincount(codes[codes >= 0], minlength=len(custodians))
+
     for custdn_feed in all_custodians:
-        for metric in all_metrics:
-            try:
-                recon_custodin = reporting_frame[
-                    reporting_frame["custodian"] == custdn_feed
-                ]
-            except Exception:
-                recon_custodin = reporting_frame
-            breaks = recon_custodin[
-                recon_custodin[f"{metric}_reconciled"].isin([False])
-            ]
+        i = custodian_idx.get(custdn_feed)  # missing custodians match no rows
+        for j, metric in enumerate(all_metrics):
+            n_breaks = 0 if i is None else int(group_breaks[i, j])
+            n_total = 0 if i is None else int(group_totals[i])
             row = [
                 custdn_feed,
                 metric,
-                len(breaks),
-                "{:.2%}".format(
-                    1 - round(len(breaks) / max(1, len(recon_custodin)), 4)
-                ),
-                len(recon_custodin),
+                n_breaks,
+                "{:.2%}".format(1 - round(n_breaks / max(1, n_total), 4)),
+                n_total,
             ]
-            if slack_report_exceptions_only and len(breaks) == 0:
+            if slack_report_exceptions_only and n_breaks == 0:
                 continue
             else:
                 results.extend([row])
     if len(results) > 25:
         results = []
     if len(all_custodians) > 1:
-        for metric in all_metrics:
-            breaks = reporting_frame[
-                reporting_frame[f"{metric}_reconciled"].isin([False])
-            ]
+        total_breaks = breaks.sum(axis=0)
+        for j, metric in enumerate(all_metrics):
+            n_breaks = int(total_breaks[j])
             row = [
                 "Total",
                 metric,
-                len(breaks),
-                "{:.2%}".format(1 - round(len(breaks) / len(reporting_frame), 4)),
+                n_breaks,
+                "{:.2%}".format(1 - round(n_breaks / len(reporting_frame), 4)),
                 len(reporting_frame),
             ]
-            if slack_report_exceptions_only and len(breaks) == 0:
+            if slack_report_exceptions_only and n_breaks == 0:
                 continue
             else:
                 results.extend([row])
@@ -132,31 +232,50 @@ def get_outlier_summary(
 def send_slack_msg(message: str, slack_webhook_URL: str) -> None:
     payload = '{"text": "%s"}' % message
     try:
-        requests.post(slack_webhook_URL, data=payload)
+        get_http_session().post(slack_webhook_URL, data=payload)
     except Exception:
         msg = "No slack channel provided for posting report"
         logger.error(msg)
         logger.warning("Continuing...")
 
 
-def post_recon_summary_spotlight(data, headers):
-    """Attempt to post the summary data."""
+def post_recon_summary(payload: dict, headers: dict):
+    """Posts one summary, returns (payload, None) or (payload, error details)."""
+    try:
+        response = get_http_session().post(
+            f"{SPOTLIGHTRECONBASE}summaries/", json=payload, headers=headers
+        )
+    except requests.RequestException as e:
+        logger.error(f"Failed to post firm recon summary: {e}")
+        return payload, {"error": str(e)}
+    if response.status_code == 201:
+        logger.info(f"Successfully created a firm recon summary: {response.json()}")
+        return payload, None
+    elif response.status_code == 400:
+        logger.info(f"Failed to create firm recon summary: {response.json()}")
+        return payload, response.json()
+    else:
+        logger.info(f"Unexpected response: {response.status_code}")
+        return payload, {"error": "Unexpected response"}
+
+
+def post_recon_summary_spotlight(
+    data, headers, max_workers: int = DEFAULT_PUBLISH_WORKERS
+):
+    """
+    Attempt to post the summary data, a few payloads at a time. The summaries
+    endpoint creates one summary per call, so payloads can't be batched.
+    """
     successes = []
     failures = []
 
-    for payload in data:
-        response = requests.post(
-            f"{SPOTLIGHTRECONBASE}summaries/", json=payload, headers=headers
-        )
-        if response.status_code == 201:
-            print("Successfully created a firm recon summary:", response.json())
-            successes.append(payload)
-        elif response.status_code == 400:
-            print("Failed to create firm recon summary:", response.json())
-            failures.append((payload, response.json()))
-        else:
-            print("Unexpected response:", response.status_code)
-            failures.append((payload, {"error": "Unexpected response"}))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda x: post_recon_summary(x, headers), data)
+        for payload, error_details in results:
+            if error_details is None:
+                successes.append(payload)
+            else:
+                failures.append((payload, error_details))
 
     return successes, failures
 
@@ -288,7 +407,7 @@ def post_performance_metric(
             "Details": missing_slugs,
         },
     }
-    response = requests.post(
+    response = get_http_session().post(
         SPOTLIGHTPSMETRICSPERFORMANCE, json=performance_data, headers=headers
     )
     if response.status_code == 201:
@@ -332,28 +451,98 @@ def generate_output_file(
     output_filename: str,
     client: str,
 ):
-    logger.info(f"Saving validation file for {client} as {output_filename}....")
+    generate_output_files(recon_frame, d1g1t_input_path, [output_filename], client)
+
+
+def generate_output_files(
+    recon_frame: pd.DataFrame,
+    d1g1t_input_path: str,
+    output_filenames: List[str],
+    client: str,
+    output_formats: Optional[List[str]] = None,
+) -> None:
+    """
+    Encodes the frame once per format and uploads the same bytes to every
+    destination concurrently.
+    :param: output_filenames: csv file names, one per destination.
+    :param: output_formats: extra formats from OUTPUT_FORMATS written next to
+        each csv file.
+    """
+    contents = get_output_contents(recon_frame, client, output_formats or [])
+    uploads = [
+        (content, f"{output_filename.rsplit('.csv', 1)[0]}.{output_format}")
+        for output_format, content in contents.items()
+        for output_filename in output_filenames
+    ]
+    s3 = boto3.client("s3")
+    with ThreadPoolExecutor(max_workers=DEFAULT_UPLOAD_WORKERS) as executor:
+        list(
+            executor.map(
+                lambda x: upload_output_file(
+                    s3, x[0], x[1], d1g1t_input_path, client, recon_frame.empty
+                ),
+                uploads,
+            )
+        )
+
+
+def get_output_contents(
+    recon_frame: pd.DataFrame, client: str, output_formats: List[str]
+) -> dict:
+    """Encoded output file per format, formats that fail to encode are skipped."""
     sep = "|" if client == "assante" else ","
+    contents = {}
     try:
-        recon_frame.to_csv(
-            output_filename,
-            index=False,
-            sep=sep,
-            storage_options={
-                "s3_additional_kwargs": {
-                    "ACL": "bucket-owner-full-control",
-                    "Metadata": {
-                        "creator": "refresh_recon",
-                        "source": json.dumps([d1g1t_input_path]),
-                        "empty": "true" if recon_frame.empty else "false",
-                    },
+        contents["csv"] = recon_frame.to_csv(index=False, sep=sep).encode()
+    except Exception as e:
+        logger.error(f"Failed to encode validation file for {client}: {e}")
+        logger.warning("Continuing...")
+        return contents
+
+    for output_format in output_formats:
+        try:
+            if output_format == "csv.gz":
+                contents[output_format] = gzip.compress(contents["csv"], mtime=0)
+            elif output_format == "parquet":
+                contents[output_format] = recon_frame.to_parquet(
+                    index=False, compression="zstd"
+                )
+        except Exception as e:
+            logger.error(f"Failed to encode {output_format} file for {client}: {e}")
+            logger.warning("Continuing...")
+    return contents
+
+
+def upload_output_file(
+    s3,
+    content: bytes,
+    output_filename: str,
+    d1g1t_input_path: str,
+    client: str,
+    empty: bool,
+) -> None:
+    logger.info(f"Saving validation file for {client} as {output_filename}....")
+    try:
+        if not output_filename.startswith("s3://"):
+            with fsspec.open(output_filename, "wb") as outfile:
+                outfile.write(content)
+            return
+        *_, bucket, key = output_filename.split("/", 3)
+        s3.upload_fileobj(
+            io.BytesIO(content),
+            bucket,
+            key,
+            ExtraArgs={
+                "ACL": "bucket-owner-full-control",
+                "Metadata": {
+                    "creator": "refresh_recon",
+                    "source": json.dumps([d1g1t_input_path]),
+                    "empty": "true" if empty else "false",
                 },
+                "Tagging": urlencode({"client": client}),
             },
+            Config=UPLOAD_TRANSFER_CONFIG,
         )
-        s3 = boto3.client("s3")
-        *_, bucket, key = output_filename.split("/", 3)
-        s3_tag = {"TagSet": [{"Key": "client", "Value": client}]}
-        s3.put_object_tagging(Bucket=bucket, Key=key, Tagging=s3_tag)
     except Exception:
         msg = f"Failed to generate file {output_filename}...."
         logger.error(msg)
@@ -1,10 +1,17 @@
 import logging
-from typing import Optional
+from typing import Iterable, List, Optional, Tuple
 import json
+import numpy as np
 import pandas as pd
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
+from layers.recon.profiling import TIMING_REPORT_SUFFIXES
+from layers.recon.reference_cache import read_reference_csv
+from layers.recon.reporting import OUTPUT_FORMATS
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,7 +35,7 @@ def get_ignored_accounts(file: Optional[str] = None) -> set:
     """Gets set of accounts to be ignored accross all recons."""
     ignored_accounts = set()
     try:
-        df = pd.read_csv(file, dtype=str, usecols=["AccountID"])
+        df = read_reference_csv(file, dtype=str, usecols=["AccountID"])
         ignored_accounts = set(df["AccountID"])
     except FileNotFoundError:
         msg = f"No ignore accounts file found at {file}!"
@@ -43,6 +50,34 @@ def get_ignored_accounts(file: Optional[str] = None) -> set:
     return ignored_accounts
 
 
+def factorize_keys(*columns: pd.Series) -> Tuple[List[np.ndarray], pd.Index]:
+    """
+    Interns the values of one or more key columns into shared integer codes so
+    merges and groupbys run on integers instead of strings. Codes follow the
+    sorted order of the values, missing values get the last code like pandas
+    sorts them.
+    """
+    values = pd.concat(columns, ignore_index=True)
+    try:
+        codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=False)
+    except TypeError:  # mixed types can't be sorted
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    bounds = np.cumsum([len(x) for x in columns])[:-1]
+    return np.split(codes, bounds), uniques
+
+
+def restore_keys(codes: np.ndarray, uniques: pd.Index) -> np.ndarray:
+    """Inverse of factorize_keys for one column of codes."""
+    return uniques.take(np.asarray(codes)).to_numpy(dtype=object)
+
+
+def isin_keys(column: pd.Series, values: Iterable) -> pd.Series:
+    """Series.isin that only tests the distinct values of the column."""
+    codes, uniques = pd.factorize(column)
+    unique_mask = np.append(uniques.isin(list(values)), False)
+    return pd.Series(unique_mask[codes], index=column.index)
+
+
 def read_url(s3_url):
     parsed_url = urlparse(s3_url)
     if parsed_url.scheme == "s3" and parsed_url.netloc and parsed_url.path:
@@ -62,50 +97,108 @@ def get_file_by_prefix(date: str, bucket_name: str, prefix: str) -> str:
                     return file_name
 
 
-def archive_s3_files(source_url, archive_name):
-    """Read url and restore files from S3 if needed then archive all"""
-    s3 = boto3.client("s3")
-    source_bucket, source_prefix = read_url(source_url)
+GLACIER_STORAGE_CLASSES = ["GLACIER", "DEEP_ARCHIVE"]
+DEFAULT_ARCHIVE_WORKERS = 16
+ARCHIVED_SUFFIXES = (
+    ".csv",
+    *(f".{output_format}" for output_format in OUTPUT_FORMATS),
+    *TIMING_REPORT_SUFFIXES,
+)
+DELETE_BATCH_SIZE = 1000  # delete_objects limit
+
 
+def archive_s3_files(
+    source_url, archive_name, max_workers: int = DEFAULT_ARCHIVE_WORKERS
+) -> Tuple[int, int]:
+    """
+    Read url and restore files from S3 if needed then archive all.
+    Files are copied concurrently and deleted in batches once copied.
+    :param: source_url: s3 url of the prefix to archive.
+    :param: archive_name: folder the files are moved into, next to each file.
+    :param: max_workers: number of concurrent copies.
+    :return: number of files and bytes archived.
+    """
+    s3 = boto3.client("s3", config=Config(max_pool_connections=max_workers))
+    source_bucket, source_prefix = read_url(source_url)
+    files = list(get_files_to_archive(s3, source_bucket, source_prefix, archive_name))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        copied = executor.map(
+            lambda x: copy_to_archive(s3, source_bucket, x, archive_name), files
+        )
+        copied = [x for x in copied if x is not None]
+
+    deleted = set(delete_s3_objects(s3, source_bucket, [x["Key"] for x in copied]))
+    archived = [x for x in copied if x["Key"] in deleted]
+    n_bytes = sum(x["Size"] for x in archived)
+    logger.info(
+        f"Archived {len(archived)} of {len(files)} files ({n_bytes} bytes) from "
+        f"{source_bucket}/{source_prefix}."
+    )
+    return len(archived), n_bytes
+
+
+def get_files_to_archive(s3, bucket: str, prefix: str, archive_name: str):
+    """Listing entries of the output files under prefix that aren't archived yet."""
     paginator = s3.get_paginator("list_objects_v2")
-    for page in paginator.paginate(Bucket=source_bucket, Prefix=source_prefix):
-        for content in page["Contents"]:
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for content in page.get("Contents", []):
             file_key = content["Key"]
-            if file_key.endswith(".csv"):
-                if archive_name in file_key:
-                    continue
-
-                parts = file_key.split("/")
-                parts.insert(-1, archive_name)
-                destination_key = "/".join(parts)
-
-                # check the storage class
-                page_metadata = s3.head_object(Bucket=source_bucket, Key=file_key)
-                storage_class = page_metadata.get("StorageClass", "STANDARD")
-
-                if storage_class in ["GLACIER", "DEEP_ARCHIVE"]:
-                    s3.restore_object(
-                        Bucket=source_bucket,
-                        Key=file_key,
-                        RestoreRequest={
-                            "Days": 1,
-                            "GlacierJobParameters": {"Tier": "Standard"},
-                        },
-                    )
-
-                copy_source = {"Bucket": source_bucket, "Key": file_key}
-                try:
-                    s3.copy_object(
-                        Bucket=source_bucket,
-                        Key=destination_key,
-                        CopySource=copy_source,
-                    )
-                    logger.info(
-                        f"Copied {file_key} from {source_bucket}/{source_prefix} to {source_bucket}/{destination_key}"
-                    )
-                    s3.delete_object(Bucket=source_bucket, Key=file_key)
-                    logger.info(
-                        f"Successfully deleted {file_key} from {source_bucket}."
-                    )
-                except Exception as e:
-                    logger.info(f"Failed to copy {file_key} due to {e}")
+            if file_key.endswith(ARCHIVED_SUFFIXES) and archive_name not in file_key:
+                yield content
+
+
+def copy_to_archive(s3, bucket: str, content: dict, archive_name: str):
+    """
+    Copies one listed file into the archive folder, requesting a restore first
+    if it is in Glacier. Returns the listing entry if the copy succeeded.
+    """
+    file_key = content["Key"]
+    parts = file_key.split("/")
+    parts.insert(-1, archive_name)
+    destination_key = "/".join(parts)
+
+    # the listing already has the storage class, no need to head the object
+    storage_class = content.get("StorageClass", "STANDARD")
+    try:
+        if storage_class in GLACIER_STORAGE_CLASSES:
+            s3.restore_object(
+                Bucket=bucket,
+                Key=file_key,
+                RestoreRequest={
+                    "Days": 1,
+                    "GlacierJobParameters": {"Tier": "Standard"},
+                },
+            )
+
+        s3.copy_object(
+            Bucket=bucket,
+            Key=destination_key,
+            CopySource={"Bucket": bucket, "Key": file_key},
+        )
+        logger.info(f"Copied {file_key} to {bucket}/{destination_key}")
+        return content
+    except Exception as e:
+        logger.info(f"Failed to copy {file_key} due to {e}")
+        return None
+
+
+def delete_s3_objects(s3, bucket: str, keys: List[str]) -> List[str]:
+    """Deletes keys in batches, returns the keys that were deleted."""
+    deleted = []
+    for i in range(0, len(keys), DELETE_BATCH_SIZE):
+        batch = keys[i : i + DELETE_BATCH_SIZE]
+        try:
+            response = s3.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": x} for x in batch], "Quiet": True},
+            )
+        except Exception as e:
+            logger.info(f"Failed to delete {len(batch)} files due to {e}")
+            continue
+        errors = {x["Key"]: x.get("Message") for x in response.get("Errors", [])}
+        for key, message in errors.items():
+            logger.info(f"Failed to delete {key} due to {message}")
+        deleted.extend(x for x in batch if x not in errors)
+    logger.info(f"Successfully deleted {len(deleted)} files from {bucket}.")
+    return deleted
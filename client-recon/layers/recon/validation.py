@@ -1,12 +1,24 @@
 import logging
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 from layers.recon.data_processing.d1g1t import (
     METRIC_COLS,
     POSITION_INFO,
     SUPPORTED_CURRENCIES,
 )
+from layers.recon.utils import factorize_keys, isin_keys, restore_keys
+from layers.recon.profiling import profile_stage
+from layers.recon.incremental import (
+    SNAPSHOT_KEYS,
+    get_carried_forward_results,
+    get_input_hashes,
+    get_result_cols,
+    get_settings_hash,
+    load_recon_snapshot,
+    save_recon_snapshot,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -17,23 +29,55 @@ def compare_frames(
     custodian_frame: pd.DataFrame, d1g1t_frame: pd.DataFrame
 ) -> pd.DataFrame:
     merge_cols = ["date", "account", "instrument"]
+    key_cols = ["account", "instrument"]
+
+    # merge on shared integer ids of the string keys to keep memory down
+    d1g1t_keyed = d1g1t_frame.copy(deep=False)
+    custodian_keyed = custodian_frame.copy(deep=False)
+    key_uniques = {}
+    for key in key_cols:
+        (d1g1t_codes, custodian_codes), key_uniques[key] = factorize_keys(
+            d1g1t_frame[key], custodian_frame[key]
+        )
+        d1g1t_keyed[key] = d1g1t_codes
+        custodian_keyed[key] = custodian_codes
 
     # Per Dalia Kronenberg
     merged_frame = pd.merge(
-        d1g1t_frame, custodian_frame, how="outer", on=merge_cols, validate="1:1"
+        d1g1t_keyed, custodian_keyed, how="outer", on=merge_cols, validate="1:1"
     )
+    for key in key_cols:
+        merged_frame[key] = restore_keys(merged_frame[key], key_uniques[key])
     return merged_frame
 
 
 def reconcile_metrics(
     df: pd.DataFrame, threshold_settings: dict, metrics: list
 ) -> None:
-    for metric in metrics:
-        threshold_setting = threshold_settings.get(metric, DEFAULT_THRESHOLD_SETTING)
-        us, them = df[f"d1g1t_{metric}"], df[f"custodian_{metric}"]
-        df[f"{metric}_diff"] = us - them
-        dif = df[f"{metric}_diff"]
-        df[f"{metric}_reconciled"] = apply_recon_rules(us, them, dif, threshold_setting)
+    """
+    Reconciles all metrics in one pass over (positions x metrics) blocks of the
+    d1g1t and custodian values, then adds the _diff and _reconciled columns.
+    """
+    if metrics:
+        settings = [
+            threshold_settings.get(metric, DEFAULT_THRESHOLD_SETTING)
+            for metric in metrics
+        ]
+        thresholds = np.array([x["threshold"] for x in settings], dtype="float64")
+        relative = np.array([x["threshold_type"] == "relative" for x in settings])
+        us = df[[f"d1g1t_{metric}" for metric in metrics]].to_numpy(dtype="float64")
+        them = df[[f"custodian_{metric}" for metric in metrics]].to_numpy(
+            dtype="float64"
+        )
+        dif = us - them
+        reconciled = apply_recon_rules(us, them, dif, thresholds, relative)
+
+        result_cols = {}
+        for i, metric in enumerate(metrics):
+            result_cols[f"{metric}_diff"] = dif[:, i]
+            result_cols[f"{metric}_reconciled"] = reconciled[:, i]
+        result = pd.DataFrame(result_cols, index=df.index)
+        df[result.columns] = result
     if all(x in metrics for x in ["price", "units"]):  # FEA-150
         tiny_units_idx = abs(df["custodian_units"]) < 1e-4
         missing_units_idx = df["custodian_units"].isna()
@@ -43,6 +87,48 @@ def reconcile_metrics(
         handle_missing_currency_book_values(df, metrics)
 
 
+def reconcile_metrics_incremental(
+    df: pd.DataFrame,
+    threshold_settings: dict,
+    metrics: list,
+    snapshot: Optional[pd.DataFrame],
+) -> pd.DataFrame:
+    """
+    Reconciles only positions whose inputs changed since the snapshot of the
+    previous run and carries the prior results forward for the rest.
+    :param: df: merged recon frame, updated in place.
+    :param: snapshot: previous run's snapshot or None to reconcile in full.
+    :return: the snapshot of this run.
+    """
+    settings_hash = get_settings_hash(threshold_settings, metrics)
+    input_hashes = get_input_hashes(df, metrics)
+    result_cols = get_result_cols(metrics)
+    prior, unchanged = get_carried_forward_results(
+        df, input_hashes, snapshot, settings_hash, result_cols
+    )
+    logger.info(f"Carrying forward {unchanged.sum()} of {len(df)} positions...")
+
+    if not unchanged.any():
+        reconcile_metrics(df, threshold_settings, metrics)
+    else:
+        changed = df.loc[~unchanged].copy()
+        reconcile_metrics(changed, threshold_settings, metrics)
+        result = {}
+        for col in result_cols:
+            dtype = bool if col.endswith("_reconciled") else "float64"
+            values = np.empty(len(df), dtype=dtype)
+            values[unchanged] = prior[col].to_numpy()[unchanged]
+            values[~unchanged] = changed[col].to_numpy(dtype=dtype)
+            result[col] = values
+        result = pd.DataFrame(result, index=df.index)
+        df[result.columns] = result
+
+    snapshot = df[SNAPSHOT_KEYS + result_cols].copy()
+    snapshot["input_hash"] = input_hashes
+    snapshot["settings_hash"] = settings_hash
+    return snapshot
+
+
 def handle_missing_currency_book_values(df: pd.DataFrame, metrics: list) -> None:
     # FEA-281 point 4: If custodian data is not available in particular currency we would
     # consider the bv_reconciled in that currency is TRUE as long as the other currency
@@ -68,23 +154,27 @@ def handle_missing_currency_book_values(df: pd.DataFrame, metrics: list) -> None
 
 
 def apply_recon_rules(
-    us: pd.Series, them: pd.Series, dif: pd.Series, threshold_setting: dict
-) -> pd.Series:
-    threshold = threshold_setting["threshold"]
-    if threshold_setting["threshold_type"] == "relative":
-        relative_dif = dif.copy()
-        non_zero_mask = them != 0
-        relative_dif.loc[non_zero_mask] = (
-            dif[non_zero_mask] / them[non_zero_mask]
-        ).abs()
-        relative_dif.loc[~non_zero_mask] = 0
-        res = relative_dif <= threshold
-    else:
-        res = dif.abs() <= threshold
-
-    true_idx = (us.fillna(0) - them.fillna(0)).abs() <= threshold
-
-    res.loc[true_idx] = True
+    us: np.ndarray,
+    them: np.ndarray,
+    dif: np.ndarray,
+    thresholds: np.ndarray,
+    relative: np.ndarray,
+) -> np.ndarray:
+    """
+    Applies the threshold rules to (positions x metrics) blocks.
+    :param: us, them, dif: d1g1t values, custodian values and their difference.
+    :param: thresholds: threshold of each metric.
+    :param: relative: whether each metric uses a relative threshold.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative_dif = np.where(them != 0, np.abs(dif / them), 0)
+    compared = np.where(relative, relative_dif, np.abs(dif))
+    res = compared <= thresholds
+
+    # values missing on one side are treated as 0
+    us_filled = np.where(np.isnan(us), 0, us)
+    them_filled = np.where(np.isnan(them), 0, them)
+    res |= np.abs(us_filled - them_filled) <= thresholds
     return res
 
 
@@ -151,21 +241,22 @@ def override_ignored_account_recon(
     metric_columns = [x for x in df.columns if x.endswith("_reconciled")]
     if ignored_accounts:
         note = "Account ignored during reconciliation"
-        ignore_idx = df["account"].isin(ignored_accounts)
+        ignore_idx = isin_keys(df["account"], ignored_accounts)
         for col in metric_columns:
             df.loc[ignore_idx, col] = True
             df.loc[ignore_idx, "Note"] = note
 
 
 def override_cash_metric_recon_to_true(df: pd.DataFrame, metric: str) -> None:
-    df.loc[df["instrument"].isin(SUPPORTED_CURRENCIES), f"{metric}_reconciled"] = True
+    cash_idx = isin_keys(df["instrument"], SUPPORTED_CURRENCIES)
+    df.loc[cash_idx, f"{metric}_reconciled"] = True
 
 
 def override_cash_recon_by_threshold(df: pd.DataFrame, client_cash_threshold) -> None:
     suffix = "_reconciled"
     diffs = df.filter(like=suffix)
     metrics = [x.split(suffix)[0] for x in diffs.columns]
-    cash_idx = df["instrument"].isin(SUPPORTED_CURRENCIES)
+    cash_idx = isin_keys(df["instrument"], SUPPORTED_CURRENCIES)
     note_idx = df["Note"].isna() | (df["Note"] == "")
     for metric in metrics:
         cash_reconciled = (
@@ -219,15 +310,31 @@ def validate_custodian_data(
     custodian_metric_map: dict,
     ignored_accounts: Optional[set],
     additional_output_columns: Optional[list],
+    snapshot_file: Optional[str] = None,
 ) -> pd.DataFrame:
     logger.info("Comparing data...")
-    recon_frame = compare_frames(custodian_frame, d1g1t_frame)
+    with profile_stage(
+        "merge", rows_in=len(custodian_frame) + len(d1g1t_frame)
+    ) as stage:
+        recon_frame = compare_frames(custodian_frame, d1g1t_frame)
+        stage["rows_out"] = len(recon_frame)
     logger.info("Reconciling...")
-    return_metrics = get_all_client_metrics(recon_frame, custodian_metric_map)
-    reconcile_metrics(recon_frame, threshold_settings, return_metrics)
-    reconcile_miscellaneous(recon_frame, custodian_metric_map, ignored_accounts)
-    recon_results = get_account_custodians(recon_frame)
-    recon_return_cols = get_recon_return_cols(
-        recon_results, return_metrics, additional_output_columns
-    )
+    with profile_stage("reconcile", rows_in=len(recon_frame)) as stage:
+        return_metrics = get_all_client_metrics(recon_frame, custodian_metric_map)
+        if snapshot_file:
+            snapshot = reconcile_metrics_incremental(
+                recon_frame,
+                threshold_settings,
+                return_metrics,
+                load_recon_snapshot(snapshot_file),
+            )
+            save_recon_snapshot(snapshot, snapshot_file)
+        else:
+            reconcile_metrics(recon_frame, threshold_settings, return_metrics)
+        reconcile_miscellaneous(recon_frame, custodian_metric_map, ignored_accounts)
+        recon_results = get_account_custodians(recon_frame)
+        recon_return_cols = get_recon_return_cols(
+            recon_results, return_metrics, additional_output_columns
+        )
+        stage["rows_out"] = len(recon_results)
     return recon_results[recon_return_cols]
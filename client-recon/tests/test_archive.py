@@ -0,0 +1,106 @@
+"""
+archive_s3_files against a moto stand-in for s3.
+
+Needs moto and pytest. Run from client-recon with: python -m pytest tests
+"""
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from layers.recon import utils
+
+BUCKET = "recon-output"
+PREFIX = "client/recon/production"
+N_FILES = utils.DELETE_BATCH_SIZE + 5
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def list_keys(s3, prefix: str) -> set:
+    paginator = s3.get_paginator("list_objects_v2")
+    return {
+        content["Key"]
+        for page in paginator.paginate(Bucket=BUCKET, Prefix=prefix)
+        for content in page.get("Contents", [])
+    }
+
+
+def record_calls(monkeypatch) -> list:
+    """Records (operation, params) of each s3 call made by the archive."""
+    calls = []
+    make_client = boto3.client
+
+    def record(params, model, **_):
+        calls.append((model.name, params))
+
+    def client(*args, **kwargs):
+        archive_s3 = make_client(*args, **kwargs)
+        archive_s3.meta.events.register("provide-client-params.s3.*", record)
+        return archive_s3
+
+    monkeypatch.setattr(utils.boto3, "client", client)
+    return calls
+
+
+def test_archive_s3_files(s3, monkeypatch):
+    files = {f"{PREFIX}/recon_{i:04d}.csv": b"a,b\n1,2\n" for i in range(N_FILES)}
+    files[f"{PREFIX}/recon_0000.parquet"] = b"parquet"
+    for key, body in files.items():
+        s3.put_object(Bucket=BUCKET, Key=key, Body=body)
+    glacier_key = f"{PREFIX}/recon_glacier.csv"
+    s3.put_object(Bucket=BUCKET, Key=glacier_key, Body=b"old", StorageClass="GLACIER")
+    files[glacier_key] = b"old"
+    s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}/notes.txt", Body=b"kept")
+    calls = record_calls(monkeypatch)
+
+    n_files, n_bytes = utils.archive_s3_files(f"s3://{BUCKET}/{PREFIX}", "archive")
+
+    assert (n_files, n_bytes) == (len(files), sum(len(x) for x in files.values()))
+    # the storage class comes from the listing, only glacier objects are restored
+    operations = [name for name, _ in calls]
+    assert "HeadObject" not in operations
+    restored = [params["Key"] for name, params in calls if name == "RestoreObject"]
+    assert restored == [glacier_key]
+    deleted = [
+        len(params["Delete"]["Objects"])
+        for name, params in calls
+        if name == "DeleteObjects"
+    ]
+    assert deleted == [utils.DELETE_BATCH_SIZE, len(files) - utils.DELETE_BATCH_SIZE]
+    archived = {key.replace(f"{PREFIX}/", f"{PREFIX}/archive/") for key in files}
+    assert list_keys(s3, f"{PREFIX}/archive/") == archived
+    assert list_keys(s3, PREFIX) - archived == {f"{PREFIX}/notes.txt"}
+
+
+def test_archive_s3_files_skips_unrestored_glacier(s3, monkeypatch):
+    csv_key, glacier_key = f"{PREFIX}/recon.csv", f"{PREFIX}/recon_glacier.csv"
+    s3.put_object(Bucket=BUCKET, Key=csv_key, Body=b"a,b\n")
+    s3.put_object(Bucket=BUCKET, Key=glacier_key, Body=b"old", StorageClass="GLACIER")
+    calls = record_calls(monkeypatch)
+    make_client = utils.boto3.client
+
+    def client(*args, **kwargs):
+        # the restore is only requested, as on s3 where it takes hours
+        archive_s3 = make_client(*args, **kwargs)
+        archive_s3.meta.events.register(
+            "before-call.s3.RestoreObject",
+            lambda **_: ({"status_code": 202, "headers": {}, "body": b""}, {}),
+        )
+        return archive_s3
+
+    monkeypatch.setattr(utils.boto3, "client", client)
+
+    assert utils.archive_s3_files(f"s3://{BUCKET}/{PREFIX}", "archive") == (1, 4)
+    assert [p["Key"] for name, p in calls if name == "RestoreObject"] == [glacier_key]
+    # the glacier object is left to be archived once restored
+    assert list_keys(s3, PREFIX) == {f"{PREFIX}/archive/recon.csv", glacier_key}
@@ -0,0 +1,116 @@
+"""
+Benchmark of bulk_load against building model instances row by row.
+
+Writes a synthetic SDA cash flow frame into SDACurveCashFlows three ways: the
+former iterrows + bulk_create path, bulk_load with chunked bulk_create and,
+when the database is PostgreSQL, bulk_load with COPY. Reports rows per second
+and the peak Python memory of each run. Everything is rolled back at the end.
+
+Usage:
+    python manage.py benchmark_bulk_load --rows 100000 1000000
+"""
+
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.utils.bulk_load import DEFAULT_BATCH_SIZE, bulk_load
+from modelling.models import SDACurveCashFlows, SDACurveInputs, SDACurveRunMetrics
+
+VALUE_COLUMNS = ["balance", "interest", "default", "prepayment", "principal", "totalcf"]
+
+
+def get_cashflows(n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    cfs = pd.DataFrame(
+        rng.normal(1000, 100, (n_rows, len(VALUE_COLUMNS))), columns=VALUE_COLUMNS
+    )
+    cfs.insert(0, "timestep", np.arange(n_rows))
+    return cfs
+
+
+def load_iterrows(cfs, metrics, batch_size):
+    SDACurveCashFlows.objects.bulk_create(
+        [
+            SDACurveCashFlows(
+                run_metrics=metrics,
+                timestep=row["timestep"],
+                **{column: row[column] for column in VALUE_COLUMNS},
+            )
+            for _, row in cfs.iterrows()
+        ]
+    )
+
+
+def load_columns(use_copy):
+    def load(cfs, metrics, batch_size):
+        bulk_load(
+            SDACurveCashFlows,
+            {column: cfs[column] for column in cfs.columns},
+            constants={"run_metrics": metrics},
+            batch_size=batch_size,
+            use_copy=use_copy,
+        )
+
+    return load
+
+
+class Command(BaseCommand):
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[100000])
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        loaders = {
+            "iterrows": load_iterrows,
+            "bulk_create": load_columns(use_copy=False),
+        }
+        if connection.vendor == "postgresql":
+            loaders["copy"] = load_columns(use_copy=True)
+
+        self.stdout.write(f"database: {connection.vendor}")
+        self.stdout.write(
+            f"{'rows':>9} {'loader':>12} {'seconds':>8} {'rows/s':>10} {'peak MB':>8}"
+        )
+        with transaction.atomic():
+            run = SDACurveInputs.objects.create(
+                security_file="benchmark", curve_file="benchmark", psa=0, sda=0
+            )
+            metrics = SDACurveRunMetrics.objects.create(
+                run=run, original_balance=0, WAL=0, coupon_rate=0, face_value=0
+            )
+            for n_rows in options["rows"]:
+                cfs = get_cashflows(n_rows)
+                for name, load in loaders.items():
+                    seconds = self.time_load(load, cfs, metrics, options["batch_size"])
+                    peak = self.trace_load(load, cfs, metrics, options["batch_size"])
+                    self.stdout.write(
+                        f"{n_rows:>9} {name:>12} {seconds:>8.2f}"
+                        f" {n_rows / seconds:>10.0f} {peak / 1024**2:>8.1f}"
+                    )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def time_load(load, cfs, metrics, batch_size) -> float:
+        start = time.perf_counter()
+        load(cfs, metrics, batch_size)
+        seconds = time.perf_counter() - start
+        assert metrics.cashflows.count() == len(cfs)
+        metrics.cashflows.all().delete()
+        return seconds
+
+    @staticmethod
+    def trace_load(load, cfs, metrics, batch_size) -> int:
+        """Peak Python memory of a second run, traced apart since tracing is slow."""
+        tracemalloc.start()
+        load(cfs, metrics, batch_size)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        metrics.cashflows.all().delete()
+        return peak
@@ -0,0 +1,214 @@
+# core/utils/bulk_load.py
+"""
+Bulk loading of model rows given as column arrays.
+
+Rows are written batch_size at a time, so only one batch of model instances
+(or of COPY text) is held in memory however many rows are loaded. On
+PostgreSQL the batches are streamed with COPY instead of INSERT, which skips
+building model instances altogether.
+"""
+
+from io import StringIO
+from typing import Callable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+from django.db import connections, router
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Field types COPY reads from the text written by format_copy_values
+INTEGER_FIELD_TYPES = {
+    "AutoField",
+    "BigAutoField",
+    "BigIntegerField",
+    "IntegerField",
+    "PositiveBigIntegerField",
+    "PositiveIntegerField",
+    "PositiveSmallIntegerField",
+    "SmallAutoField",
+    "SmallIntegerField",
+}
+COPY_FIELD_TYPES = INTEGER_FIELD_TYPES | {
+    "BinaryField",
+    "BooleanField",
+    "CharField",
+    "DateField",
+    "DateTimeField",
+    "DecimalField",
+    "FloatField",
+    "TextField",
+    "UUIDField",
+}
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+COPY_NULL = "\\N"
+
+
+def as_column(values) -> np.ndarray:
+    """1-d array of a column. Lists become object arrays, so bytes keep their length."""
+    if isinstance(values, (pd.Series, pd.Index)):
+        values = values.to_numpy()
+    if not isinstance(values, np.ndarray):
+        values = np.array(values, dtype=object)
+    if values.ndim != 1:
+        raise ValueError(f"Columns must be 1-d, got shape {values.shape}.")
+    return values
+
+
+def get_internal_type(field) -> str:
+    if field.is_relation:
+        field = field.target_field
+    return field.get_internal_type()
+
+
+def get_field_sources(model, columns: Mapping, constants: Optional[Mapping]):
+    """
+    Returns (field, source, value) for each concrete field in field order, where
+    source is "column" (value is an array), "constant" or "default", and the
+    number of rows. Relation constants may be given as model instances.
+    """
+    fields = {}
+    for name, values in columns.items():
+        fields[model._meta.get_field(name).attname] = ("column", as_column(values))
+    for name, value in (constants or {}).items():
+        field = model._meta.get_field(name)
+        if field.is_relation and isinstance(value, field.related_model):
+            value = value.pk
+        fields[field.attname] = ("constant", value)
+
+    lengths = {len(value) for source, value in fields.values() if source == "column"}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}.")
+
+    sources = [
+        (field, *fields.get(field.attname, ("default", None)))
+        for field in model._meta.concrete_fields
+    ]
+    return sources, lengths.pop() if lengths else 0
+
+
+def get_batch_values(sources, start: int, stop: int) -> list:
+    """Python values of each source for rows start to stop."""
+    n_rows = stop - start
+    batch = []
+    for field, source, value in sources:
+        if source == "column":
+            batch.append(value[start:stop].tolist())
+        elif source == "constant":
+            batch.append([value] * n_rows)
+        elif callable(field.default):
+            batch.append([field.get_default() for _ in range(n_rows)])
+        else:
+            batch.append([field.get_default()] * n_rows)
+    return batch
+
+
+def format_copy_values(field, values: list) -> list:
+    """Values of one field in the text format of COPY."""
+    field_type = get_internal_type(field)
+    if field_type in INTEGER_FIELD_TYPES:
+        # int() like IntegerField.get_prep_value, so whole floats are accepted
+        return [COPY_NULL if v is None else str(int(v)) for v in values]
+    if field_type == "FloatField":
+        return [COPY_NULL if v is None else repr(float(v)) for v in values]
+    if field_type == "BooleanField":
+        return [COPY_NULL if v is None else ("t" if v else "f") for v in values]
+    if field_type == "BinaryField":
+        return [COPY_NULL if v is None else "\\\\x" + bytes(v).hex() for v in values]
+    return [COPY_NULL if v is None else str(v).translate(COPY_ESCAPES) for v in values]
+
+
+def can_copy(connection, sources) -> bool:
+    return connection.vendor == "postgresql" and all(
+        get_internal_type(field) in COPY_FIELD_TYPES for field, _, _ in sources
+    )
+
+
+def copy_batches(connection, model, sources, n_rows, batch_size, on_progress):
+    # Fields left to the database, like the auto primary key, are not copied
+    sources = [
+        (field, source, value)
+        for field, source, value in sources
+        if source != "default" or not field.db_returning
+    ]
+    qn = connection.ops.quote_name
+    sql = "COPY {} ({}) FROM STDIN".format(
+        qn(model._meta.db_table),
+        ", ".join(qn(field.column) for field, _, _ in sources),
+    )
+    constants = {
+        field.attname: format_copy_values(field, [value])[0]
+        for field, source, value in sources
+        if source == "constant"
+    }
+
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        for start in range(0, n_rows, batch_size):
+            stop = min(start + batch_size, n_rows)
+            batch = get_batch_values(sources, start, stop)
+            columns = [
+                (
+                    [constants[field.attname]] * (stop - start)
+                    if source == "constant"
+                    else format_copy_values(field, values)
+                )
+                for (field, source, _), values in zip(sources, batch)
+            ]
+            text = "".join("\t".join(row) + "\n" for row in zip(*columns))
+            if hasattr(raw_cursor, "copy"):  # psycopg 3
+                with raw_cursor.copy(sql) as copy:
+                    copy.write(text)
+            else:  # psycopg2
+                raw_cursor.copy_expert(sql, StringIO(text))
+            if on_progress:
+                on_progress(stop / n_rows)
+
+
+def create_batches(model, using, sources, n_rows, batch_size, on_progress):
+    manager = model._base_manager.using(using)
+    for start in range(0, n_rows, batch_size):
+        stop = min(start + batch_size, n_rows)
+        # Positional values in concrete field order take Model.__init__'s fast path
+        objs = [model(*row) for row in zip(*get_batch_values(sources, start, stop))]
+        manager.bulk_create(objs)
+        if on_progress:
+            on_progress(stop / n_rows)
+
+
+def bulk_load(
+    model,
+    columns: Mapping,
+    constants: Optional[Mapping] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    using: Optional[str] = None,
+    use_copy: bool = True,
+    on_progress: Optional[Callable[[float], None]] = None,
+) -> int:
+    """
+    Inserts one model row per position of the column arrays and returns the
+    number of rows.
+
+    :param model: model class to insert into.
+    :param columns: field name -> 1-d array (NumPy, pandas or list), all of one length.
+    :param constants: field name -> value shared by all rows, e.g. a foreign key.
+    :param batch_size: rows written and held in memory at a time.
+    :param using: database alias, the router's write database by default.
+    :param use_copy: stream with COPY when the database is PostgreSQL.
+    :param on_progress: called with the fraction of rows written after each batch.
+
+    Fields not given take their default. Like bulk_create, no save() is called
+    and no signals are sent. Each batch commits on its own under autocommit,
+    wrap the call in transaction.atomic to load all rows or none.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    sources, n_rows = get_field_sources(model, columns, constants)
+
+    if use_copy and can_copy(connection, sources):
+        copy_batches(connection, model, sources, n_rows, batch_size, on_progress)
+    else:
+        create_batches(model, using, sources, n_rows, batch_size, on_progress)
+    return n_rows
@@ -1,7 +1,9 @@
 from typing import List, Dict
 
 import pandas as pd
+from django.db import transaction
 
+from core.utils.bulk_load import bulk_load
 from palm_scripts import mortgage_floating as mf
 from ..models import SDACurveInputs, SDACurveRunMetrics, SDACurveCashFlows
 
@@ -10,29 +12,30 @@ def generate_and_save_sda_results(run: SDACurveInputs):
     try:
         results = mf.run(run.curve_file, run.security_file)
 
-        metrics, created = SDACurveRunMetrics.objects.update_or_create(
-            run=run,
-            original_balance=results["original_balance"],
-            coupon_rate=results["coupon_rate"],
-            face_value=results["face_value"],
-            WAL=results["wal"],
-        )
-
         cfs: pd.DataFrame = results["cfs"]
-        cf_objects = [
-            SDACurveCashFlows(
-                run_metrics=metrics,
-                timestep=row["timestep"],
-                balance=row["outstandingBalance_"],
-                interest=row["interest_"],
-                default=row["default_"],
-                prepayment=row["prepayment_"],
-                principal=row["totalPrincipalPaid_"],
-                totalcf=row["totalCF_"],
+        # metrics and cash flows are saved together or not at all
+        with transaction.atomic():
+            metrics, created = SDACurveRunMetrics.objects.update_or_create(
+                run=run,
+                original_balance=results["original_balance"],
+                coupon_rate=results["coupon_rate"],
+                face_value=results["face_value"],
+                WAL=results["wal"],
+            )
+
+            bulk_load(
+                SDACurveCashFlows,
+                {
+                    "timestep": cfs["timestep"],
+                    "balance": cfs["outstandingBalance_"],
+                    "interest": cfs["interest_"],
+                    "default": cfs["default_"],
+                    "prepayment": cfs["prepayment_"],
+                    "principal": cfs["totalPrincipalPaid_"],
+                    "totalcf": cfs["totalCF_"],
+                },
+                constants={"run_metrics": metrics},
             )
-            for _, row in cfs.iterrows()
-        ]
-        SDACurveCashFlows.objects.bulk_create(cf_objects)
         return True
     except Exception as err:
         print(f"Failed to run SDA and save results: {err}")
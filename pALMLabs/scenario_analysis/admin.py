@@ -16,14 +16,14 @@ class ScenarioDataSetAdmin(admin.ModelAdmin):
     )
 
 
-class ScenarioValueAdmin(admin.ModelAdmin):
+class ScenarioSeriesAdmin(admin.ModelAdmin):
     list_display = (
         "dataset__name",
-        "timestep",
         "variable",
-        "value",
+        "n_timesteps",
     )
+    exclude = ("data",)
 
 
 admin.site.register(ScenarioDataSet, ScenarioDataSetAdmin)
-admin.site.register(ScenarioValue, ScenarioValueAdmin)
+admin.site.register(ScenarioSeries, ScenarioSeriesAdmin)
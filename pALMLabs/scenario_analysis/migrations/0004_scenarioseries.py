@@ -0,0 +1,103 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:12
+
+import django.db.models.deletion
+import numpy as np
+import pandas as pd
+from django.db import migrations, models
+
+DTYPE = np.dtype("<f8")
+
+
+def values_to_series(apps, schema_editor):
+    """One float array per (dataset, variable), NaN where there was no value."""
+    ScenarioDataSet = apps.get_model("scenario_analysis", "ScenarioDataSet")
+    ScenarioValue = apps.get_model("scenario_analysis", "ScenarioValue")
+    ScenarioSeries = apps.get_model("scenario_analysis", "ScenarioSeries")
+
+    for dataset in ScenarioDataSet.objects.iterator():
+        rows = ScenarioValue.objects.filter(dataset=dataset).values_list(
+            "variable", "timestep", "value"
+        )
+        df = pd.DataFrame.from_records(
+            rows.iterator(), columns=["variable", "timestep", "value"]
+        )
+        if df.empty:
+            continue
+        df = df.drop_duplicates(subset=["variable", "timestep"], keep="first")
+        values = df.pivot(index="variable", columns="timestep", values="value")
+        values = values.reindex(columns=range(df["timestep"].max() + 1))
+        ScenarioSeries.objects.bulk_create(
+            [
+                ScenarioSeries(
+                    dataset=dataset,
+                    variable=variable,
+                    data=np.ascontiguousarray(row, dtype=DTYPE).tobytes(),
+                )
+                for variable, row in zip(values.index, values.to_numpy())
+            ]
+        )
+
+
+def series_to_values(apps, schema_editor):
+    ScenarioSeries = apps.get_model("scenario_analysis", "ScenarioSeries")
+    ScenarioValue = apps.get_model("scenario_analysis", "ScenarioValue")
+
+    for series in ScenarioSeries.objects.iterator():
+        array = np.frombuffer(series.data, dtype=DTYPE)
+        (timesteps,) = np.nonzero(~np.isnan(array))
+        ScenarioValue.objects.bulk_create(
+            [
+                ScenarioValue(
+                    dataset_id=series.dataset_id,
+                    timestep=int(timestep),
+                    variable=series.variable,
+                    value=float(array[timestep]),
+                )
+                for timestep in timesteps
+            ],
+            batch_size=10000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scenario_analysis", "0003_rename_filename_scenariodataset_file"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScenarioSeries",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("variable", models.CharField(max_length=100)),
+                ("data", models.BinaryField()),
+                (
+                    "dataset",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="series",
+                        to="scenario_analysis.scenariodataset",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="scenarioseries",
+            constraint=models.UniqueConstraint(
+                fields=("dataset", "variable"), name="unique_variable_per_dataset"
+            ),
+        ),
+        migrations.RunPython(values_to_series, series_to_values),
+        migrations.DeleteModel(
+            name="ScenarioValue",
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scenario_analysis", "0004_scenarioseries"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scenariodataset",
+            name="progress",
+            field=models.PositiveSmallIntegerField(
+                default=0, help_text="Percentage of the processing done"
+            ),
+        ),
+        migrations.AddField(
+            model_name="scenariodataset",
+            name="progress_updated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scenario_analysis", "0005_scenariodataset_progress"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scenariodataset",
+            name="claim_token",
+            field=models.UUIDField(
+                blank=True,
+                editable=False,
+                help_text="Token of the worker processing the dataset, only it may store it",
+                null=True,
+            ),
+        ),
+    ]
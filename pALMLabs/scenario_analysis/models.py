@@ -1,9 +1,13 @@
 import uuid
+
+import numpy as np
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.db.models import JSONField
 
+from .parsing import SERIES_DTYPE
+
 
 class ScenarioDataSet(models.Model):
     """
@@ -32,6 +36,17 @@ class ScenarioDataSet(models.Model):
 
     logs = models.TextField(blank=True)
 
+    progress = models.PositiveSmallIntegerField(
+        default=0, help_text="Percentage of the processing done"
+    )
+    progress_updated_at = models.DateTimeField(null=True, blank=True)
+    claim_token = models.UUIDField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Token of the worker processing the dataset, only it may store it",
+    )
+
     column_names = JSONField(
         blank=True,
         default=list,
@@ -45,34 +60,51 @@ class ScenarioDataSet(models.Model):
             )
         ]
 
-    def log(self, message: str):
+    def log(self, message: str, save: bool = True):
+        """Appends a timestamped line, save=False leaves the write to a later save."""
         timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
         self.logs = (self.logs or "") + f"[{timestamp}] {message}\n"
-        self.save(update_fields=["logs"])
+        if save:
+            self.save(update_fields=["logs"])
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
 
-class ScenarioValue(models.Model):
+class ScenarioSeries(models.Model):
     """
-    Stores one numeric value for one variable at a specific timestep,
-    linked to a scenario dataset.
+    Stores all values of one variable of a scenario dataset as one contiguous
+    float64 array indexed by timestep, NaN where the file has no value.
     """
 
+    DTYPE = SERIES_DTYPE
+
     dataset = models.ForeignKey(
-        ScenarioDataSet, on_delete=models.CASCADE, related_name="values"
+        ScenarioDataSet, on_delete=models.CASCADE, related_name="series"
     )
 
-    timestep = models.IntegerField()
     variable = models.CharField(max_length=100)
-    value = models.FloatField()
+    data = models.BinaryField()
 
     class Meta:
-        indexes = [
-            models.Index(fields=["dataset", "variable", "timestep"]),
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dataset", "variable"], name="unique_variable_per_dataset"
+            )
         ]
-        ordering = ["timestep"]
+
+    @classmethod
+    def from_array(cls, dataset, variable: str, values) -> "ScenarioSeries":
+        array = np.ascontiguousarray(values, dtype=cls.DTYPE)
+        return cls(dataset=dataset, variable=variable, data=array.tobytes())
+
+    def to_numpy(self) -> np.ndarray:
+        """Read-only view on the stored bytes, without copying them."""
+        return np.frombuffer(self.data, dtype=self.DTYPE)
+
+    @property
+    def n_timesteps(self) -> int:
+        return len(self.data) // self.DTYPE.itemsize
 
     def __str__(self):
-        return f"{self.dataset.name} | {self.variable} @ {self.timestep} = {self.value}"
+        return f"{self.dataset.name} | {self.variable} ({self.n_timesteps} timesteps)"
@@ -0,0 +1,38 @@
+# scenario_analysis/parsing.py
+#
+# Kept free of Django imports so that files can be parsed in worker processes.
+
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+SERIES_DTYPE = np.dtype("<f8")
+
+
+def read_scenario_file(file_obj) -> pd.DataFrame:
+    """
+    Reads a scenario CSV (path or file object) into a variables x timesteps float frame.
+    Assumes first column contains variable names, and remaining columns are time series.
+    A variable listed more than once takes its first value at each timestep, and
+    variables without any value are left out.
+    """
+    if hasattr(file_obj, "seek"):
+        file_obj.seek(0)  # Just in case it was read before
+    df = pd.read_csv(file_obj, header=None)
+    df = df.dropna(axis=1, how="all")  # Remove empty columns
+
+    variables = df.iloc[:, 0].astype(str).rename("variable")
+    values = df.iloc[:, 1:].astype(SERIES_DTYPE)
+    values.columns = range(values.shape[1])
+    values.index = variables
+
+    values = values.groupby(level="variable", sort=False).first()
+    return values.dropna(how="all")
+
+
+def parse_scenario_source(source) -> pd.DataFrame:
+    """Worker process entry point, source is a file path or the file's bytes."""
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    return read_scenario_file(source)
@@ -1,8 +1,19 @@
 # scenario_analysis/services.py
 
+import numpy as np
 import pandas as pd
 from io import TextIOWrapper
-from .models import ScenarioValue
+from django.db import transaction
+from django.utils import timezone
+from core.utils.bulk_load import bulk_load
+from .models import ScenarioDataSet, ScenarioSeries
+from .parsing import read_scenario_file
+
+SERIES_BATCH_SIZE = 50
+
+
+class ClaimLostError(Exception):
+    """The dataset was claimed again by another worker, which now owns its writes."""
 
 
 def parse_mapping_file(mapping_file):
@@ -21,39 +32,79 @@ def parse_mapping_file(mapping_file):
     return mapping
 
 
+def store_scenario_values(
+    dataset, values: pd.DataFrame, on_progress=None, claim_token=None
+):
+    """
+    Stores one ScenarioSeries per variable of a read_scenario_file frame, replacing
+    any series of an earlier upload, and marks the dataset done, all in one
+    transaction. Series are written SERIES_BATCH_SIZE variables at a time and
+    on_progress, if given, is called with the fraction written after each batch.
+    With a claim_token, nothing is stored and ClaimLostError is raised unless the
+    dataset still has that token when it is marked done.
+    """
+    array = np.ascontiguousarray(values.to_numpy(), dtype=ScenarioSeries.DTYPE)
+    claimed = ScenarioDataSet.objects.filter(pk=dataset.pk, claim_token=claim_token)
+
+    with transaction.atomic():
+        if claim_token is not None and not claimed.exists():
+            raise ClaimLostError(f"Dataset {dataset.pk} was claimed again.")
+
+        ScenarioSeries.objects.filter(dataset=dataset).delete()
+        n_series = bulk_load(
+            ScenarioSeries,
+            {"variable": values.index, "data": [row.tobytes() for row in array]},
+            constants={"dataset": dataset},
+            batch_size=SERIES_BATCH_SIZE,
+            on_progress=on_progress,
+        )
+
+        dataset.column_names = list(values.index)
+        dataset.status = "done"
+        dataset.progress = 100
+        dataset.progress_updated_at = timezone.now()
+        dataset.log(
+            f"Processed {np.count_nonzero(~np.isnan(array))} values "
+            f"in {n_series} variables.",
+            save=False,
+        )
+        update_fields = [
+            "status",
+            "column_names",
+            "logs",
+            "progress",
+            "progress_updated_at",
+        ]
+        if claim_token is None:
+            dataset.save(update_fields=update_fields)
+        # the conditional update rolls the series back if the claim moved meanwhile
+        elif not claimed.update(**{f: getattr(dataset, f) for f in update_fields}):
+            raise ClaimLostError(f"Dataset {dataset.pk} was claimed again.")
+
+
 def process_scenario_file(file_obj, dataset):
     """
-    Reads the CSV, processes and stores ScenarioValue objects linked to the dataset.
-    Assumes first column contains variable names, and remaining columns are time series.
+    Reads the CSV and stores one ScenarioSeries per variable linked to the dataset.
     """
+    store_scenario_values(dataset, read_scenario_file(file_obj))
 
-    file_obj.seek(0)  # Just in case it was read before
-    df = pd.read_csv(file_obj, header=None)
-    df = df.dropna(axis=1, how="all")  # Remove empty columns
 
-    df.columns = ["variable"] + list(range(df.shape[1] - 1))
-    df.set_index("variable", inplace=True)
+def get_variable_frame(datasets, variable: str) -> pd.DataFrame:
+    """
+    Values of one variable for each dataset, indexed by timestep with one column
+    per dataset name. Timesteps where no dataset has a value are left out.
+    """
+    rows = ScenarioSeries.objects.filter(
+        variable=variable, dataset__in=datasets
+    ).values_list("dataset__name", "data")
 
-    df = df.transpose()
+    columns = {
+        name: pd.Series(np.frombuffer(data, dtype=ScenarioSeries.DTYPE))
+        for name, data in rows
+    }
+    df = pd.DataFrame(
+        {name: columns[name] for name in sorted(columns)}, dtype=ScenarioSeries.DTYPE
+    )
     df.index.name = "timestep"
-    df.reset_index(inplace=True)
-
-    long_df = df.melt(id_vars=["timestep"], var_name="variable", value_name="value")
-    long_df.dropna(subset=["value"], inplace=True)
-    long_df["timestep"] = long_df["timestep"].astype(int)
-
-    values = [
-        ScenarioValue(
-            dataset=dataset,
-            timestep=row["timestep"],
-            variable=row["variable"],
-            value=row["value"],
-        )
-        for _, row in long_df.iterrows()
-    ]
-    ScenarioValue.objects.bulk_create(values)
-
-    dataset.column_names = list(long_df["variable"].unique())
-    dataset.status = "done"
-    dataset.log(f"Processed {len(values)} values.")
-    dataset.save(update_fields=["status", "column_names"])
+    df.columns.name = "dataset"
+    return df.dropna(how="all")
@@ -0,0 +1,215 @@
+# scenario_analysis/tasks.py
+"""
+Background ingestion of uploaded scenario datasets.
+
+Pending datasets are the queue. A dataset is claimed by moving it from "pending"
+to "processing" in the database with a new claim token, so several web processes
+can share the work without a broker. Claimed files are parsed in parallel in a
+process pool, and one writer thread per web process stores the parsed values, so
+that database writes do not contend with each other. A heartbeat thread saves the
+progress of every dataset the process holds, waiting or not, for the status table
+to poll. Log lines are saved together with the result. Writes are only kept while
+the dataset still has the token it was claimed with, so a dataset queued again
+after its process was assumed lost is stored once.
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ScenarioDataSet
+from .parsing import parse_scenario_source
+from .services import ClaimLostError, store_scenario_values
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INGEST_WORKERS = 2
+# A dataset processing without progress for this long is assumed lost with its
+# web process and queued again
+STALE_AFTER = timedelta(hours=1)
+# Progress of the held datasets is saved this often, which keeps them from going stale
+HEARTBEAT_SECONDS = 5
+PARSED_PROGRESS = 50
+
+
+def get_file_source(dataset):
+    """Path of the uploaded file, or its bytes when the storage has no paths."""
+    try:
+        return dataset.file.path
+    except NotImplementedError:
+        with dataset.file.open("rb") as f:
+            return f.read()
+
+
+class IngestionQueue:
+    """Parses claimed datasets in a process pool and stores them in one thread."""
+
+    def __init__(self, workers: int = DEFAULT_INGEST_WORKERS):
+        self.workers = max(1, workers)
+        self._pool = None
+        self._writer = None
+        self._heartbeat = None
+        self._parsed = queue.Queue()
+        self._held = {}  # pk -> claimed dataset, until stored or failed
+        self._lock = threading.Lock()
+
+    def _get_pool(self, reset: bool = False) -> ProcessPoolExecutor:
+        with self._lock:
+            if reset and self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            if self._pool is None:
+                # spawn: workers only import parsing, never a copy of this process
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._write_parsed,
+                    name="scenario-ingestion-writer",
+                    daemon=True,
+                )
+                self._writer.start()
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._heartbeat = threading.Thread(
+                    target=self._beat,
+                    name="scenario-ingestion-heartbeat",
+                    daemon=True,
+                )
+                self._heartbeat.start()
+            return self._pool
+
+    @staticmethod
+    def requeue_stale(user) -> int:
+        stale_before = timezone.now() - STALE_AFTER
+        return ScenarioDataSet.objects.filter(
+            Q(progress_updated_at__lt=stale_before)
+            | Q(progress_updated_at__isnull=True),
+            user=user,
+            status="processing",
+        ).update(status="pending", claim_token=None)
+
+    @staticmethod
+    def claim(dataset) -> bool:
+        """Moves a pending dataset to processing, False if another worker did."""
+        now = timezone.now()
+        token = uuid.uuid4()
+        claimed = ScenarioDataSet.objects.filter(
+            pk=dataset.pk, status="pending"
+        ).update(
+            status="processing", progress=0, progress_updated_at=now, claim_token=token
+        )
+        if claimed:
+            dataset.status, dataset.progress = "processing", 0
+            dataset.progress_updated_at, dataset.claim_token = now, token
+        return bool(claimed)
+
+    def enqueue_pending(self, user) -> int:
+        """Claims and queues the user's pending datasets, returns how many."""
+        self.requeue_stale(user)
+        queued = 0
+        for dataset in ScenarioDataSet.objects.filter(user=user, status="pending"):
+            if self.claim(dataset):
+                dataset.log("Queued for background processing.", save=False)
+                self.submit(dataset)
+                queued += 1
+        return queued
+
+    def submit(self, dataset) -> None:
+        with self._lock:
+            self._held[dataset.pk] = dataset
+        try:
+            source = get_file_source(dataset)
+            try:
+                future = self._get_pool().submit(parse_scenario_source, source)
+            except BrokenProcessPool:
+                future = self._get_pool(reset=True).submit(
+                    parse_scenario_source, source
+                )
+        except Exception as e:
+            self.fail(dataset, e)
+            return
+        future.add_done_callback(lambda f: self._parsed.put((dataset, f)))
+
+    def _write_parsed(self) -> None:
+        while True:
+            dataset, future = self._parsed.get()
+            try:
+                self.store(dataset, future)
+            except Exception:
+                logger.exception(f"Could not store scenario dataset {dataset.pk}")
+            finally:
+                close_old_connections()
+
+    def _beat(self) -> None:
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            with self._lock:
+                held = list(self._held.values())
+            now = timezone.now()
+            for dataset in held:
+                try:
+                    ScenarioDataSet.objects.filter(
+                        pk=dataset.pk,
+                        status="processing",
+                        claim_token=dataset.claim_token,
+                    ).update(progress=dataset.progress, progress_updated_at=now)
+                except Exception as e:
+                    # e.g. the database is locked by the writer, try again next beat
+                    logger.debug(f"Could not save progress of {dataset.pk}: {e}")
+            close_old_connections()
+
+    def release(self, dataset) -> None:
+        with self._lock:
+            self._held.pop(dataset.pk, None)
+
+    def store(self, dataset, future) -> None:
+        def on_progress(done):
+            # saved by the heartbeat, the store is not visible until it commits
+            dataset.progress = int(PARSED_PROGRESS + done * (100 - PARSED_PROGRESS))
+
+        try:
+            values = future.result()
+            dataset.log(
+                f"Parsed {values.shape[0]} variables x {values.shape[1]} timesteps.",
+                save=False,
+            )
+            dataset.progress = PARSED_PROGRESS
+            store_scenario_values(
+                dataset,
+                values,
+                on_progress=on_progress,
+                claim_token=dataset.claim_token,
+            )
+        except ClaimLostError as e:
+            logger.warning(f"Not storing scenario dataset {dataset.pk}: {e}")
+        except Exception as e:
+            self.fail(dataset, e)
+        finally:
+            self.release(dataset)
+
+    def fail(self, dataset, error) -> None:
+        """Marks the dataset failed, unless another worker claimed it meanwhile."""
+        self.release(dataset)
+        dataset.status = "error"
+        dataset.log(f"Processing failed: {error}", save=False)
+        ScenarioDataSet.objects.filter(
+            pk=dataset.pk, claim_token=dataset.claim_token
+        ).update(status=dataset.status, logs=dataset.logs)
+
+
+ingestion_queue = IngestionQueue(
+    getattr(settings, "SCENARIO_INGEST_WORKERS", DEFAULT_INGEST_WORKERS)
+)
@@ -5,14 +5,14 @@ from django.contrib import messages
 from django.http import HttpResponse, JsonResponse
 from django.template.loader import render_to_string
 from django.views.decorators.http import require_GET, require_POST
-import pandas as pd
 import plotly.graph_objs as go
 from plotly.offline import plot
 from uuid import UUID
 
 from .forms import ScenarioUploadForm
-from .models import ScenarioDataSet, ScenarioValue
-from .services import parse_mapping_file, process_scenario_file
+from .models import ScenarioDataSet
+from .services import get_variable_frame, parse_mapping_file
+from .tasks import ingestion_queue
 
 
 @login_required
@@ -57,6 +57,7 @@ def upload_scenarios(request):
                     dataset.status = "pending"
                     dataset.save()
 
+            ingestion_queue.enqueue_pending(request.user)
             messages.success(request, "Files uploaded. Processing will begin shortly.")
             return redirect("scenario_analysis:upload-scenarios")
     else:
@@ -76,9 +77,10 @@ def dataset_status_table(request):
     datasets = ScenarioDataSet.objects.filter(user=request.user).order_by(
         "-uploaded_at"
     )
+    in_progress = any(ds.status in ("pending", "processing") for ds in datasets)
     html = render_to_string(
         "scenario_analysis/partials/dataset_status_table.html",
-        {"datasets": datasets},
+        {"datasets": datasets, "in_progress": in_progress},
         request=request,
     )
     return HttpResponse(html)
@@ -86,22 +88,9 @@ def dataset_status_table(request):
 
 @login_required
 def start_background_processing(request):
-    datasets = ScenarioDataSet.objects.filter(user=request.user, status="pending")
-
-    for dataset in datasets:
-        try:
-            dataset.status = "processing"
-            dataset.log("Started background processing.")
-            dataset.save(update_fields=["status", "logs"])
-
-            process_scenario_file(dataset.file, dataset)
-
-        except Exception as e:
-            dataset.status = "error"
-            dataset.log(f"Processing failed: {str(e)}")
-            dataset.save(update_fields=["status", "logs"])
-
-    return JsonResponse({"status": "ok"})
+    """Queues the user's pending datasets and returns without waiting for them."""
+    queued = ingestion_queue.enqueue_pending(request.user)
+    return JsonResponse({"status": "ok", "queued": queued})
 
 
 @ensure_csrf_cookie
@@ -166,18 +155,7 @@ def compare_scenarios(request) -> HttpResponse:
     print(selected_scenarios, selected_column_names, single_selected_column, sep=" | ")
 
     if selected_column_names:
-        qs = ScenarioValue.objects.filter(
-                variable=single_selected_column,
-                dataset_id__in=selected_scenarios,
-            ).select_related("dataset")
-    
-        df = pd.DataFrame.from_records(
-            qs.values("dataset__name", "timestep", "value")
-            ).rename(columns={"dataset__name": "dataset"})
-        
-        df.drop_duplicates(subset=["dataset", "timestep"], keep="first", inplace=True)
-        
-        df_pivot = df.pivot(index="timestep", columns="dataset", values="value").sort_index()
+        df_pivot = get_variable_frame(selected_scenarios, single_selected_column)
         chart_html = generate_chart_html(df_pivot)
     else:
         chart_html = None
@@ -295,26 +273,14 @@ def update_line_chart(request) -> HttpResponse:
     if not selected_column or not selected_scenarios:
         return HttpResponse("<p class='text-center text-gray-500'>No data selected.</p>")
 
-    qs = ScenarioValue.objects.filter(
-        variable=selected_column,
-        dataset_id__in=selected_scenarios
-    ).select_related("dataset")
-
-    df = (
-        pd.DataFrame.from_records(
-            qs.values("dataset__name", "timestep", "value")
-        )
-        .rename(columns={"dataset__name": "dataset"})
-        .drop_duplicates(subset=["dataset", "timestep"], keep="first")
+    datasets = ScenarioDataSet.objects.filter(
+        id__in=selected_scenarios, user=request.user, status="done"
     )
+    pivot = get_variable_frame(datasets, selected_column)
 
-    if df.empty:
+    if pivot.empty:
         return HttpResponse("<p class='text-center text-gray-500'>No data to plot.</p>")
 
-    pivot = (
-        df.pivot(index="timestep", columns="dataset", values="value").sort_index()
-    )
-
     return HttpResponse(generate_chart_html(pivot))
 
 